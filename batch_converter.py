@@ -0,0 +1,311 @@
+import os
+import time
+from file_manager import FileManager
+from image_converter import ImageConverter, ConversionJob, ENCODER_PROFILES, DEFAULT_ENCODER_PROFILE
+from instrumentation import ignore_event
+
+# Konwerter procesu roboczego (tworzony raz na proces w inicjalizatorze puli)
+_worker_converter = None
+
+def _init_worker(output_cache=None, pixel_cache=None, instrument: bool = False, profile_directory=None):
+    """
+    Inicjalizator procesu roboczego: tworzy konwerter (obsługa HEIF jest ładowana przy pierwszym pliku HEIC).
+    Przy `instrument` zdarzenia etapów są zbierane w wynikach i przekazywane obserwatorowi w procesie głównym.
+    Przy `profile_directory` proces jest profilowany, a wyniki zapisywane w tym katalogu przy jego zakończeniu.
+    """
+    global _worker_converter
+    if profile_directory:
+        from profiling import start_worker_profiling
+        start_worker_profiling(profile_directory)
+    _worker_converter = ImageConverter()
+    _worker_converter.output_cache = output_cache
+    _worker_converter.pixel_cache = pixel_cache
+    if instrument:
+        _worker_converter.observer = ignore_event
+
+def _run_job(index, job, converter=None):
+    """
+    Wykonuje jedno zadanie i zamienia wyjątek na wynik z błędem, aby partia była kontynuowana
+
+    Returns:
+        BatchResult: Wynik zadania
+    """
+    start = time.perf_counter()
+    try:
+        result = (converter or _worker_converter).run_job(job)
+        return BatchResult(index, job, result=result, elapsed=time.perf_counter() - start)
+    except Exception as e:
+        return BatchResult(index, job, error=str(e), elapsed=time.perf_counter() - start)
+
+def encoder_profiles_from_settings(settings):
+    """
+    Zwraca profile kodera dostępne w ustawieniach: wbudowane ENCODER_PROFILES uzupełnione
+    o profile z klucza "encoder_profiles" w `settings.json`. Profil o nazwie wbudowanej
+    nadpisuje tylko podane formaty, np. {"fast": {"PNG": {"compress_level": 3}}}.
+
+    Args:
+        settings (dict): Ustawienia z ConfigManager
+
+    Returns:
+        dict: Nazwa profilu -> {format: parametry zapisu}
+    """
+    profiles = {name: dict(formats) for name, formats in ENCODER_PROFILES.items()}
+    for name, formats in (settings.get("encoder_profiles") or {}).items():
+        profiles.setdefault(name, dict(ENCODER_PROFILES[DEFAULT_ENCODER_PROFILE])).update(formats)
+    return profiles
+
+def options_from_settings(settings):
+    """
+    Zamienia ustawienia zapisane w `settings.json` na argumenty `BatchConverter.build_jobs`
+
+    Args:
+        settings (dict): Ustawienia z ConfigManager
+
+    Returns:
+        dict: Argumenty build_jobs (bez listy plików)
+    """
+    max_size = str(settings.get("max_size", "")).strip()
+    options = {
+        "output_format": settings.get("output_format", "JPEG"),
+        "suffix": settings.get("suffix", "_converted"),
+        "output_directory": settings.get("output_directory") or None,
+        "number_files": settings.get("number_output_files", False),
+        "max_size_kb": int(max_size) if max_size.isdigit() else None,
+        "longer_edge": settings.get("longer_edge", ""),
+        "shorter_edge": settings.get("shorter_edge", ""),
+        "strip_metadata": settings.get("strip_metadata", False),
+        "webp_lossless": settings.get("webp_lossless", False),
+        "encoder_profile": encoder_profile_from_settings(settings),
+    }
+    # Budżet czasu na plik w sekundach (puste - bez budżetu); dodawany tylko, gdy ustawiony,
+    # aby nie zmieniać kluczy pamięci podręcznej wyników dla konwersji bez budżetu
+    time_budget = str(settings.get("time_budget", "") or "").strip()
+    if time_budget:
+        try:
+            options["time_budget"] = float(time_budget)
+        except ValueError:
+            raise Exception(f"Nieprawidłowy budżet czasu: {time_budget}")
+    return options
+
+
+def encoder_profile_from_settings(settings):
+    """
+    Zwraca profil kodera wybrany w ustawieniach ("encoder_profile") w postaci przyjmowanej
+    przez `ImageConverter`: nazwę profilu wbudowanego lub słownik parametrów profilu własnego
+
+    Args:
+        settings (dict): Ustawienia z ConfigManager
+
+    Returns:
+        str or dict: Profil kodera
+    """
+    name = settings.get("encoder_profile", DEFAULT_ENCODER_PROFILE)
+    if name in ENCODER_PROFILES and name not in (settings.get("encoder_profiles") or {}):
+        return name
+    profiles = encoder_profiles_from_settings(settings)
+    if name not in profiles:
+        raise Exception(f"Nieznany profil kodera: {name} (dostępne: {', '.join(profiles)})")
+    return profiles[name]
+
+
+class BatchResult:
+    def __init__(self, index, job, result=None, error=None, elapsed=0.0):
+        """
+        Wynik konwersji jednego pliku w partii
+
+        Args:
+            index (int): Pozycja pliku na liście wejściowej
+            job (ConversionJob): Wykonane zadanie
+            result (ConversionResult, optional): Wynik konwersji, jeśli się powiodła
+            error (str, optional): Opis błędu, jeśli konwersja się nie powiodła
+            elapsed (float): Czas przetwarzania pliku w sekundach
+        """
+        self.index = index
+        self.job = job
+        self.result = result
+        self.error = error
+        self.elapsed = elapsed
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def input_path(self):
+        return self.job.input_path
+
+    @property
+    def output_path(self):
+        return self.job.output_path
+
+
+class BatchConverter:
+    def __init__(self, workers: int = None, output_cache=None, pixel_cache=None, observer=None):
+        """
+        Konwertuje partie plików równolegle w puli procesów. Pula jest tworzona przy pierwszej partii
+        i używana ponownie przez kolejne (procesy robocze startują tylko raz); zamyka ją `close`
+        lub wyjście z bloku `with`.
+
+        Args:
+            workers (int, optional): Liczba procesów roboczych. Domyślnie liczba rdzeni.
+                Dla 1 konwersja odbywa się w bieżącym procesie, bez puli.
+            output_cache (OutputCache, optional): Pamięć podręczna wyników; pliki, których treść
+                i opcje się nie zmieniły, są odtwarzane bez ponownej konwersji
+            pixel_cache (PixelCache, optional): Pamięć podręczna zdekodowanych i przeskalowanych pikseli;
+                ponowne uruchomienie z tą samą geometrią, ale innym formatem lub limitem, pomija dekodowanie
+            observer (callable, optional): Obserwator etapów konwersji (jak `ImageConverter.observer`), wywoływany
+                w bieżącym procesie; zdarzenia z procesów roboczych są przekazywane po zakończeniu pliku
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.output_cache = output_cache
+        self.pixel_cache = pixel_cache
+        self.observer = observer
+        # Profilowanie partii (cProfile + tracemalloc, także w procesach roboczych); raporty trafiają
+        # do katalogu wyników, a ich ścieżki do `last_profile_report`
+        self.profiling = False
+        self.last_profile_report = None
+        self.file_manager = FileManager()
+        self._executor = None
+        self._executor_settings = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def start(self):
+        """
+        Uruchamia pulę procesów roboczych z wyprzedzeniem (np. w długo działającym obserwatorze katalogu),
+        aby start procesów nie opóźniał pierwszej partii. Przy `workers <= 1` konwersja odbywa się w procesie
+        i pula nie jest tworzona.
+        """
+        if self.workers <= 1:
+            return
+        executor = self._shared_executor()
+        # Jednoczesne zadania zajmują wszystkie procesy, więc pula uruchamia je od razu
+        for future in [executor.submit(os.getpid) for _ in range(self.workers)]:
+            future.result()
+
+    def close(self):
+        """
+        Zamyka pulę procesów roboczych (zadania jeszcze nierozpoczęte są anulowane). Kolejna
+        partia utworzy nową pulę.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+            self._executor_settings = None
+
+    def build_jobs(self, input_paths, output_format="JPEG", suffix="_converted", output_directory=None, number_files: bool = False, max_size_kb=None, longer_edge=None, shorter_edge=None, strip_metadata: bool = False, webp_lossless: bool = False, **options):
+        """
+        Tworzy zadania konwersji dla listy plików. Prefiks numeryczny zależy od pozycji
+        pliku na liście, więc nie zmienia się przy innej kolejności zakończenia konwersji.
+
+        Args:
+            input_paths (list): Ścieżki plików wejściowych
+            number_files (bool, optional): Czy dodać prefiks numeryczny "01_", "02_", ...
+            Pozostałe argumenty jak w `ConversionJob` i `FileManager.generate_output_filename`.
+
+        Returns:
+            list: Lista ConversionJob
+        """
+        jobs = []
+        for position, input_path in enumerate(input_paths, start=1):
+            number_prefix = f"{position:02d}_" if number_files else None
+            output_path = self.file_manager.generate_output_filename(input_path, output_format, suffix, output_directory=output_directory, number_prefix=number_prefix)
+            jobs.append(ConversionJob(input_path, output_path, output_format=output_format, max_size_kb=max_size_kb, longer_edge=longer_edge, shorter_edge=shorter_edge, strip_metadata=strip_metadata, webp_lossless=webp_lossless, **options))
+        return jobs
+
+    def iter_results(self, jobs):
+        """
+        Wykonuje zadania i zwraca wyniki w kolejności zakończenia (również błędy)
+
+        Args:
+            jobs (list): Lista ConversionJob
+
+        Yields:
+            BatchResult: Wynik każdego zadania, gdy tylko jest gotowy
+        """
+        self.last_profile_report = None
+        if not self.profiling or not jobs:
+            yield from self._iter_results(jobs)
+            return
+        from profiling import BatchProfiler
+        # Raporty obok wyników (katalog pierwszego pliku wynikowego)
+        profiler = BatchProfiler(os.path.dirname(os.path.abspath(jobs[0].output_path)))
+        profiler.start()
+        try:
+            yield from self._iter_results(jobs, profiler.worker_directory)
+        finally:
+            self.last_profile_report = profiler.stop()
+
+    def _iter_results(self, jobs, profile_directory=None):
+        if self.workers <= 1 or len(jobs) <= 1:
+            converter = ImageConverter()
+            converter.output_cache = self.output_cache
+            converter.pixel_cache = self.pixel_cache
+            converter.observer = self.observer
+            for index, job in enumerate(jobs):
+                yield _run_job(index, job, converter)
+            return
+
+        from concurrent.futures import ProcessPoolExecutor, BrokenExecutor, as_completed, wait
+        if profile_directory:
+            # Profile procesów roboczych są zapisywane przy ich zakończeniu - partia profilowana ma własną pulę
+            executor = ProcessPoolExecutor(max_workers=min(self.workers, len(jobs)), initializer=_init_worker, initargs=(self.output_cache, self.pixel_cache, self.observer is not None, profile_directory))
+        else:
+            executor = self._shared_executor()
+        futures = []
+        try:
+            try:
+                futures = [executor.submit(_run_job, index, job) for index, job in enumerate(jobs)]
+            except BrokenExecutor:
+                if profile_directory:
+                    raise
+                # Proces roboczy puli zakończył się awaryjnie między partiami - pula nie przyjmie zadań
+                self.close()
+                executor = self._shared_executor()
+                futures = [executor.submit(_run_job, index, job) for index, job in enumerate(jobs)]
+            for future in as_completed(futures):
+                batch_result = future.result()
+                if self.observer is not None and batch_result.ok:
+                    for event in batch_result.result.stages or ():
+                        self.observer(event)
+                yield batch_result
+        except BrokenExecutor:
+            if not profile_directory:
+                self.close()
+            raise
+        finally:
+            if profile_directory:
+                executor.shutdown(wait=True, cancel_futures=True)
+            else:
+                # Przerwanie iteracji anuluje zadania, które jeszcze się nie rozpoczęły, i czeka na trwające
+                for future in futures:
+                    future.cancel()
+                wait(futures)
+
+    def _shared_executor(self):
+        """
+        Zwraca pulę procesów używaną przez kolejne partie. Pula jest tworzona ponownie tylko wtedy,
+        gdy zmieniły się ustawienia przekazywane do inicjalizatora procesów roboczych.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        settings = (self.output_cache, self.pixel_cache, self.observer is not None)
+        if self._executor is not None and self._executor_settings != settings:
+            self.close()
+        if self._executor is None:
+            # Procesy robocze są uruchamiane w miarę potrzeb, do `workers`, i pozostają do `close`
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(*settings, None))
+            self._executor_settings = settings
+        return self._executor
+
+    def convert(self, input_paths, **options):
+        """
+        Buduje zadania dla plików i wykonuje je (skrót dla `build_jobs` + `iter_results`)
+
+        Yields:
+            BatchResult: Wynik każdego pliku w kolejności zakończenia
+        """
+        return self.iter_results(self.build_jobs(input_paths, **options))
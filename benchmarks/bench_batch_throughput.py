@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Mierzy przepustowość całych partii przez `BatchConverter` (ścieżka używana przez GUI, CLI
+i obserwowanie katalogu) dla 1..N procesów roboczych, bez limitu rozmiaru i z `max_size_kb`.
+Dla każdej konfiguracji zapisywane są: obrazy/s, MB/s (danych wejściowych), percentyle
+p50/p95/p99 czasu przetwarzania pliku i szczytowe zużycie pamięci (RSS).
+
+Korpus (domyślnie 1000 plików: zdjęcia JPEG i HEIC, zrzuty ekranu i obrazy z alfą PNG,
+0,5-3 MP) jest generowany deterministycznie i używany ponownie. Każda konfiguracja działa
+w osobnym procesie, aby szczytowy RSS dotyczył tylko jej.
+
+Pojedynczy przebieg partii waha się o 20-30%, dlatego każda konfiguracja jest uruchamiana
+`--repeats` razy (przebiegi konfiguracji są przeplatane, aby zmiany obciążenia maszyny rozkładały
+się na wszystkie), a przed pomiarami wykonywane są przebiegi rozgrzewające (`--warmup`, pomijane).
+Zapisywana jest mediana każdej metryki, najlepszy wynik i rozrzut (szum) metryk sprawdzanych.
+
+Wyniki są dopisywane do pliku historii (JSON Lines). Z `--baseline` porównywane są z zapisaną
+linią bazową: regresją (kod wyjścia 1) jest spadek obrazów/s lub wzrost p95 albo RSS, gdy zarówno
+mediana, jak i najlepszy wynik pogorszyły się o więcej niż próg - `--threshold` procent lub szum
+zmierzony w linii bazowej, jeśli jest większy. Szum bieżącego przebiegu nie podnosi progu (zaszumiony
+przebieg ukrywałby regresję); metryki, których szum przekracza próg, są zgłaszane osobno jako ostrzeżenie
+z zaleceniem powtórzenia pomiaru. Przy mniej niż MIN_GATE_REPEATS powtórzeniach porównanie jest tylko informacyjne. `--save-baseline` zapisuje
+bieżący przebieg jako linię bazową.
+
+Użycie:
+    python benchmarks/bench_batch_throughput.py [--files 1000] [--workers 1 2 4] [--max-size 300]
+        [--repeats 5] [--warmup 1] [--baseline throughput_baseline.json] [--save-baseline] [--threshold 10]
+"""
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import tempfile
+import resource
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import photo_like, screenshot_like, alpha_like, megapixel_size
+
+# Rodzaj pliku korpusu -> (generator, format zapisu, rozszerzenie); kolejne pliki biorą rodzaje po kolei
+KINDS = (
+    ("photo", photo_like, "JPEG", "jpg"),
+    ("photo", photo_like, "HEIF", "heic"),
+    ("screenshot", screenshot_like, "PNG", "png"),
+    ("alpha", alpha_like, "PNG", "png"),
+)
+MEGAPIXELS = (0.5, 1, 2, 3)
+# Metryki sprawdzane przy porównaniu z linią bazową: nazwa -> czy większa wartość jest lepsza
+GATED_METRICS = {"images_per_s": True, "p95_s": False, "peak_rss_mb": False}
+# Najmniejsza liczba powtórzeń (w bieżącym przebiegu i linii bazowej), przy której porównanie może zgłosić regresję
+MIN_GATE_REPEATS = 3
+
+def build_corpus(corpus_dir, files):
+    """
+    Generuje brakujące pliki korpusu (rodzaj, rozmiar i ziarno wynikają z numeru pliku)
+
+    Returns:
+        list: Ścieżki plików
+    """
+    os.makedirs(corpus_dir, exist_ok=True)
+    kinds = list(KINDS)
+    try:
+        from image_converter import load_heif
+        load_heif()
+    except ImportError:
+        print("Uwaga: pillow_heif niedostępny - korpus bez plików HEIC", file=sys.stderr)
+        kinds = [kind for kind in kinds if kind[2] != "HEIF"]
+    paths = []
+    for number in range(files):
+        name, generator, image_format, extension = kinds[number % len(kinds)]
+        megapixels = MEGAPIXELS[(number // len(kinds)) % len(MEGAPIXELS)]
+        path = os.path.join(corpus_dir, f"{number:05d}_{name}_{megapixels:g}mp.{extension}")
+        if not os.path.exists(path):
+            if number % 100 == 0:
+                print(f"Generowanie korpusu: {number}/{files}", file=sys.stderr)
+            image = generator(*megapixel_size(megapixels, random.Random(number).choice([(4, 3), (3, 4), (16, 9)])), seed=number)
+            image.save(path + ".tmp", format=image_format, quality=90)
+            os.replace(path + ".tmp", path)
+        paths.append(path)
+    return paths
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+def run_configuration(paths, workers, max_size_kb, output_formats, longer_edge):
+    """
+    Konwertuje korpus jedną konfiguracją (wywoływane w osobnym procesie przez `--run-one`)
+
+    Returns:
+        dict: Metryki przebiegu
+    """
+    from batch_converter import BatchConverter
+    batch_converter = BatchConverter(workers=workers)
+    with tempfile.TemporaryDirectory() as output_dir:
+        jobs = []
+        for index, output_format in enumerate(output_formats):
+            subset = paths[index::len(output_formats)]
+            jobs.extend(batch_converter.build_jobs(subset, output_format=output_format, output_directory=output_dir, max_size_kb=max_size_kb, longer_edge=longer_edge))
+        input_bytes = sum(os.path.getsize(job.input_path) for job in jobs)
+        latencies = []
+        failed = 0
+        start = time.perf_counter()
+        for batch_result in batch_converter.iter_results(jobs):
+            latencies.append(batch_result.elapsed)
+            if not batch_result.ok:
+                failed += 1
+        wall = time.perf_counter() - start
+    # RUSAGE_CHILDREN obejmuje tylko zakończone procesy potomne - pula jest zamykana przed odczytem
+    batch_converter.close()
+    # ru_maxrss w Linuksie w KB; dla procesów potomnych - największy z nich
+    own_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    worker_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return {
+        "files": len(jobs),
+        "failed": failed,
+        "wall_s": round(wall, 3),
+        "images_per_s": round(len(jobs) / wall, 3),
+        "mb_per_s": round(input_bytes / (1024 * 1024) / wall, 3),
+        "p50_s": round(percentile(latencies, 0.50), 4),
+        "p95_s": round(percentile(latencies, 0.95), 4),
+        "p99_s": round(percentile(latencies, 0.99), 4),
+        "peak_rss_mb": round(max(own_rss, worker_rss), 1),
+        "peak_main_rss_mb": round(own_rss, 1),
+        "peak_worker_rss_mb": round(worker_rss, 1) if workers > 1 else None,
+    }
+
+def median(values):
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+def summarize(samples):
+    """
+    Łączy metryki powtórzeń jednej konfiguracji: mediana każdej metryki liczbowej, a dla metryk
+    sprawdzanych także najlepszy wynik, rozrzut (max - min) w procentach mediany i wartości próbek
+
+    Returns:
+        dict: Metryki konfiguracji
+    """
+    summary = {"repeats": len(samples)}
+    for metric, value in samples[0].items():
+        values = [sample[metric] for sample in samples if sample.get(metric) is not None]
+        summary[metric] = round(median(values), 4) if values and isinstance(value, (int, float)) else value
+    summary["failed"] = max(sample["failed"] for sample in samples)
+    summary["best"], summary["noise_pct"], summary["samples"] = {}, {}, {}
+    for metric, higher_is_better in GATED_METRICS.items():
+        values = [sample[metric] for sample in samples if sample.get(metric) is not None]
+        if not values:
+            continue
+        summary["best"][metric] = max(values) if higher_is_better else min(values)
+        summary["noise_pct"][metric] = round((max(values) - min(values)) / summary[metric] * 100, 1) if summary[metric] else 0.0
+        summary["samples"][metric] = values
+    return summary
+
+def compare(results, baseline, threshold):
+    """
+    Porównuje wyniki z linią bazową. Metryka jest regresją, gdy mediana i najlepszy wynik
+    pogorszyły się o więcej niż próg: `threshold` albo większy szum zmierzony w linii bazowej.
+    Linia bazowa bez powtórzeń (starszy format) ma szum 0. Szum bieżącego przebiegu większy od progu
+    nie zmienia progu, tylko jest zgłaszany osobno.
+
+    Returns:
+        tuple: (opisy regresji, opisy metryk z szumem bieżącego przebiegu ponad próg, czy porównanie może zgłaszać regresje)
+    """
+    reference = {(entry["workers"], entry["max_size_kb"]): entry for entry in baseline["results"]}
+    gating = True
+    regressions = []
+    noisy = []
+    for entry in results:
+        base = reference.get((entry["workers"], entry["max_size_kb"]))
+        if base is None:
+            continue
+        if min(entry.get("repeats", 1), base.get("repeats", 1)) < MIN_GATE_REPEATS:
+            gating = False
+        for metric, higher_is_better in GATED_METRICS.items():
+            if not base.get(metric) or entry.get(metric) is None:
+                continue
+            limit = max(threshold, base.get("noise_pct", {}).get(metric, 0.0))
+            noise = entry.get("noise_pct", {}).get(metric, 0.0)
+            if noise > limit:
+                noisy.append(f"procesy={entry['workers']} max_size_kb={entry['max_size_kb']}: {metric} szum {noise:.1f}% > próg {limit:.1f}%")
+            base_best = base.get("best", {}).get(metric, base[metric])
+            entry_best = entry.get("best", {}).get(metric, entry[metric])
+            change = (entry[metric] - base[metric]) / base[metric] * 100
+            best_change = (entry_best - base_best) / base_best * 100 if base_best else 0.0
+            sign = -1 if higher_is_better else 1
+            if sign * change > limit and sign * best_change > limit:
+                regressions.append(f"procesy={entry['workers']} max_size_kb={entry['max_size_kb']}: {metric} mediana {base[metric]} -> {entry[metric]} ({change:+.1f}%), "
+                                   f"najlepszy {base_best} -> {entry_best} ({best_change:+.1f}%), próg {limit:.1f}%")
+    return regressions, noisy, gating
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--workers", type=int, nargs="+", default=None, help="Liczby procesów (domyślnie 1, 2, 4, ... do liczby rdzeni)")
+    parser.add_argument("--max-size", type=int, default=300, help="Limit rozmiaru w KB dla przebiegów z limitem")
+    parser.add_argument("--formats", nargs="+", default=["JPEG", "WebP"], help="Formaty wyjściowe przydzielane plikom po kolei")
+    parser.add_argument("--longer-edge", type=int, default=1600)
+    parser.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), "konwerter_bench_batch"))
+    parser.add_argument("--history", default="bench_throughput_history.jsonl", help="Plik historii (JSON Lines)")
+    parser.add_argument("--baseline", default=None, help="Plik linii bazowej JSON")
+    parser.add_argument("--save-baseline", action="store_true", help="Zapisz bieżący przebieg jako linię bazową (--baseline)")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Najmniejszy próg regresji w procentach (zwiększany do szumu zmierzonego w linii bazowej)")
+    parser.add_argument("--repeats", type=int, default=5, help="Liczba mierzonych przebiegów każdej konfiguracji")
+    parser.add_argument("--warmup", type=int, default=1, help="Liczba pomijanych przebiegów rozgrzewających")
+    parser.add_argument("--prepare", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--run-one", nargs=2, metavar=("WORKERS", "MAX_SIZE_KB"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    common = ["--files", str(args.files), "--corpus-dir", args.corpus_dir, "--longer-edge", str(args.longer_edge), "--formats", *args.formats]
+    if args.prepare:
+        build_corpus(args.corpus_dir, args.files)
+        return 0
+    if args.run_one:
+        paths = build_corpus(args.corpus_dir, args.files)
+        workers, max_size_kb = int(args.run_one[0]), int(args.run_one[1]) or None
+        print(json.dumps(run_configuration(paths, workers, max_size_kb, args.formats, args.longer_edge)))
+        return 0
+
+    workers_list = args.workers
+    if workers_list is None:
+        workers_list, count = [], 1
+        while count < (os.cpu_count() or 1):
+            workers_list.append(count)
+            count *= 2
+        workers_list.append(os.cpu_count() or 1)
+
+    # Korpus jest generowany w osobnym procesie: w Linuksie ru_maxrss procesu potomnego obejmuje
+    # pamięć rodzica z chwili fork, więc rodzic nie może urosnąć przy generowaniu obrazów
+    subprocess.run([sys.executable, os.path.abspath(__file__), "--prepare", *common], check=True)
+    configurations = [(workers, max_size_kb) for max_size_kb in (None, args.max_size) for workers in workers_list]
+    samples = {configuration: [] for configuration in configurations}
+    for repeat in range(args.warmup + max(1, args.repeats)):
+        label = f"rozgrzewka {repeat + 1}/{args.warmup}" if repeat < args.warmup else f"powtórzenie {repeat - args.warmup + 1}/{max(1, args.repeats)}"
+        print(f"Przebieg: {label}", file=sys.stderr)
+        for workers, max_size_kb in configurations:
+            command = [sys.executable, os.path.abspath(__file__), "--run-one", str(workers), str(max_size_kb or 0), *common]
+            completed = subprocess.run(command, capture_output=True, text=True, check=True)
+            if repeat >= args.warmup:
+                samples[(workers, max_size_kb)].append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    results = []
+    print(f"{'procesy':>8}{'max_size_kb':>12}{'obrazy/s':>10}{'szum %':>8}{'MB/s':>8}{'p50 [s]':>9}{'p95 [s]':>9}{'p99 [s]':>9}{'RSS [MB]':>10}{'błędy':>7}")
+    for workers, max_size_kb in configurations:
+        entry = {"workers": workers, "max_size_kb": max_size_kb, **summarize(samples[(workers, max_size_kb)])}
+        results.append(entry)
+        print(f"{workers:>8}{str(max_size_kb or '-'):>12}{entry['images_per_s']:>10.2f}{entry['noise_pct']['images_per_s']:>8.1f}{entry['mb_per_s']:>8.2f}{entry['p50_s']:>9.3f}{entry['p95_s']:>9.3f}{entry['p99_s']:>9.3f}{entry['peak_rss_mb']:>10.1f}{entry['failed']:>7}")
+
+    run = {
+        "benchmark": "batch_throughput",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count()},
+        "parameters": {"files": args.files, "repeats": max(1, args.repeats), "warmup": args.warmup, "formats": args.formats, "longer_edge": args.longer_edge, "max_size_kb": args.max_size},
+        "results": results,
+    }
+    with open(args.history, "a", encoding="utf-8") as f:
+        f.write(json.dumps(run, ensure_ascii=False) + "\n")
+    print(f"Wyniki dopisano do {args.history}")
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(run, f, indent=2, ensure_ascii=False)
+        print(f"Zapisano linię bazową {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions, noisy, gating = compare(results, baseline, args.threshold)
+        if noisy:
+            print("Uwaga: szum bieżącego przebiegu przekracza próg - wynik porównania jest niepewny, powtórz pomiar (np. większe --repeats, mniej obciążona maszyna):")
+            for entry in noisy:
+                print(f"  {entry}")
+        if not gating:
+            print(f"Uwaga: mniej niż {MIN_GATE_REPEATS} powtórzeń w bieżącym przebiegu lub w {args.baseline} - porównanie tylko informacyjne")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 0
+        if regressions:
+            print(f"BŁĄD: regresja względem {args.baseline} (próg {args.threshold:g}% lub szum linii bazowej):")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"Brak regresji względem {args.baseline} (próg {args.threshold:g}% lub szum linii bazowej)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
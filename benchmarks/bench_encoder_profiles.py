@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Porównuje profile nakładu kodera (ENCODER_PROFILES) na syntetycznym korpusie referencyjnym:
+czas zapisu i rozmiar pliku dla każdego profilu, formatu i rodzaju obrazu (zdjęcie, zrzut
+ekranu, obraz z kanałem alfa). Rozmiar podawany jest także względem profilu "max-compression".
+
+Użycie:
+    python benchmarks/bench_encoder_profiles.py [--megapixels 4] [--formats JPEG PNG WebP WebP_lossless TIFF] [--repeat 3]
+"""
+import io
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_converter import ImageConverter, ENCODER_PROFILES
+from synthetic import photo_like, screenshot_like, alpha_like, megapixel_size
+
+CORPUS = {"zdjęcie": photo_like, "zrzut": screenshot_like, "alfa": alpha_like}
+
+def encode(converter, image, format_key, profile):
+    """
+    Koduje obraz do pamięci z opcjami profilu
+
+    Returns:
+        tuple: (czas w sekundach, rozmiar w bajtach)
+    """
+    output_format = "WebP" if format_key == "WebP_lossless" else format_key
+    if output_format == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+    save_options = converter._build_save_options(image, output_format, webp_lossless=format_key == "WebP_lossless", encoder_profile=profile)
+    buffer = io.BytesIO()
+    start = time.perf_counter()
+    image.save(buffer, format=output_format, **save_options)
+    return time.perf_counter() - start, buffer.tell()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megapixels", type=float, default=4)
+    parser.add_argument("--formats", nargs="+", default=["JPEG", "PNG", "WebP", "WebP_lossless", "TIFF"])
+    parser.add_argument("--profiles", nargs="+", default=list(ENCODER_PROFILES))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    converter = ImageConverter()
+    size = megapixel_size(args.megapixels)
+    corpus = {name: generator(*size) for name, generator in CORPUS.items()}
+    print(f"Korpus {size[0]}x{size[1]} ({', '.join(corpus)})")
+    print(f"{'format':<15}{'obraz':<10}{'profil':<17}{'czas [s]':>10}{'rozmiar [KB]':>14}{'wzgl. max':>11}")
+    for format_key in args.formats:
+        for name, image in corpus.items():
+            results = {}
+            for profile in args.profiles:
+                times = []
+                for _ in range(args.repeat):
+                    elapsed, file_size = encode(converter, image, format_key, profile)
+                    times.append(elapsed)
+                results[profile] = (min(times), file_size)
+            reference = encode(converter, image, format_key, "max-compression")[1] if "max-compression" not in results else results["max-compression"][1]
+            for profile, (elapsed, file_size) in results.items():
+                print(f"{format_key:<15}{name:<10}{profile:<17}{elapsed:>10.3f}{file_size / 1024:>14.1f}{file_size / reference:>10.2f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Mierzy responsywność pętli zdarzeń interfejsów graficznych podczas konwersji partii:
+najdłuższy i 99. percentyl przestoju (czas, w którym pętla zdarzeń nie mogła obsłużyć
+zdarzeń), dla każdego interfejsu zarejestrowanego w FRONTENDS.
+
+- "qt" (qt_gui): prawdziwa aplikacja PyQt6 na platformie "offscreen"; przestoje są mierzone
+  zegarem QTimer, który odpala się tylko wtedy, gdy pętla zdarzeń działa (także wewnątrz
+  `QApplication.processEvents()` wywoływanego przez `start_conversion`).
+- "tk" (main_gui) i "tk_basic" (gui): bez wyświetlacza - `start_conversion` działa na
+  zastępczych widżetach (StringVar, Text, okno główne), a przestoje są liczone między
+  wywołaniami `update_idletasks()`/`update()`. `update_idletasks()` obsługuje tylko odświeżanie,
+  więc przestój wejścia (kliknięcia, klawiatura) obejmuje cały czas bez wywołania `update()`.
+
+Nowy interfejs dodaje się funkcją `measure_<nazwa>(paths, settings, probe)` w FRONTENDS.
+Wyniki trafiają do JSON; `--max-stall-ms` kończy skrypt kodem 1 po przekroczeniu progu.
+
+Użycie:
+    python benchmarks/bench_gui_responsiveness.py [--frontends qt tk tk_basic] [--files 5] [--megapixels 12]
+        [--format JPEG] [--max-size 500] [--output bench_gui.json] [--max-stall-ms 250]
+"""
+import os
+import sys
+import json
+import time
+import importlib.util
+import types
+import platform
+import argparse
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic import photo_like, megapixel_size
+
+
+class EventLoopProbe:
+    def __init__(self):
+        """
+        Rejestruje chwile, w których pętla zdarzeń mogła obsłużyć zdarzenia. "all" - wszystkie zdarzenia
+        (QTimer, `processEvents`, Tk `update`), "idle" - tylko odświeżanie (Tk `update_idletasks`).
+        """
+        self.started = None
+        self.stopped = None
+        self.ticks = []
+
+    def start(self):
+        self.started = time.perf_counter()
+
+    def stop(self):
+        self.stopped = time.perf_counter()
+
+    def pump(self, kind="all"):
+        if self.started is not None and self.stopped is None:
+            self.ticks.append((time.perf_counter(), kind))
+
+    def _gaps(self, kinds):
+        times = [self.started] + [moment for moment, kind in self.ticks if kind in kinds] + [self.stopped]
+        return [later - earlier for earlier, later in zip(times, times[1:])]
+
+    def stats(self):
+        """
+        Returns:
+            dict: Czas trwania i statystyki przestojów (w ms) dla odświeżania i wejścia
+        """
+        report = {"duration_ms": round((self.stopped - self.started) * 1000, 1), "pumps": len(self.ticks)}
+        for name, kinds in (("redraw", ("all", "idle")), ("input", ("all",))):
+            gaps = sorted(self._gaps(kinds))
+            report[f"{name}_max_stall_ms"] = round(gaps[-1] * 1000, 1)
+            report[f"{name}_p99_stall_ms"] = round(gaps[min(len(gaps) - 1, int(0.99 * len(gaps)))] * 1000, 1)
+            report[f"{name}_p50_stall_ms"] = round(gaps[len(gaps) // 2] * 1000, 1)
+        return report
+
+
+def measure_qt(paths, settings, probe, interval_ms=5):
+    """
+    Uruchamia `qt_gui.ImageConverterGUI.start_conversion` w aplikacji Qt na platformie offscreen
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtCore import QTimer
+    import qt_gui
+
+    app = QApplication.instance() or QApplication([])
+    window = qt_gui.ImageConverterGUI()
+    window.batch_converter.output_cache = None
+    window.settings.update(settings)
+    window.selected_files = list(paths)
+
+    timer = QTimer()
+    timer.setInterval(interval_ms)
+    timer.timeout.connect(probe.pump)
+
+    def run():
+        probe.start()
+        try:
+            window.start_conversion()
+        finally:
+            probe.stop()
+            timer.stop()
+            app.quit()
+
+    timer.start()
+    QTimer.singleShot(0, run)
+    app.exec()
+    window.close()
+    window.batch_converter.close()
+
+
+class _Variable:
+    """Zastępnik tk.StringVar/BooleanVar/DoubleVar"""
+    def __init__(self, value=None):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+class _Text:
+    """Zastępnik tk.Text dla `log_message`"""
+    def __init__(self):
+        self.lines = []
+
+    def config(self, **options):
+        pass
+
+    def delete(self, *args):
+        self.lines.clear()
+
+    def insert(self, index, text):
+        self.lines.append(text)
+
+    def see(self, index):
+        pass
+
+
+class _Root:
+    """Zastępnik okna głównego Tk: wywołania pętli zdarzeń trafiają do sondy"""
+    def __init__(self, probe):
+        self.probe = probe
+
+    def update_idletasks(self):
+        self.probe.pump("idle")
+
+    def update(self):
+        self.probe.pump("all")
+
+
+def _import_tk_frontend(module_name):
+    """
+    Importuje moduł interfejsu Tk. Jeśli brak tkinterdnd2 (przeciągnij i upuść jest potrzebne tylko
+    przy tworzeniu widżetów, których benchmark nie tworzy), podstawia pusty moduł tylko na czas importu.
+    """
+    if importlib.util.find_spec("tkinterdnd2") is not None:
+        return importlib.import_module(module_name)
+    sys.modules["tkinterdnd2"] = types.SimpleNamespace(DND_FILES="DND_Files", TkinterDnD=None)
+    try:
+        return importlib.import_module(module_name)
+    finally:
+        del sys.modules["tkinterdnd2"]
+
+
+def _measure_tk(module_name, paths, settings, probe):
+    from batch_converter import BatchConverter
+    from file_manager import FileManager
+    module = _import_tk_frontend(module_name)
+    # Instancja bez __init__ (który tworzy okno Tk); start_conversion korzysta tylko z poniższych atrybutów
+    gui = object.__new__(module.ImageConverterGUI)
+    gui.root = _Root(probe)
+    gui.settings = dict(settings)
+    gui.file_manager = FileManager()
+    gui.batch_converter = BatchConverter()
+    gui.selected_files = list(paths)
+    gui.log_text = _Text()
+    for name, key in (("max_size_var", "max_size"), ("longer_edge_var", "longer_edge"), ("shorter_edge_var", "shorter_edge"),
+                      ("suffix_var", "suffix"), ("output_format_var", "output_format"), ("output_dir_var", "output_directory"),
+                      ("delete_originals_var", "delete_originals"), ("encoder_profile_var", "encoder_profile"),
+                      ("profiling_var", "profiling")):
+        setattr(gui, name, _Variable(settings.get(key)))
+    gui.progress_var = _Variable(0.0)
+    probe.start()
+    try:
+        gui.start_conversion()
+    finally:
+        probe.stop()
+        gui.batch_converter.close()
+
+
+def measure_tk(paths, settings, probe):
+    _measure_tk("main_gui", paths, settings, probe)
+
+
+def measure_tk_basic(paths, settings, probe):
+    _measure_tk("gui", paths, settings, probe)
+
+
+FRONTENDS = {"qt": measure_qt, "tk": measure_tk, "tk_basic": measure_tk_basic}
+
+
+def build_corpus(corpus_dir, files, megapixels):
+    os.makedirs(corpus_dir, exist_ok=True)
+    paths = []
+    for number in range(files):
+        path = os.path.join(corpus_dir, f"gui_{number}_{megapixels:g}mp.jpg")
+        if not os.path.exists(path):
+            photo_like(*megapixel_size(megapixels), seed=number).save(path + ".tmp", format="JPEG", quality=92)
+            os.replace(path + ".tmp", path)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frontends", nargs="+", default=list(FRONTENDS), choices=list(FRONTENDS))
+    parser.add_argument("--files", type=int, default=5, help="Liczba plików (interfejsy przyjmują najwyżej 5)")
+    parser.add_argument("--megapixels", type=float, default=12)
+    parser.add_argument("--format", dest="output_format", default="JPEG")
+    parser.add_argument("--max-size", default="500", help="Limit rozmiaru w KB (pusty - bez limitu)")
+    parser.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), "konwerter_bench_gui"))
+    parser.add_argument("--output", default="bench_gui.json")
+    parser.add_argument("--max-stall-ms", type=float, default=None, help="Próg najdłuższego przestoju wejścia; przekroczenie - kod wyjścia 1")
+    args = parser.parse_args()
+
+    paths = build_corpus(args.corpus_dir, args.files, args.megapixels)
+    output_path = os.path.abspath(args.output)
+    results = {}
+    failed = False
+    with tempfile.TemporaryDirectory() as work_dir:
+        settings = {"max_size": args.max_size, "longer_edge": "", "shorter_edge": "", "suffix": "_bench", "output_format": args.output_format,
+                    "output_directory": os.path.join(work_dir, "out"), "delete_originals": False, "use_output_cache": False, "encoder_profile": "balanced"}
+        # Interfejsy czytają settings.json z bieżącego katalogu - pomiar nie może zmienić ustawień użytkownika
+        previous_dir = os.getcwd()
+        os.chdir(work_dir)
+        try:
+            for name in args.frontends:
+                probe = EventLoopProbe()
+                try:
+                    FRONTENDS[name](paths, settings, probe)
+                except ImportError as e:
+                    results[name] = {"skipped": f"brak modułu: {e.name}"}
+                    print(f"{name:<10} pominięty (brak modułu {e.name})")
+                    continue
+                results[name] = probe.stats()
+                stats = results[name]
+                print(f"{name:<10} czas {stats['duration_ms']:>9.1f} ms  przestój wejścia maks. {stats['input_max_stall_ms']:>9.1f} ms  p99 {stats['input_p99_stall_ms']:>9.1f} ms"
+                      f"  odświeżanie maks. {stats['redraw_max_stall_ms']:>9.1f} ms  p99 {stats['redraw_p99_stall_ms']:>9.1f} ms")
+                if args.max_stall_ms is not None and stats["input_max_stall_ms"] > args.max_stall_ms:
+                    print(f"BŁĄD: {name}: przestój {stats['input_max_stall_ms']:.1f} ms przekracza próg {args.max_stall_ms:g} ms")
+                    failed = True
+        finally:
+            os.chdir(previous_dir)
+
+    report = {
+        "benchmark": "gui_responsiveness",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count()},
+        "parameters": {"files": args.files, "megapixels": args.megapixels, "output_format": args.output_format, "max_size_kb": args.max_size},
+        "results": results,
+    }
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Wyniki zapisano w {output_path}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
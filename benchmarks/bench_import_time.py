@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Mierzy czas zimnego importu modułów konwertera (`python -X importtime`, każdy pomiar w nowym
+procesie) i kończy się błędem, gdy mediana przekracza budżet albo gdy import wciąga moduły,
+które powinny być ładowane dopiero przy pierwszym użyciu (pillow_heif, pula procesów, GUI, numpy).
+
+Użycie:
+    python benchmarks/bench_import_time.py [--budget-ms 120] [--repeat 7] [--modules cli image_converter]
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Moduły, których nie może zaimportować sam import silnika lub CLI
+FORBIDDEN = ("pillow_heif", "concurrent.futures.process", "multiprocessing.shared_memory", "numpy", "tkinter", "PyQt6", "kivy")
+
+def measure(module):
+    """
+    Importuje moduł w nowym procesie z `-X importtime`
+
+    Returns:
+        tuple: (łączny czas importu modułu w ms, zbiór zaimportowanych modułów)
+    """
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT, capture_output=True, text=True, check=True)
+    total_us = None
+    imported = set()
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        name = name.strip()
+        imported.add(name)
+        if name == module:
+            total_us = int(cumulative)
+    return total_us / 1000, imported
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=["image_converter", "batch_converter", "cli"])
+    parser.add_argument("--budget-ms", type=float, default=120.0, help="Maksymalna mediana czasu importu jednego modułu")
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'moduł':<20}{'mediana [ms]':>14}{'min [ms]':>10}")
+    for module in args.modules:
+        # Pierwsze uruchomienie kompiluje pliki .pyc - nie wliczamy go do pomiaru
+        measure(module)
+        times = []
+        imported = set()
+        for _ in range(args.repeat):
+            elapsed, imported = measure(module)
+            times.append(elapsed)
+        median = statistics.median(times)
+        print(f"{module:<20}{median:>14.1f}{min(times):>10.1f}")
+        if median > args.budget_ms:
+            print(f"BŁĄD: import {module} przekracza budżet {args.budget_ms:.0f} ms")
+            failed = True
+        unexpected = sorted(name for name in imported if name.split(".")[0] in FORBIDDEN or name in FORBIDDEN)
+        if unexpected:
+            print(f"BŁĄD: import {module} ładuje moduły odraczane do pierwszego użycia: {', '.join(unexpected)}")
+            failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
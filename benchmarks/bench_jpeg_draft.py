@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Porównuje dekodowanie JPEG w trybie draft (skala 1/2, 1/4, 1/8) z pełnym dekodowaniem
+przy zmniejszaniu w `convert_heic_to_format`: czas, szczytowe RSS i różnicę pikseli.
+
+Użycie:
+    python benchmarks/bench_jpeg_draft.py [--megapixels 24] [--edge 1600] [--tolerance 2.0]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageChops, ImageStat
+from image_converter import ImageConverter
+from synthetic import photo_like, megapixel_size
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def _peak_rss_kb():
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def _generate(path, size, queue):
+    # Generowanie w osobnym procesie, aby nie zawyżać szczytowego RSS procesów pomiarowych
+    photo_like(*size).save(path, quality=92)
+    queue.put(None)
+
+def _run(input_path, output_path, new_resolution, jpeg_draft, queue):
+    # Uruchamiane w osobnym procesie, aby szczytowe RSS dotyczyło tylko jednej ścieżki
+    start = time.perf_counter()
+    ImageConverter().convert_heic_to_format(input_path, output_path, output_format="BMP", new_resolution=new_resolution, jpeg_draft=jpeg_draft)
+    queue.put((time.perf_counter() - start, _peak_rss_kb()))
+
+def _in_subprocess(target, *args):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=target, args=args + (queue,))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megapixels", type=float, default=24)
+    parser.add_argument("--edge", type=int, default=1600, help="Dłuższa krawędź wyniku")
+    parser.add_argument("--tolerance", type=float, default=2.0, help="Dopuszczalna średnia różnica pikseli (0-255)")
+    args = parser.parse_args()
+
+    width, height = megapixel_size(args.megapixels, (3, 2))
+    new_resolution = (args.edge, int(args.edge * height / width))
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "source.jpg")
+        _in_subprocess(_generate, source, (width, height))
+        outputs = {}
+        print(f"Źródło {width}x{height} JPEG -> {new_resolution[0]}x{new_resolution[1]}")
+        print(f"{'ścieżka':<10}{'czas [s]':>10}{'RSS [MB]':>10}")
+        for label, draft in (("pełna", False), ("draft", True)):
+            outputs[label] = os.path.join(tmp, f"{label}.bmp")
+            elapsed, rss = _in_subprocess(_run, source, outputs[label], new_resolution, draft)
+            rss_text = f"{rss / 1024:.0f}" if rss is not None else "-"
+            print(f"{label:<10}{elapsed:>10.3f}{rss_text:>10}")
+
+        with Image.open(outputs["pełna"]) as full, Image.open(outputs["draft"]) as draft:
+            diff = ImageChops.difference(full.convert("RGB"), draft.convert("RGB"))
+            mean_diff = sum(ImageStat.Stat(diff).mean) / 3
+            max_diff = max(high for _, high in diff.getextrema())
+        print(f"Różnica pikseli: średnia {mean_diff:.3f}, maksymalna {max_diff}")
+        if mean_diff > args.tolerance:
+            print(f"BŁĄD: średnia różnica przekracza tolerancję {args.tolerance}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
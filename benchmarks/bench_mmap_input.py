@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Porównuje czytanie plików wejściowych przez mapę pamięci (`ImageConverter.memory_map_inputs`)
+z dotychczasowym otwieraniem przez buforowany obiekt pliku: czas i szczytowe RSS.
+Każdy pomiar działa w osobnym procesie.
+
+Użycie:
+    python benchmarks/bench_mmap_input.py [--megapixels 48] [--formats TIFF PNG JPEG] [--repeat 3]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_converter import ImageConverter
+from synthetic import photo_like, megapixel_size
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SAVE_OPTIONS = {
+    "TIFF": {"compression": "tiff_lzw"},
+    "PNG": {"compress_level": 1},
+    "JPEG": {"quality": 92},
+}
+EXTENSIONS = {"TIFF": "tiff", "PNG": "png", "JPEG": "jpg"}
+
+def _peak_rss_kb():
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def _generate(paths, size, queue):
+    # Generowanie w osobnym procesie, aby nie zawyżać szczytowego RSS procesów pomiarowych
+    image = photo_like(*size)
+    for output_format, path in paths.items():
+        image.save(path, format=output_format, **SAVE_OPTIONS[output_format])
+    queue.put(None)
+
+def _run(input_path, output_path, memory_map, repeat, queue):
+    converter = ImageConverter()
+    converter.memory_map_inputs = memory_map
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        converter.convert_heic_to_format(input_path, output_path, output_format="BMP", longer_edge=1600, jpeg_draft=False)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    queue.put((best, _peak_rss_kb()))
+
+def _in_subprocess(target, *args):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=target, args=args + (queue,))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megapixels", type=float, default=48)
+    parser.add_argument("--formats", nargs="+", default=["TIFF", "PNG", "JPEG"], choices=list(SAVE_OPTIONS))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    size = megapixel_size(args.megapixels)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {output_format: os.path.join(tmp, f"source.{EXTENSIONS[output_format]}") for output_format in args.formats}
+        _in_subprocess(_generate, paths, size)
+        output_path = os.path.join(tmp, "output.bmp")
+        print(f"Źródło {size[0]}x{size[1]} -> 1600 px (BMP)")
+        print(f"{'format':<8}{'MB':>8}{'plik [s]':>10}{'mmap [s]':>10}{'RSS plik':>10}{'RSS mmap':>10}")
+        for output_format, path in paths.items():
+            file_time, file_rss = _in_subprocess(_run, path, output_path, False, args.repeat)
+            map_time, map_rss = _in_subprocess(_run, path, output_path, True, args.repeat)
+            rss_text = [f"{rss / 1024:.0f}" if rss is not None else "-" for rss in (file_rss, map_rss)]
+            print(f"{output_format:<8}{os.path.getsize(path) / 1048576:>8.1f}{file_time:>10.3f}{map_time:>10.3f}{rss_text[0]:>10}{rss_text[1]:>10}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Porównuje silnik skalowania `ImageConverter.resize_image` z dotychczasowym jednoetapowym
+`resize(..., LANCZOS)` dla typowych współczynników zmniejszenia: czas i różnicę pikseli.
+
+Użycie:
+    python benchmarks/bench_resize.py [--megapixels 12] [--ratios 1.5 2 3 4 6 8 12 16] [--repeat 3] [--reducing-gap 3.0]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageChops, ImageStat
+from image_converter import ImageConverter
+from synthetic import photo_like, megapixel_size
+
+def best_time(function, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megapixels", type=float, default=12)
+    parser.add_argument("--ratios", type=float, nargs="+", default=[1.5, 2, 3, 4, 6, 8, 12, 16])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--reducing-gap", type=float, default=None, help="Nadpisuje ImageConverter.resize_reducing_gap")
+    args = parser.parse_args()
+
+    converter = ImageConverter()
+    if args.reducing_gap is not None:
+        converter.resize_reducing_gap = args.reducing_gap
+    width, height = megapixel_size(args.megapixels)
+    image = photo_like(width, height)
+    image.load()
+    print(f"Źródło {width}x{height}")
+    print(f"{'współczynnik':>12}{'LANCZOS [s]':>13}{'silnik [s]':>12}{'przysp.':>9}{'śr. różn.':>11}{'maks. różn.':>13}")
+    for ratio in args.ratios:
+        new_resolution = (int(width / ratio), int(height / ratio))
+        old_time, old_result = best_time(lambda: image.resize(new_resolution, Image.Resampling.LANCZOS), args.repeat)
+        new_time, new_result = best_time(lambda: converter.resize_image(image, new_resolution), args.repeat)
+        diff = ImageChops.difference(old_result, new_result)
+        mean_diff = sum(ImageStat.Stat(diff).mean) / 3
+        max_diff = max(high for _, high in diff.getextrema())
+        print(f"{ratio:>12g}{old_time:>13.3f}{new_time:>12.3f}{old_time / new_time:>8.1f}x{mean_diff:>11.3f}{max_diff:>13}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Mierzy osobno każdy etap `ImageConverter.convert_heic_to_format` na deterministycznym korpusie
+syntetycznym (zdjęcie, zrzut ekranu, obraz z kanałem alfa; domyślnie 1, 12, 24 i 48 MP):
+otwarcie (nagłówek), dekodowanie, konwersję trybu, skalowanie, kodowanie, wyszukiwanie jakości
+dla max_size_kb i zapis na dysk. Wyniki są zapisywane w JSON, aby można było porównywać przebiegi.
+
+Korpus jest generowany przy pierwszym uruchomieniu w katalogu `--corpus-dir` i używany ponownie
+(pliki są deterministyczne). Zdjęcia są zapisywane jako HEIC (jeśli dostępny jest pillow_heif)
+i JPEG, zrzuty ekranu i obrazy z alfą jako PNG. Skrypt nie wymaga dostępu do sieci.
+
+Użycie:
+    python benchmarks/bench_stages.py [--megapixels 1 12 24 48] [--format JPEG] [--longer-edge 2048]
+        [--max-size 500] [--repeat 3] [--output bench_stages.json]
+"""
+import io
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import PIL
+from image_converter import ImageConverter, load_heif
+from synthetic import photo_like, screenshot_like, alpha_like, megapixel_size
+
+STAGES = ("open", "decode", "mode_convert", "resize", "encode", "size_limit_search", "write")
+# Rodzaj obrazu -> (generator, formaty plików wejściowych)
+CORPUS = {
+    "photo": (photo_like, ("HEIC", "JPEG")),
+    "screenshot": (screenshot_like, ("PNG",)),
+    "alpha": (alpha_like, ("PNG",)),
+}
+EXTENSIONS = {"HEIC": "heic", "JPEG": "jpg", "PNG": "png"}
+
+def heif_available():
+    try:
+        load_heif()
+        return True
+    except ImportError:
+        return False
+
+def build_corpus(corpus_dir, megapixels, input_formats):
+    """
+    Generuje brakujące pliki korpusu
+
+    Returns:
+        list: Krotki (rodzaj, megapiksele, format wejściowy, ścieżka)
+    """
+    os.makedirs(corpus_dir, exist_ok=True)
+    entries = []
+    for kind, (generator, formats) in CORPUS.items():
+        for mp in megapixels:
+            image = None
+            for input_format in formats:
+                if input_format not in input_formats:
+                    continue
+                path = os.path.join(corpus_dir, f"{kind}_{mp:g}mp.{EXTENSIONS[input_format]}")
+                if not os.path.exists(path):
+                    if image is None:
+                        print(f"Generowanie {kind} {mp:g} MP...", file=sys.stderr)
+                        image = generator(*megapixel_size(mp))
+                    temp_path = path + ".tmp"
+                    if input_format == "HEIC":
+                        image.save(temp_path, format="HEIF", quality=90)
+                    elif input_format == "JPEG":
+                        image.save(temp_path, format="JPEG", quality=92)
+                    else:
+                        image.save(temp_path, format="PNG", compress_level=6)
+                    os.replace(temp_path, path)
+                entries.append((kind, mp, input_format, path))
+    return entries
+
+def run_stages(converter, path, output_path, output_format, longer_edge, max_size_kb):
+    """
+    Wykonuje potok konwersji etap po etapie (te same metody, których używa `_convert`)
+
+    Returns:
+        dict: Czas każdego etapu w sekundach oraz wymiary i rozmiary plików
+    """
+    timings = {}
+    start = time.perf_counter()
+    source, source_size = converter._open_header(path)
+    timings["open"] = time.perf_counter() - start
+
+    new_resolution = converter.calculate_dimensions(*source_size, longer_edge) if longer_edge else None
+    start = time.perf_counter()
+    image = converter._decode_source(source, new_resolution)
+    image.load()
+    timings["decode"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if image.mode != "RGB" and output_format != "PNG":
+        image = image.convert("RGB")
+    timings["mode_convert"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if new_resolution:
+        image = converter.resize_image(image, new_resolution)
+    timings["resize"] = time.perf_counter() - start
+
+    save_options = converter._build_save_options(image, output_format)
+    start = time.perf_counter()
+    buffer = converter._encode_to_buffer(image, output_format, save_options)
+    timings["encode"] = time.perf_counter() - start
+
+    timings["size_limit_search"] = None
+    search_encodes = None
+    if max_size_kb and output_format in ("JPEG", "WebP"):
+        start = time.perf_counter()
+        search_encodes = converter._save_with_size_limit(image, io.BytesIO(), max_size_kb, output_format, base_save_options=save_options)
+        timings["size_limit_search"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    converter._write_buffer(buffer, output_path)
+    timings["write"] = time.perf_counter() - start
+    return timings, {"source_size": list(source_size), "output_size": list(image.size), "input_bytes": os.path.getsize(path), "output_bytes": buffer.tell(), "search_encodes": search_encodes}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[1, 12, 24, 48])
+    parser.add_argument("--inputs", nargs="+", default=["HEIC", "JPEG", "PNG"], help="Formaty plików wejściowych korpusu")
+    parser.add_argument("--format", dest="output_format", default="JPEG")
+    parser.add_argument("--longer-edge", type=int, default=2048, help="Dłuższa krawędź wyniku (0 - bez skalowania)")
+    parser.add_argument("--max-size", type=int, default=500, help="Limit rozmiaru w KB dla etapu wyszukiwania jakości (0 - pomiń)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), "konwerter_bench_corpus"))
+    parser.add_argument("--output", default="bench_stages.json", help="Plik wyników JSON")
+    args = parser.parse_args()
+
+    input_formats = set(args.inputs)
+    if "HEIC" in input_formats and not heif_available():
+        print("Uwaga: pillow_heif niedostępny - pomijam wejście HEIC", file=sys.stderr)
+        input_formats.discard("HEIC")
+    corpus = build_corpus(args.corpus_dir, args.megapixels, input_formats)
+
+    converter = ImageConverter()
+    results = []
+    extension = converter.formats[args.output_format]
+    print(f"{'obraz':<12}{'MP':>5}{'wejście':>9}" + "".join(f"{stage:>19}" for stage in STAGES))
+    with tempfile.TemporaryDirectory() as output_dir:
+        for kind, mp, input_format, path in corpus:
+            runs = []
+            details = None
+            for _ in range(args.repeat):
+                output_path = os.path.join(output_dir, f"out.{extension}")
+                timings, details = run_stages(converter, path, output_path, args.output_format, args.longer_edge or None, args.max_size or None)
+                runs.append(timings)
+            medians = {}
+            for stage in STAGES:
+                values = [run[stage] for run in runs if run[stage] is not None]
+                medians[stage] = statistics.median(values) if values else None
+            results.append({"image": kind, "megapixels": mp, "input_format": input_format, "median_s": medians, "runs_s": runs, **details})
+            print(f"{kind:<12}{mp:>5g}{input_format:>9}" + "".join(f"{medians[stage]:>19.4f}" if medians[stage] is not None else f"{'-':>19}" for stage in STAGES))
+
+    report = {
+        "benchmark": "stages",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "pillow": PIL.__version__,
+            "pillow_heif": sys.modules["pillow_heif"].__version__ if "pillow_heif" in sys.modules else None,
+        },
+        "parameters": {"output_format": args.output_format, "longer_edge": args.longer_edge, "max_size_kb": args.max_size, "repeat": args.repeat},
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Wyniki zapisano w {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import random
+from PIL import Image, ImageDraw, ImageFilter
+
+# Deterministyczne generatory obrazów syntetycznych dla benchmarków (bez plików próbek)
+
+def _noise_image(size, seed, mode="RGB"):
+    """
+    Zwraca obraz z szumem jednostajnym wygenerowanym deterministycznie z ziarna
+    """
+    channels = len(mode)
+    rng = random.Random(seed)
+    return Image.frombytes(mode, size, rng.randbytes(size[0] * size[1] * channels))
+
+def photo_like(width, height, seed=0):
+    """
+    Generuje obraz przypominający zdjęcie: gładkie plamy barwne z drobnym ziarnem
+
+    Args:
+        width (int): Szerokość
+        height (int): Wysokość
+        seed (int): Ziarno generatora
+
+    Returns:
+        PIL.Image: Obraz w trybie RGB
+    """
+    coarse = _noise_image((max(2, width // 64), max(2, height // 64)), seed)
+    image = coarse.resize((width, height), Image.Resampling.BICUBIC)
+    # Drobne ziarno z powtarzanej tekstury, aby nie generować losowych bajtów dla całego obrazu
+    tile = _noise_image((256, 256), seed + 1).filter(ImageFilter.GaussianBlur(1))
+    grain = Image.new("RGB", (width, height))
+    for y in range(0, height, 256):
+        for x in range(0, width, 256):
+            grain.paste(tile, (x, y))
+    return Image.blend(image, grain, 0.15)
+
+def screenshot_like(width, height, seed=0):
+    """
+    Generuje obraz przypominający zrzut ekranu: jednolite tło, prostokąty i linie tekstu
+
+    Returns:
+        PIL.Image: Obraz w trybie RGB
+    """
+    rng = random.Random(seed)
+    image = Image.new("RGB", (width, height), (246, 246, 246))
+    draw = ImageDraw.Draw(image)
+    for _ in range(max(4, width * height // 200000)):
+        x0, y0 = rng.randrange(width), rng.randrange(height)
+        x1, y1 = min(width, x0 + rng.randrange(40, 600)), min(height, y0 + rng.randrange(20, 300))
+        color = tuple(rng.randrange(256) for _ in range(3))
+        draw.rectangle((x0, y0, x1, y1), fill=color)
+    for y in range(10, height, 24):
+        x = 10
+        while x < width - 20:
+            word = rng.randrange(10, 80)
+            draw.rectangle((x, y, min(width - 10, x + word), y + 10), fill=(40, 40, 40))
+            x += word + 8
+    return image
+
+def alpha_like(width, height, seed=0):
+    """
+    Generuje obraz z kanałem alfa: zdjęcie z eliptyczną, rozmytą maską przezroczystości
+
+    Returns:
+        PIL.Image: Obraz w trybie RGBA
+    """
+    image = photo_like(width, height, seed).convert("RGBA")
+    mask = Image.new("L", (width, height), 0)
+    ImageDraw.Draw(mask).ellipse((width // 8, height // 8, width * 7 // 8, height * 7 // 8), fill=255)
+    image.putalpha(mask.filter(ImageFilter.GaussianBlur(max(1, min(width, height) // 50))))
+    return image
+
+def megapixel_size(megapixels, aspect=(4, 3)):
+    """
+    Zwraca rozmiar (szerokość, wysokość) o zadanej liczbie megapikseli i proporcjach
+    """
+    unit = (megapixels * 1_000_000 / (aspect[0] * aspect[1])) ** 0.5
+    return (int(unit * aspect[0]), int(unit * aspect[1]))
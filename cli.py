@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Wsadowy konwerter obrazów bez interfejsu graficznego. Importuje tylko Pillow i pillow_heif
+(bez Tk, PyQt6 i Kivy), więc nadaje się do zadań cron i kontenerów bez ekranu.
+
+Ustawienia są wczytywane z `settings.json` (ConfigManager), a flagi nadpisują pojedyncze wartości.
+Dla każdego pliku wypisywana jest jedna linia JSON z wynikiem.
+
+Użycie:
+    python cli.py zdjęcia/*.heic katalog/ "**/*.jpg" [--format WebP] [--max-size 300] [--workers 4]
+    find . -name "*.heic" | python cli.py -
+"""
+import os
+import sys
+import glob
+import json
+import argparse
+from config import ConfigManager
+from file_manager import FileManager
+from batch_converter import BatchConverter, options_from_settings
+from instrumentation import summarize, dominant_stage
+
+
+def expand_inputs(arguments, stdin=None):
+    """
+    Rozwija argumenty wejściowe do listy plików: ścieżki plików, wzorce glob (także `**`),
+    katalogi (przeszukiwane rekurencyjnie) i "-" oznaczające ścieżki czytane ze standardowego wejścia
+
+    Args:
+        arguments (list): Argumenty z wiersza poleceń
+        stdin (file object, optional): Strumień dla "-". Domyślnie sys.stdin.
+
+    Returns:
+        list: Ścieżki plików bez powtórzeń, w kolejności podania
+    """
+    file_manager = FileManager()
+    paths = []
+    for argument in arguments:
+        if argument == "-":
+            paths.extend(line.strip() for line in (stdin or sys.stdin) if line.strip())
+        elif os.path.isdir(argument):
+            paths.extend(sorted(path for _, path, _ in file_manager.scan_input_files(argument)))
+        elif glob.has_magic(argument):
+            paths.extend(sorted(path for path in glob.glob(argument, recursive=True) if os.path.isfile(path)))
+        else:
+            paths.append(argument)
+    return list(dict.fromkeys(paths))
+
+
+def result_record(batch_result):
+    """
+    Zamienia BatchResult na słownik do zapisania jako linia JSON
+    """
+    record = {"input": batch_result.input_path, "output": batch_result.output_path, "ok": batch_result.ok, "elapsed": round(batch_result.elapsed, 4)}
+    if batch_result.ok:
+        result = batch_result.result
+        record.update({
+            "source_size": list(result.source_size),
+            "output_size": list(result.output_size),
+            "file_size": result.file_size,
+            "encode_count": result.encode_count,
+            "cached": result.cached,
+        })
+        if result.stages:
+            # Łączny czas etapów i etap dominujący (np. "decode" - dekodowanie HEIC, "size_limit_search" - pętla jakości)
+            record["stages"] = {stage: round(elapsed, 4) for stage, elapsed in summarize(result.stages).items()}
+            record["bound"] = dominant_stage(result.stages)
+        if result.budget is not None:
+            # Czas osiągnięty względem budżetu, wybrany profil kodera i obniżenia nakładu
+            record["budget"] = {
+                "time_budget": result.budget.time_budget,
+                "elapsed": round(result.budget.elapsed, 4),
+                "within_budget": result.budget.within_budget,
+                "encoder_profile": result.budget.encoder_profile,
+                "degraded": result.budget.degraded,
+            }
+    else:
+        record["error"] = batch_result.error
+    return record
+
+
+def _separate_json_output():
+    """
+    Zwraca strumień dla linii JSON i kieruje pozostałe komunikaty (np. ostrzeżenia silnika
+    wypisywane przez print, także w procesach roboczych) na standardowe wyjście błędów
+    """
+    sys.stdout.flush()
+    try:
+        output = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8")
+        os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+        return output
+    except (AttributeError, OSError, ValueError):
+        # Strumień bez deskryptora pliku (np. podstawiony w testach)
+        output = sys.stdout
+        sys.stdout = sys.stderr
+        return output
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="Pliki, wzorce glob, katalogi lub \"-\" (ścieżki ze standardowego wejścia)")
+    parser.add_argument("--config", default="settings.json", help="Plik ustawień (domyślnie settings.json)")
+    parser.add_argument("--format", dest="output_format", help="Format wyjściowy (JPEG, PNG, BMP, TIFF, WebP, GIF)")
+    parser.add_argument("--suffix", help="Sufiks nazw plików wynikowych")
+    parser.add_argument("--output-dir", dest="output_directory", help="Katalog wyjściowy")
+    parser.add_argument("--max-size", dest="max_size", help="Maksymalny rozmiar pliku w KB")
+    parser.add_argument("--longer-edge", dest="longer_edge", help="Dłuższa krawędź wyniku")
+    parser.add_argument("--shorter-edge", dest="shorter_edge", help="Krótsza krawędź wyniku")
+    parser.add_argument("--strip-metadata", dest="strip_metadata", action="store_true", default=None, help="Usuń metadane")
+    parser.add_argument("--webp-lossless", dest="webp_lossless", action="store_true", default=None, help="WebP bezstratny")
+    parser.add_argument("--number", dest="number_output_files", action="store_true", default=None, help="Dodaj prefiks numeryczny")
+    parser.add_argument("--delete-originals", dest="delete_originals", action="store_true", default=None, help="Usuń oryginały po udanej konwersji")
+    parser.add_argument("--keep-originals", dest="delete_originals", action="store_false", help="Nie usuwaj oryginałów (nadpisuje ustawienia)")
+    parser.add_argument("--profile", dest="encoder_profile", help="Profil kodera (fast, balanced, max-compression lub profil z \"encoder_profiles\" w ustawieniach)")
+    parser.add_argument("--time-budget", dest="time_budget", help="Budżet czasu na plik w sekundach (nakład kodera jest dobierany do budżetu)")
+    parser.add_argument("--workers", type=int, default=None, help="Liczba procesów roboczych (domyślnie liczba rdzeni)")
+    parser.add_argument("--stages", nargs="?", const="", default=None, metavar="PLIK", help="Dodaj czasy etapów konwersji do wyników; z PLIKIEM - dopisuj też zdarzenia etapów jako JSON Lines")
+    parser.add_argument("--profiling", dest="profiling", action="store_true", default=None, help="Profiluj partię (cProfile + tracemalloc); raporty .pstats i .txt obok wyników")
+    parser.add_argument("--cache", dest="use_output_cache", action="store_true", default=None, help="Używaj pamięci podręcznej wyników (pomijaj pliki niezmienione od poprzedniego uruchomienia)")
+    parser.add_argument("--no-cache", dest="use_output_cache", action="store_false", help="Nie używaj pamięci podręcznej wyników (nadpisuje ustawienia)")
+    parser.add_argument("--pixel-cache", dest="use_pixel_cache", action="store_true", default=None, help="Używaj pamięci podręcznej pikseli (ponowna konwersja tych samych plików do innego formatu lub limitu rozmiaru bez dekodowania i skalowania)")
+    parser.add_argument("--no-pixel-cache", dest="use_pixel_cache", action="store_false", help="Nie używaj pamięci podręcznej pikseli (nadpisuje ustawienia)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    settings = ConfigManager(args.config).load_settings() if os.path.exists(args.config) else ConfigManager().get_default_settings()
+    settings = dict(settings)
+    # Flagi podane w wierszu poleceń nadpisują ustawienia
+    for name in ("output_format", "suffix", "output_directory", "max_size", "longer_edge", "shorter_edge", "strip_metadata", "webp_lossless", "number_output_files", "delete_originals", "encoder_profile", "time_budget", "profiling", "use_output_cache", "use_pixel_cache"):
+        value = getattr(args, name)
+        if value is not None:
+            settings[name] = value
+
+    batch_converter = BatchConverter(workers=args.workers)
+    batch_converter.profiling = bool(settings.get("profiling", False))
+    if args.stages is not None:
+        from instrumentation import JsonLinesObserver, ignore_event
+        batch_converter.observer = JsonLinesObserver(args.stages) if args.stages else ignore_event
+    if settings.get("use_output_cache", False):
+        from output_cache import OutputCache
+        batch_converter.output_cache = OutputCache()
+    if settings.get("use_pixel_cache", False):
+        from pixel_cache import PixelCache
+        batch_converter.pixel_cache = PixelCache()
+
+    try:
+        options = options_from_settings(settings)
+    except Exception as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    if options["output_directory"]:
+        FileManager().ensure_directory_exists(options["output_directory"])
+    input_paths = expand_inputs(args.inputs)
+    jobs = batch_converter.build_jobs(input_paths, **options)
+
+    output = _separate_json_output()
+    failed = 0
+    with batch_converter:
+        for batch_result in batch_converter.iter_results(jobs):
+            record = result_record(batch_result)
+            if batch_result.ok and settings.get("delete_originals"):
+                try:
+                    os.remove(batch_result.input_path)
+                    record["deleted_original"] = True
+                except OSError as e:
+                    record["deleted_original"] = False
+                    record["delete_error"] = str(e)
+            if not batch_result.ok:
+                failed += 1
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+    if batch_converter.last_profile_report:
+        print(f"Raport profilowania: {batch_converter.last_profile_report['report']} ({batch_converter.last_profile_report['pstats']})", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,6 @@
 import os
 import json
+from image_converter import DEFAULT_ENCODER_PROFILE
 
 class ConfigManager:
     def __init__(self, config_file="settings.json"):
@@ -11,7 +12,11 @@ class ConfigManager:
             "suffix": "_converted",
             "output_format": "JPEG",  # Domyślny format wyjściowy
             "output_directory": "",  # Domyślny pusty katalog wyjściowy
-            "delete_originals": False  # Domyślnie nie usuwaj oryginałów
+            "delete_originals": False,  # Domyślnie nie usuwaj oryginałów
+            "use_output_cache": False,  # Pomijaj konwersję plików niezmienionych od poprzedniego uruchomienia (domyślnie wyłączone)
+            "use_pixel_cache": False,  # Zapamiętuj zdekodowane i przeskalowane piksele (szybsza ponowna konwersja do innego formatu)
+            "encoder_profile": DEFAULT_ENCODER_PROFILE,  # Nakład kodera: "fast", "balanced" lub "max-compression"
+            "profiling": False  # Profilowanie partii (cProfile + tracemalloc), raporty w katalogu wyników
         } 
         
     def load_settings(self):
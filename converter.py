@@ -1,10 +1,18 @@
 import os
 import io
 from PIL import Image
-from pillow_heif import register_heif_opener
 
-# Rejestracja obsługi formatów HEIF/HEIC w PILu
-register_heif_opener()
+_heif_registered = False
+
+def _register_heif():
+    """
+    Rejestruje obsługę formatów HEIF/HEIC w PILu przy pierwszej konwersji (nie przy imporcie modułu)
+    """
+    global _heif_registered
+    if not _heif_registered:
+        from pillow_heif import register_heif_opener
+        register_heif_opener()
+        _heif_registered = True
 
 class ImageConverter:
     def __init__(self):
@@ -45,6 +53,7 @@ class ImageConverter:
         """
         try:
             # Odczyt pliku HEIC przez PIL (dzięki pillow_heif)
+            _register_heif()
             image = Image.open(input_path)
             
             # Konwersja do trybu RGB, jeśli to konieczne
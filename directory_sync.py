@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from file_manager import FileManager
+from image_converter import ConversionJob
+from batch_converter import BatchConverter
+from output_cache import file_digest, _normalize_edge
+
+# Plik manifestu tworzony w katalogu wyjściowym, jeśli nie podano innego
+MANIFEST_NAME = ".konwerter_sync.sqlite"
+# Pliki zmodyfikowane w tym oknie przed skanowaniem mogą zmienić się ponownie bez zmiany
+# czasu modyfikacji (zgrubna rozdzielczość mtime, np. 2 s w FAT) - dla nich zapisywany jest skrót treści
+RACY_WINDOW_NS = 2_000_000_000
+# Liczba skonwertowanych plików między zapisami manifestu w trakcie przebiegu
+MANIFEST_COMMIT_INTERVAL = 100
+
+
+class SyncManifest:
+    def __init__(self, manifest_file):
+        """
+        Manifest synchronizacji: dla każdego pliku źródłowego rozmiar, czas modyfikacji, i-węzeł,
+        skrót opcji, ścieżka wyniku i (tylko dla wpisów niejednoznacznych) skrót treści
+
+        Args:
+            manifest_file (str): Ścieżka do pliku SQLite
+        """
+        self.manifest_file = manifest_file
+        self.db = sqlite3.connect(manifest_file)
+        self.db.execute("CREATE TABLE IF NOT EXISTS files (source TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, inode INTEGER, options TEXT, output TEXT, digest TEXT)")
+
+    def load(self):
+        """
+        Returns:
+            dict: Ścieżka względna źródła -> (size, mtime_ns, inode, options, output, digest)
+        """
+        return {row[0]: row[1:] for row in self.db.execute("SELECT source, size, mtime_ns, inode, options, output, digest FROM files")}
+
+    def record(self, relative_path, stat, options_key, output_path, digest=None):
+        self.db.execute("INSERT OR REPLACE INTO files (source, size, mtime_ns, inode, options, output, digest) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (relative_path, stat.st_size, stat.st_mtime_ns, stat.st_ino, options_key, output_path, digest))
+
+    def clear_digest(self, relative_path):
+        self.db.execute("UPDATE files SET digest = NULL WHERE source = ?", (relative_path,))
+
+    def remove(self, relative_path):
+        self.db.execute("DELETE FROM files WHERE source = ?", (relative_path,))
+
+    def commit(self):
+        self.db.commit()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+
+class SyncReport:
+    def __init__(self):
+        """
+        Podsumowanie jednego przebiegu synchronizacji
+        """
+        self.scanned = 0
+        self.unchanged = 0
+        self.converted = []
+        self.failed = []
+        self.removed = []
+        # Katalogi (ścieżki względne), których nie udało się odczytać - ich wyniki nie są usuwane
+        self.unreadable = []
+        self.hashed = 0
+        self.elapsed = 0.0
+
+
+class DirectorySync:
+    def __init__(self, source_directory, output_directory, manifest_file=None, batch_converter=None, output_format="JPEG", suffix="_converted", remove_orphans: bool = False, check_outputs: bool = True, **options):
+        """
+        Przyrostowa synchronizacja drzewa katalogów źródłowych z drzewem wyników. Konwertowane są
+        tylko pliki nowe lub zmienione od poprzedniego przebiegu. Zmiana jest wykrywana wyłącznie
+        na podstawie `stat` (rozmiar, mtime, i-węzeł); treść jest haszowana tylko dla plików,
+        których czas modyfikacji jest zbyt bliski chwili skanowania, by mu ufać.
+
+        Args:
+            source_directory (str): Katalog źródłowy (przeszukiwany rekurencyjnie)
+            output_directory (str): Katalog wyników; struktura podkatalogów jest odwzorowana
+            manifest_file (str, optional): Plik manifestu. Domyślnie MANIFEST_NAME w katalogu wyników.
+            batch_converter (BatchConverter, optional): Silnik konwersji. Domyślnie nowy BatchConverter.
+            output_format (str): Format wyjściowy
+            suffix (str): Sufiks nazw plików wynikowych
+            remove_orphans (bool): Czy usuwać wyniki, których plik źródłowy zniknął
+            check_outputs (bool): Czy konwertować ponownie pliki, których wynik usunięto
+            **options: Opcje konwersji jak w `ConversionJob` (max_size_kb, longer_edge, ...)
+        """
+        self.source_directory = os.path.abspath(source_directory)
+        self.output_directory = os.path.abspath(output_directory)
+        self.manifest_file = manifest_file or os.path.join(self.output_directory, MANIFEST_NAME)
+        self.batch_converter = batch_converter or BatchConverter()
+        self.file_manager = FileManager()
+        self.output_format = output_format
+        self.suffix = suffix
+        self.remove_orphans = remove_orphans
+        self.check_outputs = check_outputs
+        self.options = options
+        self.options_key = self._options_key()
+        # Wyniki zapisywane wewnątrz drzewa źródłowego nie mogą wrócić jako nowe wejścia: katalog
+        # wyników w drzewie źródłowym jest pomijany, a przy wspólnym katalogu - pliki z sufiksem wyników
+        self.excluded_directories = ()
+        self.skip_suffixed = False
+        if os.path.commonpath([self.source_directory, self.output_directory]) == self.source_directory:
+            if self.output_directory == self.source_directory:
+                self.skip_suffixed = bool(self.suffix)
+            else:
+                self.excluded_directories = (self.output_directory,)
+
+    def _is_output(self, relative_path):
+        return self.skip_suffixed and os.path.splitext(os.path.basename(relative_path))[0].endswith(self.suffix)
+
+    def _options_key(self):
+        """
+        Skrót znormalizowanych opcji konwersji - ich zmiana wymusza ponowną konwersję wszystkich plików
+        """
+        options = dict(self.options)
+        for name in ("longer_edge", "shorter_edge", "max_size_kb"):
+            if name in options:
+                options[name] = _normalize_edge(options[name])
+        normalized = json.dumps({"format": self.output_format, "suffix": self.suffix, "options": options}, sort_keys=True, default=str)
+        return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+    def output_path_for(self, relative_path):
+        """
+        Zwraca ścieżkę wyniku dla pliku źródłowego, odwzorowując podkatalogi w katalogu wyników
+        """
+        output_directory = os.path.join(self.output_directory, os.path.dirname(relative_path))
+        self.file_manager.ensure_directory_exists(output_directory)
+        return self.file_manager.generate_output_filename(os.path.join(self.source_directory, relative_path), self.output_format, self.suffix, output_directory=output_directory)
+
+    def plan(self, manifest, report):
+        """
+        Porównuje bieżący stan drzewa źródłowego z manifestem
+
+        Returns:
+            tuple: (lista (ścieżka względna, pełna ścieżka, stat, skrót lub None) do konwersji,
+                zbiór ścieżek względnych obecnych w źródle, wpisy manifestu)
+        """
+        entries = manifest.load()
+        racy_limit = time.time_ns() - RACY_WINDOW_NS
+        pending = []
+        seen = set()
+        for relative_path, path, stat in self.file_manager.scan_input_files(self.source_directory, self.excluded_directories, report.unreadable):
+            if self._is_output(relative_path):
+                continue
+            report.scanned += 1
+            seen.add(relative_path)
+            digest = None
+            if stat.st_mtime_ns >= racy_limit:
+                digest = file_digest(path)
+                report.hashed += 1
+            entry = entries.get(relative_path)
+            if entry is not None and self._unchanged(entry, stat, path, digest, report):
+                if entry[5] is not None and digest is None:
+                    # Wpis przestał być niejednoznaczny - skrót nie jest już potrzebny
+                    manifest.clear_digest(relative_path)
+                report.unchanged += 1
+                continue
+            pending.append((relative_path, path, stat, digest))
+        return pending, seen, entries
+
+    def _unchanged(self, entry, stat, path, digest, report):
+        """
+        Sprawdza, czy plik nie zmienił się od zapisania wpisu manifestu
+        """
+        size, mtime_ns, inode, options_key, output_path, stored_digest = entry
+        if options_key != self.options_key or size != stat.st_size or mtime_ns != stat.st_mtime_ns:
+            return False
+        if self.check_outputs and not os.path.exists(output_path):
+            return False
+        if inode == stat.st_ino and stored_digest is None:
+            return True
+        # Niejednoznaczne: wpis zapisano w oknie zgrubnej rozdzielczości mtime albo plik
+        # podmieniono (inny i-węzeł przy tym samym rozmiarze i mtime) - rozstrzyga treść
+        if stored_digest is None:
+            return False
+        if digest is None:
+            digest = file_digest(path)
+            report.hashed += 1
+        return digest == stored_digest
+
+    def sync(self):
+        """
+        Wykonuje jeden przebieg synchronizacji
+
+        Returns:
+            SyncReport: Podsumowanie (pominięte, skonwertowane, błędy, usunięte wyniki)
+        """
+        start = time.perf_counter()
+        report = SyncReport()
+        self.file_manager.ensure_directory_exists(self.output_directory)
+        manifest = SyncManifest(self.manifest_file)
+        try:
+            pending, seen, entries = self.plan(manifest, report)
+
+            jobs = []
+            for relative_path, path, stat, digest in pending:
+                jobs.append(ConversionJob(path, self.output_path_for(relative_path), output_format=self.output_format, **self.options))
+            for batch_result in self.batch_converter.iter_results(jobs):
+                relative_path, path, stat, digest = pending[batch_result.index]
+                if batch_result.ok:
+                    manifest.record(relative_path, stat, self.options_key, batch_result.output_path, digest)
+                    report.converted.append(relative_path)
+                    # Zapis co pewien czas, aby przerwany przebieg nie tracił postępu (błędy nie zmieniają manifestu)
+                    if len(report.converted) % MANIFEST_COMMIT_INTERVAL == 0:
+                        manifest.commit()
+                else:
+                    report.failed.append((relative_path, batch_result.error))
+
+            if self.remove_orphans:
+                if report.unreadable:
+                    print(f"Uwaga: Nie udało się odczytać {len(report.unreadable)} katalogów źródłowych - wyniki plików z tych katalogów nie są usuwane")
+                for relative_path, entry in entries.items():
+                    if relative_path in seen or self._under_unreadable(relative_path, report.unreadable):
+                        continue
+                    output_path = entry[4]
+                    try:
+                        if os.path.exists(output_path):
+                            os.remove(output_path)
+                        report.removed.append(relative_path)
+                        manifest.remove(relative_path)
+                    except OSError as e:
+                        report.failed.append((relative_path, f"Nie można usunąć wyniku {output_path}: {e}"))
+        finally:
+            manifest.close()
+        report.elapsed = time.perf_counter() - start
+        return report
+
+    def _under_unreadable(self, relative_path, unreadable):
+        """
+        Sprawdza, czy plik leży w katalogu, którego nie udało się odczytać (wtedy jego brak
+        na liście plików nie oznacza, że źródło zniknęło)
+        """
+        for directory in unreadable:
+            if not directory or relative_path == directory or relative_path.startswith(directory + os.sep):
+                return True
+        return False
@@ -11,6 +11,8 @@ class FileManager:
             "WebP": "webp",
             "GIF": "gif"
         }
+        # Rozszerzenia plików wejściowych akceptowanych przez konwerter
+        self.input_extensions = ('.heic', '.heif', '.png', '.jpg', '.jpeg')
     
     def generate_output_filename(self, input_path, output_format="JPEG", suffix="_converted", output_directory=None, number_prefix: str = None):
         """
@@ -67,6 +69,55 @@ class FileManager:
                 
         return heic_files
     
+    def scan_input_files(self, directory, exclude=(), failed_directories=None):
+        """
+        Rekurencyjnie wyszukuje pliki wejściowe (HEIC/HEIF, PNG, JPG/JPEG) w drzewie katalogów.
+        Używa `os.scandir`, więc poza jednym wywołaniem `stat` na plik nie czyta ich zawartości.
+        Katalogi ukryte (zaczynające się od kropki) są pomijane.
+        
+        Args:
+            directory (str): Katalog główny
+            exclude (iterable, optional): Pełne ścieżki katalogów pomijanych wraz z zawartością
+            failed_directories (list, optional): Lista, do której trafiają ścieżki względne katalogów
+                (i wpisów), których nie udało się odczytać - ich zawartość jest niepełna
+            
+        Yields:
+            tuple: (ścieżka względem `directory`, pełna ścieżka, os.stat_result)
+        """
+        excluded = {os.path.abspath(path) for path in exclude}
+        pending = [""]
+        while pending:
+            relative_directory = pending.pop()
+            try:
+                entries = os.scandir(os.path.join(directory, relative_directory))
+            except OSError as e:
+                print(f"Błąd podczas odczytu katalogu {relative_directory or directory}: {str(e)}")
+                if failed_directories is not None:
+                    failed_directories.append(relative_directory)
+                continue
+            with entries:
+                try:
+                    for entry in entries:
+                        if entry.name.startswith('.'):
+                            continue
+                        relative_path = os.path.join(relative_directory, entry.name)
+                        try:
+                            if entry.is_dir():
+                                if os.path.abspath(entry.path) not in excluded:
+                                    pending.append(relative_path)
+                            elif entry.name.lower().endswith(self.input_extensions):
+                                yield relative_path, entry.path, entry.stat()
+                        except OSError:
+                            # Plik usunięty w trakcie skanowania (lub niedostępny - nie wiadomo, czy to katalog)
+                            if failed_directories is not None:
+                                failed_directories.append(relative_path)
+                            continue
+                except OSError as e:
+                    # Błąd w trakcie odczytu katalogu (np. przerwane połączenie NFS)
+                    print(f"Błąd podczas odczytu katalogu {relative_directory or directory}: {str(e)}")
+                    if failed_directories is not None:
+                        failed_directories.append(relative_directory)
+    
     def ensure_directory_exists(self, directory):
         """
         Upewnia się, że podany katalog istnieje, jeśli nie - tworzy go
@@ -1,10 +1,12 @@
 import os
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
-from PIL import Image
 from config import ConfigManager
 from file_manager import FileManager
-from image_converter import ImageConverter
+from image_converter import ImageConverter, DEFAULT_ENCODER_PROFILE
+from batch_converter import BatchConverter, encoder_profiles_from_settings, encoder_profile_from_settings
+from output_cache import OutputCache
+from pixel_cache import PixelCache
 from tkinterdnd2 import DND_FILES, TkinterDnD
 
 class ImageConverterGUI:
@@ -18,9 +20,16 @@ class ImageConverterGUI:
         self.config_manager = ConfigManager()
         self.file_manager = FileManager()
         self.converter = ImageConverter()
+        self.batch_converter = BatchConverter()
         
         # Wczytaj ustawienia
         self.settings = self.config_manager.load_settings()
+        if self.settings.get("use_output_cache", False):
+            # Pliki niezmienione od poprzedniego uruchomienia (treść i opcje) są odtwarzane bez konwersji
+            self.batch_converter.output_cache = OutputCache()
+        if self.settings.get("use_pixel_cache", False):
+            # Ponowna konwersja tych samych plików do innego formatu lub rozmiaru pomija dekodowanie i skalowanie
+            self.batch_converter.pixel_cache = PixelCache()
         
         # Zmienne
         self.selected_files = []
@@ -34,6 +43,8 @@ class ImageConverterGUI:
         self.output_format_var = tk.StringVar(value=self.settings.get("output_format", "JPEG"))
         self.output_dir_var = tk.StringVar(value=self.settings.get("output_directory", ""))
         self.delete_originals_var = tk.BooleanVar(value=self.settings.get("delete_originals", False))
+        self.encoder_profile_var = tk.StringVar(value=self.settings.get("encoder_profile", DEFAULT_ENCODER_PROFILE))
+        self.profiling_var = tk.BooleanVar(value=self.settings.get("profiling", False))
         self.progress_var = tk.DoubleVar(value=0.0)
         
         # Tworzenie widgetów
@@ -80,6 +91,12 @@ class ImageConverterGUI:
                                    state="readonly", width=10)
         format_combo.grid(row=0, column=1, padx=10, pady=5, sticky="w")
         
+        # Profil nakładu kodera (szybkość zapisu kosztem rozmiaru pliku)
+        ttk.Label(options_frame, text="Profil kodera:").grid(row=0, column=2, padx=0, pady=5, sticky="w")
+        ttk.Combobox(options_frame, textvariable=self.encoder_profile_var,
+                     values=list(encoder_profiles_from_settings(self.settings)),
+                     state="readonly", width=16).grid(row=0, column=3, padx=(0, 10), pady=5, sticky="w")
+        
         # Maksymalny rozmiar
         ttk.Label(options_frame, text="Maksymalny rozmiar (KB):").grid(row=1, column=0, padx=10, pady=5, sticky="w")
         ttk.Entry(options_frame, textvariable=self.max_size_var, width=10).grid(row=1, column=1, padx=10, pady=5, sticky="w")
@@ -122,6 +139,9 @@ class ImageConverterGUI:
         delete_check = ttk.Checkbutton(options_frame, text="Usuń oryginalne pliki po udanej konwersji", variable=self.delete_originals_var)
         delete_check.grid(row=5, column=0, columnspan=4, padx=10, pady=5, sticky="w")
         
+        # Profilowanie partii (raport .pstats i .txt w katalogu wyników)
+        ttk.Checkbutton(options_frame, text="Profiluj konwersję (raport w katalogu wyników)", variable=self.profiling_var).grid(row=6, column=0, columnspan=4, padx=10, pady=5, sticky="w")
+        
         # Frame dla przycisków akcji
         action_frame = ttk.Frame(self.root)
         action_frame.pack(fill="x", padx=10, pady=10)
@@ -227,73 +247,24 @@ class ImageConverterGUI:
             self.log_message(f"Ustawiono katalog wyjściowy: {directory}")
         
     def save_settings(self):
-        settings = {
+        # Ustawienia bez kontrolek w oknie (np. "encoder_profiles", "use_output_cache") są zachowywane
+        settings = dict(self.settings)
+        settings.update({
             "max_size": self.max_size_var.get(),
             "longer_edge": self.longer_edge_var.get(),
             "shorter_edge": self.shorter_edge_var.get(),
             "suffix": self.suffix_var.get(),
             "output_format": self.output_format_var.get(),
             "output_directory": self.output_dir_var.get(),
-            "delete_originals": self.delete_originals_var.get()
-        }
+            "delete_originals": self.delete_originals_var.get(),
+            "encoder_profile": self.encoder_profile_var.get(),
+            "profiling": self.profiling_var.get()
+        })
         
+        self.settings = settings
         self.config_manager.save_settings(settings)
         messagebox.showinfo("Informacja", "Ustawienia zostały zapisane")
         
-    def calculate_dimensions(self, original_width, original_height):
-        """
-        Oblicza nowe wymiary obrazu na podstawie ustawień dłuższej i krótszej krawędzi
-        
-        Args:
-            original_width (int): Oryginalna szerokość obrazu
-            original_height (int): Oryginalna wysokość obrazu
-            
-        Returns:
-            tuple: (nowa_szerokość, nowa_wysokość) lub None jeśli nie ustawiono wymiarów
-        """
-        longer_edge = self.longer_edge_var.get()
-        shorter_edge = self.shorter_edge_var.get()
-        
-        # Określ, która krawędź jest dłuższa, a która krótsza w oryginalnym obrazie
-        if original_width >= original_height:
-            original_longer = original_width
-            original_shorter = original_height
-            is_landscape = True
-        else:
-            original_longer = original_height
-            original_shorter = original_width
-            is_landscape = False
-        
-        # Oblicz współczynnik proporcji
-        aspect_ratio = original_longer / original_shorter
-        
-        # Przetwarzanie wartości wejściowych
-        longer_edge_val = int(longer_edge) if longer_edge and longer_edge.isdigit() else None
-        shorter_edge_val = int(shorter_edge) if shorter_edge and shorter_edge.isdigit() else None
-        
-        # Obliczanie nowych wymiarów
-        if longer_edge_val and shorter_edge_val:
-            # Obie wartości są określone - używamy ich bezpośrednio
-            new_longer = longer_edge_val
-            new_shorter = shorter_edge_val
-        elif longer_edge_val:
-            # Tylko dłuższa krawędź jest określona
-            new_longer = longer_edge_val
-            new_shorter = int(new_longer / aspect_ratio)
-        elif shorter_edge_val:
-            # Tylko krótsza krawędź jest określona
-            new_shorter = shorter_edge_val
-            new_longer = int(new_shorter * aspect_ratio)
-        else:
-            # Żadna wartość nie jest określona
-            return None
-            
-        # Konwersja z powrotem na szerokość i wysokość
-        if is_landscape:
-            return (new_longer, new_shorter)
-        else:
-            return (new_shorter, new_longer)
-        
     def start_conversion(self):
         if not self.selected_files:
             messagebox.showwarning("Ostrzeżenie", "Nie wybrano plików do konwersji")
@@ -310,6 +281,13 @@ class ImageConverterGUI:
         output_format = self.output_format_var.get()
         output_dir = self.output_dir_var.get()
         
+        # Nieznany profil kodera (np. błąd w "encoder_profiles") - przed wyczyszczeniem logu i tworzeniem katalogu
+        try:
+            encoder_profile = encoder_profile_from_settings(dict(self.settings, encoder_profile=self.encoder_profile_var.get()))
+        except Exception as e:
+            messagebox.showerror("Błąd", str(e))
+            return
+        
         # Sprawdź i utwórz katalog wyjściowy, jeśli podano
         if output_dir:
             try:
@@ -334,50 +312,49 @@ class ImageConverterGUI:
         
         self.log_message("Rozpoczęto proces konwersji...")
         
-        for i, heic_path in enumerate(self.selected_files):
-            try:
-                output_file = self.file_manager.generate_output_filename(
-                    heic_path, 
-                    output_format, 
-                    suffix,
-                    output_directory=output_dir
-                )
-                self.log_message(f"Konwertowanie: {os.path.basename(heic_path)}...")
-                self.root.update_idletasks()
-                
-                # Otwieramy obraz do sprawdzenia jego wymiarów
-                with Image.open(heic_path) as img:
-                    orig_width, orig_height = img.size
-                    
-                    # Obliczenie nowych wymiarów
-                    new_dimensions = self.calculate_dimensions(orig_width, orig_height)
-                
-                self.converter.convert_heic_to_format(
-                    heic_path, 
-                    output_file,
-                    output_format=output_format,
-                    max_size_kb=max_size, 
-                    new_resolution=new_dimensions
-                )
-                
-                self.log_message(f" -> Zapisano jako: {os.path.basename(output_file)}")
+        jobs = self.batch_converter.build_jobs(
+            self.selected_files,
+            output_format=output_format,
+            suffix=suffix,
+            output_directory=output_dir,
+            max_size_kb=max_size,
+            longer_edge=self.longer_edge_var.get(),
+            shorter_edge=self.shorter_edge_var.get(),
+            encoder_profile=encoder_profile
+        )
+        self.log_message(f"Konwertowanie plików: {total_files}...")
+        self.root.update_idletasks()
+        
+        self.batch_converter.profiling = self.profiling_var.get()
+        
+        # Wyniki pojawiają się w kolejności zakończenia konwersji
+        for i, batch_result in enumerate(self.batch_converter.iter_results(jobs)):
+            image_path = batch_result.input_path
+            if batch_result.ok:
+                result = batch_result.result
+                self.log_message(f" -> {os.path.basename(image_path)} zapisano jako: {os.path.basename(result.output_path)} ({result.output_size[0]}x{result.output_size[1]}, {result.file_size / 1024:.1f} KB, {result.elapsed:.2f} s)")
+                if result.cached:
+                    self.log_message("   Pobrano z pamięci podręcznej (bez ponownej konwersji)")
+                elif max_size:
+                    self.log_message(f"   Liczba kodowań (limit {max_size} KB): {result.encode_count}")
                 
                 # Usuń oryginalny plik, jeśli opcja jest włączona
                 if self.delete_originals_var.get():
                     try:
-                        os.remove(heic_path)
-                        self.log_message(f"   Usunięto oryginał: {os.path.basename(heic_path)}")
+                        os.remove(image_path)
+                        self.log_message(f"   Usunięto oryginał: {os.path.basename(image_path)}")
                     except OSError as e:
-                        self.log_message(f"   BŁĄD: Nie można usunąć oryginału {os.path.basename(heic_path)}: {e}")
-                
-                # Aktualizacja postępu
+                        self.log_message(f"   BŁĄD: Nie można usunąć oryginału {os.path.basename(image_path)}: {e}")
                 converted_files += 1
-                progress_value = ((i + 1) / total_files) * 100
-                self.progress_var.set(progress_value)
-                self.root.update_idletasks()
-                
-            except Exception as e:
-                self.log_message(f"BŁĄD konwersji pliku {os.path.basename(heic_path)}: {str(e)}")
+            else:
+                self.log_message(f"BŁĄD konwersji pliku {os.path.basename(image_path)}: {batch_result.error}")
+            
+            # Aktualizacja postępu po każdym pliku (udanym lub nie)
+            progress_value = ((i + 1) / total_files) * 100
+            self.progress_var.set(progress_value)
+            self.root.update_idletasks()
         
         self.log_message(f"Konwersja zakończona. Przekonwertowano {converted_files} z {total_files} plików.")
+        if self.batch_converter.last_profile_report:
+            self.log_message(f"Raport profilowania: {self.batch_converter.last_profile_report['report']}")
         self.progress_var.set(0)
\ No newline at end of file
@@ -1,13 +1,203 @@
 import os
 import io
+import sys
+import mmap
+import time
 from PIL import Image
-from pillow_heif import register_heif_opener
+from file_manager import FileManager
+from instrumentation import StageTimer
 
-# Rejestracja obsługi formatów HEIF/HEIC w PILu
-register_heif_opener()
+# pillow_heif (i inicjalizacja libheif) oraz moduły puli procesów i pamięci współdzielonej są
+# importowane dopiero przy pierwszym użyciu - konwersja PNG->JPEG ani krótki proces CLI za nie nie płaci
+
+# Marki kontenera ISO BMFF (pole ftyp), po których plik jest rozpoznawany jako HEIF/AVIF bez importu pillow_heif
+HEIF_BRANDS = {b"heic", b"heix", b"heim", b"heis", b"hevc", b"hevx", b"hevm", b"hevs", b"mif1", b"msf1", b"avif", b"avis"}
+# Formaty wejściowe sprawdzane przez Pillow w pierwszej kolejności; inne formaty wymagają pełnego
+# przeglądu wtyczek (Image.init), który importuje wszystkie moduły wtyczek Pillow
+INPUT_FORMATS = ("JPEG", "PNG")
+# Moduły wtyczek Pillow dla formatów wejściowych i wyjściowych (import jednej wtyczki zamiast wszystkich)
+PLUGINS = {
+    "JPEG": "JpegImagePlugin",
+    "PNG": "PngImagePlugin",
+    "BMP": "BmpImagePlugin",
+    "TIFF": "TiffImagePlugin",
+    "WebP": "WebPImagePlugin",
+    "GIF": "GifImagePlugin",
+}
+
+# Profile nakładu kodera: parametry zapisu dla każdego formatu ("WebP_lossless" - WebP bezstratny,
+# gdzie `quality` oznacza nakład kompresji). "max-compression" odpowiada dotychczasowym ustawieniom.
+ENCODER_PROFILES = {
+    "fast": {
+        "JPEG": {"optimize": False},
+        "PNG": {"optimize": False, "compress_level": 1},
+        "WebP": {"method": 2},
+        "WebP_lossless": {"quality": 10, "method": 0},
+        "TIFF": {"compression": "none"},
+    },
+    "balanced": {
+        "JPEG": {"optimize": True},
+        "PNG": {"optimize": False, "compress_level": 6},
+        "WebP": {"method": 4},
+        "WebP_lossless": {"quality": 50, "method": 3},
+        "TIFF": {"compression": "lzw"},
+    },
+    "max-compression": {
+        "JPEG": {"optimize": True},
+        "PNG": {"optimize": True, "compress_level": 9},
+        "WebP": {"method": 6},
+        "WebP_lossless": {"quality": 80},
+        "TIFF": {"compression": "lzw"},
+    },
+}
+DEFAULT_ENCODER_PROFILE = "balanced"
+# Profile wbudowane od największego do najmniejszego nakładu (kolejność obniżania przy budżecie czasu)
+EFFORT_LADDER = ("max-compression", "balanced", "fast")
+# Szacowany czas jednego kodowania w sekundach na megapiksel (zob. benchmarks/bench_encoder_profiles.py,
+# zdjęcia syntetyczne); `ImageConverter.encode_cost` jest kalibrowany pomiarami podczas konwersji z budżetem
+ENCODE_COST = {
+    "fast": {"JPEG": 0.008, "PNG": 0.16, "WebP": 0.08, "WebP_lossless": 0.06, "TIFF": 0.002},
+    "balanced": {"JPEG": 0.015, "PNG": 0.95, "WebP": 0.16, "WebP_lossless": 0.55, "TIFF": 0.06},
+    "max-compression": {"JPEG": 0.015, "PNG": 1.8, "WebP": 0.3, "WebP_lossless": 1.5, "TIFF": 0.06},
+}
+# Przybliżona liczba kodowań przy wyszukiwaniu jakości dla max_size_kb (bez predyktora / z predyktorem)
+SIZE_SEARCH_ENCODES = 8
+PREDICTED_SEARCH_ENCODES = 3
+# Nazwy kompresji TIFF w ustawieniach -> wartości Pillow
+TIFF_COMPRESSION = {"none": None, "lzw": "tiff_lzw", "deflate": "tiff_adobe_deflate"}
+# Filtry zmniejszania według skali (nowy / stary rozmiar, dla silniej zmniejszanej osi):
+# (najmniejsza skala, filtr, czy najpierw Image.reduce z zapasem `resize_reducing_gap`).
+# Przy dużych zmniejszeniach po wstępnym reduce różnica między LANCZOS a BICUBIC jest niewidoczna.
+RESIZE_FILTERS = (
+    (1 / 3, "LANCZOS", False),
+    (1 / 8, "LANCZOS", True),
+    (0.0, "BICUBIC", True),
+)
+
+def resolve_encoder_profile(profile):
+    """
+    Zwraca parametry kodera dla profilu
+    
+    Args:
+        profile (str or dict): Nazwa profilu z ENCODER_PROFILES lub słownik {format: parametry}
+            (np. profil zdefiniowany w `settings.json`). Brakujące formaty mają parametry
+            profilu DEFAULT_ENCODER_PROFILE.
+        
+    Returns:
+        dict: Słownik {format: parametry zapisu}
+    """
+    if profile is None:
+        profile = DEFAULT_ENCODER_PROFILE
+    if isinstance(profile, str):
+        if profile not in ENCODER_PROFILES:
+            raise Exception(f"Nieznany profil kodera: {profile} (dostępne: {', '.join(ENCODER_PROFILES)})")
+        return ENCODER_PROFILES[profile]
+    resolved = dict(ENCODER_PROFILES[DEFAULT_ENCODER_PROFILE])
+    resolved.update(profile)
+    return resolved
+
+_pillow_heif = None
+
+def load_heif():
+    """
+    Importuje pillow_heif i rejestruje obsługę HEIF w Pillow (bez obrazów pomocniczych i map głębi,
+    których nie używamy). Wywoływane przy pierwszym pliku HEIC/HEIF.
+    
+    Returns:
+        module: Moduł pillow_heif
+    """
+    global _pillow_heif
+    if _pillow_heif is None:
+        import pillow_heif
+        pillow_heif.register_heif_opener(aux_images=False, depth_images=False)
+        _pillow_heif = pillow_heif
+    return _pillow_heif
+
+def _read_prefix(source, length=16):
+    """
+    Czyta początek pliku (ścieżki lub strumienia - z powrotem do poprzedniej pozycji)
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return f.read(length)
+    position = source.tell()
+    try:
+        return source.read(length)
+    finally:
+        source.seek(position)
+
+def _as_seekable(source):
+    """
+    Zwraca źródło, które można przewijać: dane (bytes) i strumienie bez przewijania (potoki,
+    gniazda, `sys.stdin.buffer`) są wczytywane do io.BytesIO, ścieżki i zwykłe pliki - bez zmian
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    if isinstance(source, (str, os.PathLike)):
+        return source
+    seekable = getattr(source, "seekable", None)
+    if seekable is None or not seekable():
+        return io.BytesIO(source.read())
+    return source
+
+def is_heif(source):
+    """
+    Sprawdza, czy źródło jest plikiem HEIF/AVIF. Pliki bez pola ftyp są odrzucane bez importu pillow_heif.
+    
+    Args:
+        source (str or file object): Ścieżka lub strumień binarny
+        
+    Returns:
+        bool: True dla plików HEIF
+    """
+    prefix = _read_prefix(source)
+    if prefix[4:8] != b"ftyp":
+        return False
+    if prefix[8:12] in HEIF_BRANDS:
+        return True
+    # Rzadkie marki główne - rozstrzyga pillow_heif
+    return load_heif().is_supported(source)
+
+def _load_plugin(image_format):
+    """
+    Importuje wtyczkę Pillow dla formatu, aby Image.open i Image.save nie wywoływały Image.init
+    """
+    plugin = PLUGINS.get(image_format)
+    if plugin:
+        __import__(f"PIL.{plugin}")
+
+def _open_image(source):
+    """
+    Otwiera obraz przez Pillow, sprawdzając najpierw tylko formaty akceptowane przez aplikację.
+    Inne formaty (np. TIFF, BMP z `convert_stream`) są rozpoznawane pełnym przeglądem wtyczek.
+    """
+    for image_format in INPUT_FORMATS:
+        _load_plugin(image_format)
+    try:
+        return Image.open(source, formats=INPUT_FORMATS)
+    except Image.UnidentifiedImageError:
+        if not isinstance(source, (str, os.PathLike)):
+            source.seek(0)
+        return Image.open(source)
+
+def _import_numpy():
+    """
+    Importuje NumPy (zależność opcjonalna, potrzebna tylko dla API tablic)
+    """
+    try:
+        import numpy
+    except ImportError:
+        raise Exception("Obsługa tablic NumPy wymaga pakietu numpy (pip install numpy)")
+    return numpy
 
 class ImageConverter:
-    def __init__(self):
+    def __init__(self, quality_predictor=None):
+        """
+        Args:
+            quality_predictor (QualityPredictor, optional): Predyktor jakości startowej dla max_size_kb.
+                Jeśli None, wyszukiwanie startuje od jakości bazowej. Stan predyktora zapisuje
+                wywołujący (`quality_predictor.close()` po partii).
+        """
         # Dostępne formaty wyjściowe i ich rozszerzenia
         self.formats = {
             "JPEG": "jpg",
@@ -17,6 +207,31 @@ class ImageConverter:
             "WebP": "webp",
             "GIF": "gif"
         }
+        # Liczba kodowań obrazu wykonanych podczas ostatniej konwersji
+        self.last_encode_count = 0
+        self.quality_predictor = quality_predictor
+        self.file_manager = FileManager()
+        # Zapas rozdzielczości przy dekodowaniu JPEG w trybie draft (wielokrotność docelowego rozmiaru)
+        self.draft_reducing_gap = 1.5
+        # Zapas przy wstępnym zmniejszaniu całkowitym współczynnikiem (Image.reduce) przed filtrem dokładnym
+        self.resize_reducing_gap = 3.0
+        # Czy duże pliki wejściowe (inne niż HEIF) czytać przez mapę pamięci zamiast buforowanego pliku.
+        # Domyślnie wyłączone - zob. benchmarks/bench_mmap_input.py
+        self.memory_map_inputs = False
+        self.memory_map_threshold = 8 * 1024 * 1024
+        # Trwała pamięć podręczna wyników dla `run_job` (OutputCache); None wyłącza
+        self.output_cache = None
+        # Pamięć podręczna zdekodowanych i przeskalowanych pikseli (PixelCache); None wyłącza
+        self.pixel_cache = None
+        # Szacowany koszt kodowania (s/MP) dla profili i formatów, używany przy `time_budget`
+        self.encode_cost = {name: dict(costs) for name, costs in ENCODE_COST.items()}
+        # Raport budżetu czasu ostatniej konwersji (EncodeBudget) lub None, jeśli nie podano budżetu
+        self.last_budget = None
+        # Obserwator etapów konwersji: wywoływany ze zdarzeniem StageEvent (instrumentation.py) po każdym
+        # etapie. None wyłącza pomiary - silnik nie mierzy wtedy czasu ani pamięci.
+        self.observer = None
+        self._observed_source = None
+        self._stage_events = None
         
     def get_available_formats(self):
         """
@@ -27,7 +242,7 @@ class ImageConverter:
         """
         return list(self.formats.keys())
         
-    def convert_heic_to_format(self, input_path, output_path, output_format="JPEG", max_size_kb=None, new_resolution=None, strip_metadata: bool = False, webp_lossless: bool = False):
+    def convert_heic_to_format(self, input_path, output_path, output_format="JPEG", max_size_kb=None, new_resolution=None, strip_metadata: bool = False, webp_lossless: bool = False, quality_search: str = "bisect", fast_probes: bool = True, jpeg_draft: bool = True, heic_thumbnails: bool = True, upscale: bool = True, longer_edge=None, shorter_edge=None, encoder_profile=None, time_budget=None):
         """
         Konwertuje plik HEIC na wybrany format
         
@@ -39,99 +254,880 @@ class ImageConverter:
             new_resolution (tuple, optional): Nowa rozdzielczość w formacie (szerokość, wysokość)
             strip_metadata (bool, optional): Czy usunąć metadane z obrazu. Domyślnie False.
             webp_lossless (bool, optional): Czy użyć kompresji bezstratnej dla WebP. Domyślnie False.
+            quality_search (str, optional): Tryb wyszukiwania jakości dla max_size_kb ("bisect" lub "linear"). Domyślnie "bisect".
+            fast_probes (bool, optional): Czy próbne kodowania JPEG wykonywać bez `optimize`. Domyślnie True.
+            jpeg_draft (bool, optional): Czy przy zmniejszaniu dekodować JPEG w skali 1/2, 1/4 lub 1/8. Domyślnie True.
+            heic_thumbnails (bool, optional): Czy przy zmniejszaniu HEIC użyć osadzonej miniatury, jeśli jest wystarczająco duża. Domyślnie True.
+            upscale (bool, optional): Czy powiększać obraz, gdy nowa rozdzielczość jest większa od źródłowej.
+                Jeśli False, żaden wymiar nie jest powiększany (zob. `resize_image`). Domyślnie True.
+            longer_edge (int or str, optional): Dłuższa krawędź wyniku; używana, gdy nie podano new_resolution
+            shorter_edge (int or str, optional): Krótsza krawędź wyniku; używana, gdy nie podano new_resolution
+            encoder_profile (str or dict, optional): Profil nakładu kodera ("fast", "balanced", "max-compression")
+                lub słownik parametrów dla formatów. Domyślnie DEFAULT_ENCODER_PROFILE.
+            time_budget (float, optional): Budżet czasu konwersji pliku w sekundach. Wybierany jest profil
+                o największym nakładzie (nie większym niż `encoder_profile`), którego szacowany czas kodowania
+                mieści się w pozostałym budżecie; gdy wyszukiwanie jakości dla max_size_kb zużywa budżet,
+                kolejne kodowania są tańsze (bez `optimize`, niższe `method` WebP). Raport: `last_budget`.
             
         Returns:
             str: Ścieżka do utworzonego pliku
         """
         try:
-            # Odczyt pliku HEIC przez PIL (dzięki pillow_heif)
-            image = Image.open(input_path)
+            self._convert(input_path, output_path, output_format, max_size_kb, new_resolution, strip_metadata, webp_lossless, quality_search, fast_probes, jpeg_draft, heic_thumbnails, upscale, longer_edge, shorter_edge, encoder_profile, time_budget)
+            return output_path
+        except Exception as e:
+            raise Exception(f"Błąd konwersji: {str(e)}")
+
+    def convert_stream(self, source, output=None, output_format="JPEG", max_size_kb=None, new_resolution=None, strip_metadata: bool = False, webp_lossless: bool = False, longer_edge=None, shorter_edge=None, **options):
+        """
+        Konwertuje obraz w pamięci, bez zapisu plików tymczasowych. Wyszukiwanie jakości
+        dla max_size_kb odbywa się w całości na buforach w pamięci.
+        
+        Args:
+            source (bytes, bytearray, memoryview or file object): Dane obrazu lub odczytywalny strumień binarny
+                (także bez przewijania, np. potok lub `sys.stdin.buffer`)
+            output (file object, optional): Zapisywalny strumień binarny. Jeśli None, wynik jest zwracany jako bytes.
+            output_format (str): Format wyjściowy (JPEG, PNG, BMP, TIFF, WebP, GIF)
+            max_size_kb (int, optional): Maksymalny rozmiar wyniku w KB
+            new_resolution (tuple, optional): Nowa rozdzielczość w formacie (szerokość, wysokość)
+            strip_metadata (bool, optional): Czy usunąć metadane z obrazu. Domyślnie False.
+            webp_lossless (bool, optional): Czy użyć kompresji bezstratnej dla WebP. Domyślnie False.
+            longer_edge (int or str, optional): Dłuższa krawędź wyniku
+            shorter_edge (int or str, optional): Krótsza krawędź wyniku
+            **options: Pozostałe opcje `convert_heic_to_format` (np. upscale, quality_search)
             
-            # Konwersja do trybu RGB, jeśli to konieczne
-            if image.mode != 'RGB' and output_format != 'PNG':
-                image = image.convert('RGB')
+        Returns:
+            bytes or file object: Zakodowany obraz (gdy output jest None) lub przekazany strumień `output`
+        """
+        source = _as_seekable(source)
+        target = output if output is not None else io.BytesIO()
+        try:
+            self._convert(source, target, output_format, max_size_kb, new_resolution, strip_metadata, webp_lossless, longer_edge=longer_edge, shorter_edge=shorter_edge, **options)
+        except Exception as e:
+            raise Exception(f"Błąd konwersji: {str(e)}")
+        if output is None:
+            return target.getvalue()
+        return output
+
+    def convert_to_array(self, source, new_resolution=None, longer_edge=None, shorter_edge=None, mode="RGB", upscale: bool = True, jpeg_draft: bool = True, heic_thumbnails: bool = True):
+        """
+        Dekoduje i skaluje obraz do tablicy NumPy (wysokość x szerokość x kanały), bez kodowania
+        do pliku. Tablica jest tylko do odczytu i korzysta bezpośrednio z bajtów eksportowanych
+        przez Pillow (bez dodatkowej kopii); użyj `array.copy()`, jeśli potrzebna jest modyfikacja.
+        
+        Args:
+            source (str, bytes, memoryview or file object): Ścieżka, dane obrazu lub strumień binarny
+            new_resolution (tuple, optional): Nowa rozdzielczość w formacie (szerokość, wysokość)
+            longer_edge (int or str, optional): Dłuższa krawędź wyniku
+            shorter_edge (int or str, optional): Krótsza krawędź wyniku
+            mode (str, optional): Tryb kolorów wyniku (np. "RGB", "RGBA", "L"); None zachowuje tryb źródła
+            upscale (bool, optional): Czy powiększać obraz. Domyślnie True.
+            jpeg_draft (bool, optional): Czy dekodować JPEG w zmniejszonej skali. Domyślnie True.
+            heic_thumbnails (bool, optional): Czy użyć osadzonej miniatury HEIC. Domyślnie True.
             
-            # Skalowanie obrazu, jeśli podano nową rozdzielczość
+        Returns:
+            numpy.ndarray: Tablica uint8 (lub innego typu zgodnego z trybem)
+        """
+        numpy = _import_numpy()
+        source = _as_seekable(source)
+        try:
+            image, source_size, new_resolution = self._open_source(source, new_resolution, longer_edge, shorter_edge, jpeg_draft, heic_thumbnails)
+            if mode and image.mode != mode:
+                image = image.convert(mode)
             if new_resolution:
-                image = image.resize(new_resolution, Image.Resampling.LANCZOS)
-            
-            # Opcje zapisu dla różnych formatów
-            save_options = {}
-            
-            # Opcje zależne od formatu
-            if output_format == "JPEG":
-                save_options["quality"] = 95
-                save_options["optimize"] = True
-                if strip_metadata:
-                    save_options["exif"] = b''
-                    save_options["icc_profile"] = None
-                else:
-                    if 'exif' in image.info:
-                        save_options["exif"] = image.info['exif']
-                    if 'icc_profile' in image.info:
-                        save_options["icc_profile"] = image.info['icc_profile']
-            elif output_format == "PNG":
-                save_options["optimize"] = True
-                save_options["compress_level"] = 9
-                if strip_metadata:
-                    # Для PNG, Pillow может не иметь прямого способа удалить все метаданные через save_options
-                    # image.info может быть очищен перед сохранением, но это не гарантирует удаление всех чанков.
-                    # Опция optimize=True помогает уменьшить размер файла, включая некоторые метаданные.
-                    # Если требуется более агрессивное удаление, может понадобиться сторонняя библиотека или более сложная обработка.
-                    pass  # На данный момент, optimize=True - основная стратегия
-            elif output_format == "WebP":
-                if webp_lossless:
-                    save_options["lossless"] = True
-                    save_options["quality"] = 80  # 'Effort' for lossless WebP in Pillow
-                    # Method is implicitly 4 for lossless, explicit 'method' can conflict or be ignored.
-                    # No 'method' key is set here to use Pillow's default for lossless.
-                else:
-                    save_options["quality"] = 90
-                    save_options["method"] = 6  # For lossy WebP
-                    save_options["lossless"] = False
-                
-                if strip_metadata:
-                    save_options["icc_profile"] = None
-                    save_options["exif"] = b''
-                else:
-                    # Preserve metadata if not stripping and present
-                    if 'icc_profile' in image.info:
-                        save_options["icc_profile"] = image.info['icc_profile']
-                    if 'exif' in image.info:
-                        save_options["exif"] = image.info['exif']
-            elif output_format == "TIFF":
-                save_options["compression"] = "tiff_lzw"
-                if strip_metadata:
-                    # Для TIFF, удаление метаданных может быть сложнее и зависит от конкретных тегов.
-                    # Pillow может не предоставлять простой опции для удаления всех метаданных.
-                    # Можно попробовать сохранить без определенных тегов, если они известны.
-                    pass # На данный момент нет простого способа удалить все метаданные для TIFF
-            elif output_format == "BMP":
-                # BMP обычно не хранит много метаданных, но на всякий случай
-                if strip_metadata:
-                    pass # Pillow не предоставляет опций для удаления метаданных для BMP
-            elif output_format == "GIF":
-                # GIF также обычно не содержит сложных метаданных как EXIF
-                if strip_metadata:
-                    pass # Pillow не предоставляет опций для удаления метаданных для GIF
-            
-            # Obsługa max_size_kb i WebP lossless
-            if output_format == "WebP" and webp_lossless:
-                if max_size_kb is not None:
-                    print(f"Ostrzeżenie: Opcja max_size_kb ({max_size_kb} KB) jest ignorowana dla formatu WebP w trybie bezstratnym.")
-                # Zapisz bezpośrednio z opcjami bezstratnymi, ignorując _save_with_size_limit
-                image.save(output_path, format=output_format, **save_options)
-            elif max_size_kb and output_format in ["JPEG", "WebP"]: # WebP lossy or JPEG
-                self._save_with_size_limit(image, output_path, max_size_kb, output_format, strip_metadata=strip_metadata, base_save_options=save_options)
+                image = self.resize_image(image, new_resolution, upscale=upscale)
+            return numpy.asarray(image)
+        except Exception as e:
+            raise Exception(f"Błąd konwersji: {str(e)}")
+
+    def convert_array(self, array, output=None, output_format="JPEG", max_size_kb=None, new_resolution=None, longer_edge=None, shorter_edge=None, strip_metadata: bool = False, webp_lossless: bool = False, info: dict = None, upscale: bool = True, quality_search: str = "bisect", fast_probes: bool = True, encoder_profile=None):
+        """
+        Koduje tablicę NumPy z tymi samymi opcjami formatu, metadanych i max_size_kb,
+        co `convert_heic_to_format`
+        
+        Args:
+            array (numpy.ndarray): Tablica (wysokość x szerokość [x kanały])
+            output (str or file object, optional): Ścieżka lub zapisywalny strumień. Jeśli None, wynik jest zwracany jako bytes.
+            output_format (str): Format wyjściowy (JPEG, PNG, BMP, TIFF, WebP, GIF)
+            max_size_kb (int, optional): Maksymalny rozmiar wyniku w KB
+            new_resolution (tuple, optional): Nowa rozdzielczość w formacie (szerokość, wysokość)
+            longer_edge (int or str, optional): Dłuższa krawędź wyniku
+            shorter_edge (int or str, optional): Krótsza krawędź wyniku
+            strip_metadata (bool, optional): Czy usunąć metadane. Domyślnie False.
+            webp_lossless (bool, optional): Czy użyć kompresji bezstratnej dla WebP. Domyślnie False.
+            info (dict, optional): Metadane do zapisania (np. {"exif": ..., "icc_profile": ...})
+            upscale (bool, optional): Czy powiększać obraz. Domyślnie True.
+            quality_search (str, optional): Tryb wyszukiwania jakości ("bisect" lub "linear")
+            fast_probes (bool, optional): Czy próbne kodowania JPEG wykonywać bez `optimize`
+            encoder_profile (str or dict, optional): Profil nakładu kodera (jak w `convert_heic_to_format`)
+            
+        Returns:
+            bytes or str or file object: Zakodowany obraz (gdy output jest None) lub przekazany `output`
+        """
+        try:
+            image = Image.fromarray(array)
+            if info:
+                image.info.update(info)
+            if new_resolution is None:
+                new_resolution = self.calculate_dimensions(*image.size, longer_edge, shorter_edge)
+            image = self._prepare_image(image, output_format, new_resolution, upscale)
+            save_options = self._build_save_options(image, output_format, strip_metadata, webp_lossless, encoder_profile)
+            target = output if output is not None else io.BytesIO()
+            self._write_image(image, target, output_format, save_options, max_size_kb, strip_metadata, webp_lossless, quality_search, fast_probes)
+        except Exception as e:
+            raise Exception(f"Błąd konwersji: {str(e)}")
+        if output is None:
+            return target.getvalue()
+        return output
+
+    def convert_to_arrays(self, sources, workers: int = None, **options):
+        """
+        Wsadowa wersja `convert_to_array`. Pliki są przetwarzane równolegle w wątkach - Pillow
+        zwalnia GIL podczas dekodowania, skalowania i kodowania, a tablice nie są kopiowane
+        między procesami.
+        
+        Args:
+            sources (list): Ścieżki, dane lub strumienie obrazów
+            workers (int, optional): Liczba wątków. Domyślnie liczba rdzeni.
+            **options: Opcje `convert_to_array`
+            
+        Returns:
+            list: Tablice NumPy w kolejności `sources`
+        """
+        return self._map_in_threads(lambda converter, source: converter.convert_to_array(source, **options), sources, workers)
+
+    def convert_arrays(self, arrays, outputs=None, workers: int = None, **options):
+        """
+        Wsadowa wersja `convert_array`, przetwarzana równolegle w wątkach
+        
+        Args:
+            arrays (list): Tablice NumPy
+            outputs (list, optional): Ścieżki lub strumienie wyjściowe (po jednym na tablicę). Jeśli None, zwracane są bytes.
+            workers (int, optional): Liczba wątków. Domyślnie liczba rdzeni.
+            **options: Opcje `convert_array`
+            
+        Returns:
+            list: Wyniki `convert_array` w kolejności `arrays`
+        """
+        if outputs is None:
+            outputs = [None] * len(arrays)
+        return self._map_in_threads(lambda converter, item: converter.convert_array(item[0], item[1], **options), list(zip(arrays, outputs)), workers)
+
+    def _map_in_threads(self, function, items, workers=None):
+        """
+        Wykonuje `function(converter, item)` dla każdego elementu w puli wątków.
+        Każde zadanie dostaje własną kopię konwertera (stan ostatniej konwersji nie jest współdzielony).
+        
+        Returns:
+            list: Wyniki w kolejności `items`
+        """
+        def run(item):
+            converter = ImageConverter()
+            for attribute in ("draft_reducing_gap", "resize_reducing_gap", "memory_map_inputs", "memory_map_threshold", "encode_cost"):
+                setattr(converter, attribute, getattr(self, attribute))
+            return function(converter, item)
+        
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+            return list(executor.map(run, items))
+
+    def run_job(self, job):
+        """
+        Wykonuje zadanie konwersji. Plik jest otwierany i parsowany tylko raz,
+        a docelowe wymiary są liczone z już otwartego obrazu.
+        
+        Args:
+            job (ConversionJob): Zadanie konwersji
+            
+        Returns:
+            ConversionResult: Wynik z wymiarami, rozmiarem pliku i czasem konwersji
+        """
+        start = time.perf_counter()
+        cache_key = None
+        if self.output_cache is not None:
+            try:
+                cache_key = self.output_cache.job_key(job)
+                cached = self.output_cache.fetch(cache_key, job.output_path)
+                if cached is not None:
+                    source_size, output_size = cached
+                    return ConversionResult(job.input_path, job.output_path, source_size, output_size, os.path.getsize(job.output_path), time.perf_counter() - start, 0, cached=True)
+            except Exception as e:
+                # Błąd pamięci podręcznej nie może zatrzymać konwersji
+                print(f"Uwaga: Pamięć podręczna wyników niedostępna: {str(e)}")
+                cache_key = None
+        # Zdarzenia etapów są dołączane do wyniku (ConversionResult.stages), np. aby przekazać je z procesu roboczego
+        self._stage_events = [] if self.observer is not None else None
+        try:
+            source_size, output_size = self._convert(job.input_path, job.output_path, job.output_format, job.max_size_kb, job.new_resolution, job.strip_metadata, job.webp_lossless, longer_edge=job.longer_edge, shorter_edge=job.shorter_edge, **job.options)
+        except Exception as e:
+            raise Exception(f"Błąd konwersji: {str(e)}")
+        finally:
+            stages, self._stage_events = self._stage_events, None
+        if cache_key is not None:
+            try:
+                self.output_cache.store(cache_key, job.output_path, source_size, output_size)
+            except Exception as e:
+                print(f"Uwaga: Nie udało się zapisać wyniku w pamięci podręcznej: {str(e)}")
+        return ConversionResult(job.input_path, job.output_path, source_size, output_size, os.path.getsize(job.output_path), time.perf_counter() - start, self.last_encode_count, budget=self.last_budget, stages=stages)
+
+    def convert_renditions(self, input_path, renditions, output_directory=None, number_prefix: str = None, jpeg_draft: bool = True, heic_thumbnails: bool = True, workers: int = None, executor=None, time_budget=None):
+        """
+        Tworzy kilka wersji (rendycji) jednego obrazu z jednego dekodowania. Obraz jest dekodowany
+        i konwertowany do RGB raz, a skalowanie przebiega kaskadowo od największej do najmniejszej wersji.
+        
+        Args:
+            input_path (str): Ścieżka do pliku wejściowego
+            renditions (list): Lista obiektów RenditionSpec
+            output_directory (str, optional): Katalog wyjściowy (jak w `FileManager.generate_output_filename`)
+            number_prefix (str, optional): Prefiks numeryczny nazw plików
+            jpeg_draft (bool, optional): Czy dekodować JPEG w zmniejszonej skali. Domyślnie True.
+            heic_thumbnails (bool, optional): Czy użyć osadzonej miniatury HEIC. Domyślnie True.
+            workers (int, optional): Liczba procesów kodujących. Jeśli większa od 1, zdekodowane piksele
+                trafiają do pamięci współdzielonej, a wersje są skalowane i kodowane równolegle.
+            executor (concurrent.futures.Executor, optional): Istniejąca pula procesów do kodowania
+                równoległego (zamiast tworzenia nowej dla `workers`)
+            time_budget (float, optional): Budżet czasu w sekundach dla wszystkich wersji pliku, liczony
+                od otwarcia pliku. Przy kodowaniu w procesie każda wersja dostaje część pozostałego czasu
+                proporcjonalną do liczby pikseli (niewykorzystany czas przechodzi na kolejne wersje);
+                przy kodowaniu równoległym każda wersja dostaje cały pozostały czas. Raport: `ConversionResult.budget`.
+            
+        Returns:
+            list: Lista ConversionResult w kolejności `renditions`. Czas każdego wyniku obejmuje
+                skalowanie i kodowanie danej wersji; wspólne dekodowanie jest doliczone do największej wersji.
+        """
+        try:
+            start = time.perf_counter()
+            # Wspólny budżet pliku; jego zegar mierzy też budżety poszczególnych wersji
+            file_budget = EncodeBudget(time_budget) if time_budget else None
+            source, source_size = self._open_header(input_path)
+            targets = [spec.new_resolution or self.calculate_dimensions(*source_size, spec.longer_edge, spec.shorter_edge) for spec in renditions]
+            
+            # Dekoduj w rozdzielczości wystarczającej dla największej wersji
+            if any(target is None for target in targets):
+                decode_resolution = None
             else:
-                # Zapisz z domyślnymi opcjami dla danego formatu
-                image.save(output_path, format=output_format, **save_options)
+                decode_resolution = (max(target[0] for target in targets), max(target[1] for target in targets))
+            image = self._decode_source(source, decode_resolution, jpeg_draft, heic_thumbnails)
+            image.load()
+            
+            if executor is not None or (workers and workers > 1 and len(renditions) > 1):
+                return self._convert_renditions_shared(input_path, renditions, targets, image, source_size, output_directory, number_prefix, workers, executor, file_budget)
+            
+            # Kolejność od największej do najmniejszej wersji
+            order = sorted(range(len(renditions)), key=lambda i: -(targets[i][0] * targets[i][1]) if targets[i] else -float("inf"))
+            pixels = [(target or image.size)[0] * (target or image.size)[1] for target in targets]
+            pending_pixels = sum(pixels)
+            base_images = {}
+            cascade = {}
+            results = [None] * len(renditions)
+            for index in order:
+                spec = renditions[index]
+                target = targets[index]
+                budget = None
+                if file_budget is not None:
+                    # Część pozostałego czasu pliku proporcjonalna do liczby pikseli wersji
+                    budget = EncodeBudget(max(0.0, file_budget.remaining()) * pixels[index] / pending_pixels, clock=file_budget.clock)
+                    pending_pixels -= pixels[index]
+                # Obraz bazowy jest konwertowany do RGB tylko raz (PNG zachowuje tryb źródła)
+                mode_key = "native" if spec.output_format == "PNG" or image.mode == "RGB" else "RGB"
+                if mode_key not in base_images:
+                    base_images[mode_key] = image if mode_key == "native" else image.convert("RGB")
+                rendition_image = base_images[mode_key]
+                if target:
+                    # Skaluj z poprzedniej (większej) wersji, jeśli jest wystarczająco duża
+                    previous = cascade.get(mode_key)
+                    if previous is not None and previous.size[0] >= target[0] and previous.size[1] >= target[1]:
+                        rendition_image = previous
+                    rendition_image = self.resize_image(rendition_image, target, upscale=spec.options.get("upscale", True))
+                    cascade[mode_key] = rendition_image
                 
-            return output_path
+                output_path = self.file_manager.generate_output_filename(input_path, spec.output_format, spec.suffix, output_directory=output_directory, number_prefix=number_prefix)
+                self._write_rendition(rendition_image, spec, output_path, budget)
+                elapsed = time.perf_counter() - start
+                start = time.perf_counter()
+                results[index] = ConversionResult(input_path, output_path, source_size, rendition_image.size, os.path.getsize(output_path), elapsed, self.last_encode_count, budget=budget)
+            return results
         except Exception as e:
             raise Exception(f"Błąd konwersji: {str(e)}")
+
+    def _convert_renditions_shared(self, input_path, renditions, targets, image, source_size, output_directory=None, number_prefix=None, workers=None, executor=None, file_budget=None):
+        """
+        Koduje wersje równolegle w procesach roboczych. Zdekodowane piksele są zapisywane (tylko przez
+        ten proces) do pamięci współdzielonej, z której procesy robocze czytają je bez kopiowania.
+        Pamięć jest zwalniana po zakończeniu wszystkich zadań, także w razie błędu.
+        
+        Returns:
+            list: Lista ConversionResult w kolejności `renditions`
+        """
+        from concurrent.futures import ProcessPoolExecutor, wait
+        own_executor = executor is None
+        if own_executor:
+            executor = ProcessPoolExecutor(max_workers=min(workers, len(renditions)))
+        # Jeden bufor na tryb: PNG zachowuje tryb źródła, pozostałe formaty potrzebują RGB
+        shared_images = {}
+        futures = []
+        try:
+            for index, spec in enumerate(renditions):
+                mode_key = "native" if spec.output_format == "PNG" or image.mode == "RGB" else "RGB"
+                if mode_key not in shared_images:
+                    shared_images[mode_key] = SharedImage(image if mode_key == "native" else image.convert("RGB"))
+                output_path = self.file_manager.generate_output_filename(input_path, spec.output_format, spec.suffix, output_directory=output_directory, number_prefix=number_prefix)
+                # Wersje są kodowane jednocześnie, więc każda dostaje cały pozostały czas pliku (czas oczekiwania
+                # w kolejce puli jest odejmowany w procesie roboczym)
+                time_budget = (max(0.0, file_budget.remaining()), time.time()) if file_budget is not None else None
+                futures.append(executor.submit(_encode_shared_rendition, shared_images[mode_key].descriptor(), spec, targets[index], output_path, time_budget))
+            results = []
+            for future, spec in zip(futures, renditions):
+                output_path, output_size, file_size, elapsed, encode_count, budget = future.result()
+                results.append(ConversionResult(input_path, output_path, source_size, output_size, file_size, elapsed, encode_count, budget=budget))
+            return results
+        finally:
+            # Bufor można zwolnić dopiero, gdy żaden proces roboczy z niego nie korzysta
+            wait(futures)
+            for shared_image in shared_images.values():
+                shared_image.release()
+            if own_executor:
+                executor.shutdown()
+
+    def _write_rendition(self, image, spec, output_path, budget=None):
+        """
+        Zapisuje jedną wersję zgodnie z jej specyfikacją (z budżetem czasu `budget` tej wersji)
+        """
+        self._encode(image, output_path, spec.output_format, spec.max_size_kb, spec.strip_metadata, spec.webp_lossless, spec.options.get("quality_search", "bisect"), spec.options.get("fast_probes", True), spec.options.get("encoder_profile"), budget)
+
+    def _convert(self, input_path, output_path, output_format="JPEG", max_size_kb=None, new_resolution=None, strip_metadata=False, webp_lossless=False, quality_search="bisect", fast_probes=True, jpeg_draft=True, heic_thumbnails=True, upscale=True, longer_edge=None, shorter_edge=None, encoder_profile=None, time_budget=None):
+        """
+        Wspólna implementacja `convert_heic_to_format` i `run_job`
+        
+        Returns:
+            tuple: (rozmiar źródłowy, rozmiar wyjściowy) jako pary (szerokość, wysokość)
+        """
+        budget = EncodeBudget(time_budget) if time_budget else None
+        self.last_budget = budget
+        if self.observer is not None:
+            self._observed_source = input_path if isinstance(input_path, (str, os.PathLike)) else None
+        if self.pixel_cache is not None and isinstance(input_path, (str, os.PathLike)):
+            image, source_size = self._prepare_cached_image(input_path, output_format, new_resolution, jpeg_draft, heic_thumbnails, upscale, longer_edge, shorter_edge)
+        else:
+            image, source_size, new_resolution = self._open_source(input_path, new_resolution, longer_edge, shorter_edge, jpeg_draft, heic_thumbnails)
+            image = self._prepare_image(image, output_format, new_resolution, upscale)
+        self._encode(image, output_path, output_format, max_size_kb, strip_metadata, webp_lossless, quality_search, fast_probes, encoder_profile, budget)
+        return source_size, image.size
+
+    def _encode(self, image, output_path, output_format, max_size_kb=None, strip_metadata=False, webp_lossless=False, quality_search="bisect", fast_probes=True, encoder_profile=None, budget=None):
+        """
+        Zapisuje przygotowany obraz. Z budżetem czasu profil kodera jest dobierany do pozostałego
+        czasu, a zmierzony czas kodowania uaktualnia szacunki kosztu.
+        """
+        if budget is not None:
+            encoder_profile = self._select_encoder_profile(image, output_format, webp_lossless, max_size_kb, encoder_profile, budget)
+        save_options = self._build_save_options(image, output_format, strip_metadata, webp_lossless, encoder_profile)
+        if budget is not None:
+            encode_start = budget.clock()
+        self._write_image(image, output_path, output_format, save_options, max_size_kb, strip_metadata, webp_lossless, quality_search, fast_probes, budget)
+        if budget is not None:
+            self._calibrate_encode_cost(image, output_format, webp_lossless, encoder_profile, budget, budget.clock() - encode_start)
+            budget.finish()
+
+    def _select_encoder_profile(self, image, output_format, webp_lossless, max_size_kb, encoder_profile, budget):
+        """
+        Wybiera profil o największym nakładzie, którego szacowany czas kodowania (koszt na megapiksel
+        z `encode_cost` razy liczba megapikseli i przewidywana liczba kodowań) mieści się
+        w pozostałym budżecie. Profil `encoder_profile` jest górną granicą; profil własny (słownik)
+        jest szacowany jak "max-compression". Jeśli żaden profil się nie mieści, wybierany jest "fast".
+        
+        Returns:
+            str or dict: Profil kodera do zapisu
+        """
+        format_key = "WebP_lossless" if output_format == "WebP" and webp_lossless else output_format
+        if format_key not in self.encode_cost["fast"]:
+            # BMP i GIF nie mają parametrów nakładu
+            return encoder_profile
+        if isinstance(encoder_profile, dict):
+            candidates = [encoder_profile] + list(EFFORT_LADDER[1:])
+        else:
+            name = encoder_profile or DEFAULT_ENCODER_PROFILE
+            resolve_encoder_profile(name)
+            candidates = list(EFFORT_LADDER[EFFORT_LADDER.index(name):]) if name in EFFORT_LADDER else [name]
+        encodes = 1
+        if max_size_kb and format_key in ("JPEG", "WebP"):
+            encodes = PREDICTED_SEARCH_ENCODES if self.quality_predictor is not None else SIZE_SEARCH_ENCODES
+        megapixels = image.width * image.height / 1_000_000
+        remaining = budget.remaining()
+        for candidate in candidates:
+            cost_name = candidate if isinstance(candidate, str) and candidate in self.encode_cost else "max-compression"
+            estimate = self.encode_cost[cost_name][format_key] * megapixels * encodes
+            if estimate <= remaining:
+                break
+        budget.encoder_profile = candidate if isinstance(candidate, str) else "custom"
+        budget.estimate = estimate
+        if candidate is not candidates[0]:
+            budget.degraded.append(f"profil {budget.encoder_profile}")
+        return candidate
+
+    def _calibrate_encode_cost(self, image, output_format, webp_lossless, encoder_profile, budget, elapsed):
+        """
+        Uaktualnia `encode_cost` zmierzonym czasem kodowania (średnia wykładnicza), aby kolejne
+        szacunki uwzględniały szybkość maszyny i rodzaj obrazów. Pomijane po obniżeniu nakładu w trakcie
+        wyszukiwania jakości, bo czas nie odpowiada wtedy profilowi.
+        """
+        format_key = "WebP_lossless" if output_format == "WebP" and webp_lossless else output_format
+        if not isinstance(encoder_profile, str) or encoder_profile not in self.encode_cost or format_key not in self.encode_cost[encoder_profile] or budget.degraded_search:
+            return
+        megapixels = image.width * image.height / 1_000_000
+        if not megapixels or not self.last_encode_count:
+            return
+        observed = elapsed / self.last_encode_count / megapixels
+        costs = self.encode_cost[encoder_profile]
+        costs[format_key] = 0.5 * costs[format_key] + 0.5 * observed
+
+    def _prepare_cached_image(self, input_path, output_format, new_resolution, jpeg_draft, heic_thumbnails, upscale, longer_edge, shorter_edge):
+        """
+        Zwraca obraz gotowy do kodowania z pamięci podręcznej pikseli albo dekoduje i skaluje go,
+        zapisując wynik do pamięci podręcznej. Błędy pamięci podręcznej nie przerywają konwersji.
+        
+        Returns:
+            tuple: (obraz gotowy do zapisu, rozmiar źródłowy)
+        """
+        key = None
+        try:
+            # PNG zachowuje tryb źródła, pozostałe formaty dostają obraz RGB
+            key = self.pixel_cache.image_key(input_path, "native" if output_format == "PNG" else "RGB", new_resolution, longer_edge, shorter_edge, upscale=upscale, jpeg_draft=jpeg_draft, heic_thumbnails=heic_thumbnails, draft_reducing_gap=self.draft_reducing_gap, resize_reducing_gap=self.resize_reducing_gap, resize_filters=RESIZE_FILTERS)
+            timer = StageTimer("pixel_cache_load") if self.observer is not None else None
+            cached = self.pixel_cache.load(key)
+            if cached is not None:
+                if timer is not None:
+                    self._emit(timer, pixels_out=cached[0].width * cached[0].height)
+                return cached
+        except Exception as e:
+            print(f"Uwaga: Pamięć podręczna pikseli niedostępna: {str(e)}")
+            key = None
+        image, source_size, new_resolution = self._open_source(input_path, new_resolution, longer_edge, shorter_edge, jpeg_draft, heic_thumbnails)
+        image = self._prepare_image(image, output_format, new_resolution, upscale)
+        if key is not None:
+            try:
+                self.pixel_cache.store(key, image, source_size)
+            except Exception as e:
+                print(f"Uwaga: Nie udało się zapisać pikseli w pamięci podręcznej: {str(e)}")
+        return image, source_size
+
+    def calculate_dimensions(self, original_width, original_height, longer_edge=None, shorter_edge=None):
+        """
+        Oblicza nowe wymiary obrazu na podstawie ustawień dłuższej i krótszej krawędzi
+        
+        Args:
+            original_width (int): Oryginalna szerokość obrazu
+            original_height (int): Oryginalna wysokość obrazu
+            longer_edge (int or str, optional): Dłuższa krawędź (liczba lub tekst z ustawień)
+            shorter_edge (int or str, optional): Krótsza krawędź (liczba lub tekst z ustawień)
+            
+        Returns:
+            tuple: (nowa_szerokość, nowa_wysokość) lub None jeśli nie ustawiono wymiarów
+        """
+        # Określ, która krawędź jest dłuższa, a która krótsza w oryginalnym obrazie
+        if original_width >= original_height:
+            original_longer = original_width
+            original_shorter = original_height
+            is_landscape = True
+        else:
+            original_longer = original_height
+            original_shorter = original_width
+            is_landscape = False
+        
+        if original_shorter == 0:
+            return None
+        
+        # Oblicz współczynnik proporcji
+        aspect_ratio = original_longer / original_shorter
+        
+        # Przetwarzanie wartości wejściowych (0 lub pusta wartość oznacza brak ustawienia)
+        longer_edge_val = self._parse_edge(longer_edge)
+        shorter_edge_val = self._parse_edge(shorter_edge)
+        
+        # Obliczanie nowych wymiarów
+        if longer_edge_val and shorter_edge_val:
+            # Obie wartości są określone - używamy ich bezpośrednio
+            new_longer = longer_edge_val
+            new_shorter = shorter_edge_val
+        elif longer_edge_val:
+            # Tylko dłuższa krawędź jest określona
+            new_longer = longer_edge_val
+            new_shorter = int(new_longer / aspect_ratio)
+        elif shorter_edge_val:
+            # Tylko krótsza krawędź jest określona
+            new_shorter = shorter_edge_val
+            new_longer = int(new_shorter * aspect_ratio)
+        else:
+            # Żadna wartość nie jest określona
+            return None
+        
+        if new_longer <= 0 or new_shorter <= 0:
+            return None
+            
+        # Konwersja z powrotem na szerokość i wysokość
+        if is_landscape:
+            return (new_longer, new_shorter)
+        else:
+            return (new_shorter, new_longer)
+
+    def _parse_edge(self, value):
+        """
+        Zamienia wartość krawędzi z ustawień (int lub tekst) na int albo None
+        """
+        if isinstance(value, int):
+            return value if value > 0 else None
+        if value and str(value).isdigit():
+            return int(value) or None
+        return None
+
+    def _open_source(self, input_path, new_resolution=None, longer_edge=None, shorter_edge=None, jpeg_draft=True, heic_thumbnails=True):
+        """
+        Otwiera plik źródłowy (parsując nagłówek tylko raz), wylicza docelowe wymiary
+        i przygotowuje najtańszą ścieżkę dekodowania (miniatura HEIC, JPEG draft)
+        
+        Returns:
+            tuple: (obraz, rozmiar źródłowy, docelowa rozdzielczość lub None)
+        """
+        timer = StageTimer("open") if self.observer is not None else None
+        source, source_size = self._open_header(input_path)
+        if timer is not None:
+            bytes_in = os.path.getsize(input_path) if isinstance(input_path, (str, os.PathLike)) else None
+            self._emit(timer, pixels_in=source_size[0] * source_size[1], bytes_in=bytes_in)
+        if new_resolution is None:
+            new_resolution = self.calculate_dimensions(*source_size, longer_edge, shorter_edge)
+        timer = StageTimer("decode") if self.observer is not None else None
+        image = self._decode_source(source, new_resolution, jpeg_draft, heic_thumbnails)
+        if timer is not None:
+            # Pillow dekoduje leniwie - przy pomiarach dekodowanie jest wymuszane tutaj, a nie w pierwszym użyciu
+            image.load()
+            self._emit(timer, pixels_in=source_size[0] * source_size[1], pixels_out=image.width * image.height)
+        return image, source_size, new_resolution
+
+    def _open_header(self, input_path):
+        """
+        Parsuje nagłówek pliku źródłowego bez dekodowania pikseli
+        
+        Returns:
+            tuple: (uchwyt źródła - pillow_heif.HeifImage lub PIL.Image, rozmiar źródłowy)
+        """
+        if is_heif(input_path):
+            # Plik HEIF parsujemy bezpośrednio przez pillow_heif, aby móc sięgnąć po miniatury
+            heif_file = load_heif().open_heif(input_path)
+            primary = heif_file[heif_file.primary_index]
+            return primary, primary.size
+        # Odczyt pliku przez PIL (tylko nagłówek, dekodowanie następuje przy pierwszym użyciu)
+        image = _open_image(input_path)
+        if self.memory_map_inputs and isinstance(input_path, (str, os.PathLike)):
+            image = self._memory_map_image(image, input_path)
+        return image, image.size
+
+    def _memory_map_image(self, image, input_path):
+        """
+        Dla dużych plików skompresowanych (PNG, TIFF LZW/Deflate, JPEG) podaje dekoderowi Pillow
+        mapę pamięci pliku zamiast buforowanego obiektu pliku. Nieskompresowane dane (np. TIFF, BMP)
+        Pillow mapuje sam przy otwieraniu po nazwie, więc te pliki pozostają bez zmian.
+        Jeśli mapowanie się nie powiedzie (np. system plików go nie obsługuje), zwracany jest
+        oryginalny obraz.
+        
+        Args:
+            image (PIL.Image): Obraz otwarty po nazwie pliku
+            input_path (str): Ścieżka do pliku
+            
+        Returns:
+            PIL.Image: Obraz czytany z mapy pamięci lub oryginalny obraz
+        """
+        if len(image.tile) == 1 and image.tile[0][0] == "raw":
+            return image
+        try:
+            if os.path.getsize(input_path) < self.memory_map_threshold:
+                return image
+            with open(input_path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return image
+        try:
+            mapped_image = _open_image(mapped)
+        except Exception:
+            mapped.close()
+            return image
+        image.close()
+        return mapped_image
+
+    def _decode_source(self, source, new_resolution=None, jpeg_draft=True, heic_thumbnails=True):
+        """
+        Wybiera najtańszą ścieżkę dekodowania dla docelowej rozdzielczości
+        
+        Args:
+            source: Uchwyt z `_open_header`
+            new_resolution (tuple, optional): Największa potrzebna rozdzielczość (szerokość, wysokość)
+            jpeg_draft (bool): Czy dekodować JPEG w zmniejszonej skali
+            heic_thumbnails (bool): Czy użyć osadzonej miniatury HEIC
+            
+        Returns:
+            PIL.Image: Obraz źródłowy (dla Pillow - jeszcze niezdekodowany)
+        """
+        if isinstance(source, Image.Image):
+            # Dla JPEG dekoduj od razu w zmniejszonej skali (DCT), jeśli obraz docelowy jest znacznie mniejszy
+            if new_resolution and jpeg_draft:
+                self._apply_jpeg_draft(source, new_resolution)
+            return source
+        image = None
+        # Dla małych rozmiarów docelowych HEIC dekoduj tylko osadzoną miniaturę
+        if new_resolution and heic_thumbnails:
+            image = self._open_heic_thumbnail(source, new_resolution)
+        if image is None:
+            image = source.to_pillow()
+        return image
+
+    def _prepare_image(self, image, output_format, new_resolution=None, upscale=True):
+        """
+        Konwertuje tryb kolorów i skaluje obraz przed kodowaniem
+        
+        Returns:
+            PIL.Image: Obraz gotowy do zapisu
+        """
+        # Konwersja do trybu RGB, jeśli to konieczne
+        if image.mode != 'RGB' and output_format != 'PNG':
+            timer = StageTimer("mode_convert") if self.observer is not None else None
+            image = image.convert('RGB')
+            if timer is not None:
+                self._emit(timer, pixels_in=image.width * image.height, pixels_out=image.width * image.height)
+        
+        # Skalowanie obrazu, jeśli podano nową rozdzielczość
+        if new_resolution:
+            timer = StageTimer("resize") if self.observer is not None else None
+            pixels_in = image.width * image.height
+            image = self.resize_image(image, new_resolution, upscale=upscale)
+            if timer is not None:
+                self._emit(timer, pixels_in=pixels_in, pixels_out=image.width * image.height)
+        return image
+
+    def _emit(self, timer, **fields):
+        """
+        Kończy pomiar etapu i przekazuje zdarzenie obserwatorowi (oraz do wyniku `run_job`)
+        """
+        event = timer.finish(self._observed_source, **fields)
+        if self._stage_events is not None:
+            self._stage_events.append(event)
+        self.observer(event)
+
+    def _output_size(self, output_path):
+        """
+        Rozmiar zapisanego wyniku dla zdarzeń etapów (None, jeśli nie da się go ustalić)
+        """
+        try:
+            if isinstance(output_path, (str, os.PathLike)):
+                return os.path.getsize(output_path)
+            return output_path.tell()
+        except (OSError, AttributeError, ValueError):
+            return None
+
+    def _build_save_options(self, image, output_format, strip_metadata=False, webp_lossless=False, encoder_profile=None):
+        """
+        Buduje opcje zapisu dla danego formatu
+        
+        Args:
+            encoder_profile (str or dict, optional): Profil nakładu kodera (zob. `resolve_encoder_profile`)
+        
+        Returns:
+            dict: Opcje przekazywane do `Image.save`
+        """
+        save_options = {}
+        profile = resolve_encoder_profile(encoder_profile)
+        
+        # Opcje zależne od formatu
+        if output_format == "JPEG":
+            save_options["quality"] = 95
+            save_options.update(profile.get("JPEG", {}))
+            if strip_metadata:
+                save_options["exif"] = b''
+                save_options["icc_profile"] = None
+            else:
+                if image.info.get('exif'):
+                    save_options["exif"] = image.info['exif']
+                if image.info.get('icc_profile'):
+                    save_options["icc_profile"] = image.info['icc_profile']
+        elif output_format == "PNG":
+            save_options.update(profile.get("PNG", {}))
+            if strip_metadata:
+                # Для PNG, Pillow может не иметь прямого способа удалить все метаданные через save_options
+                # image.info может быть очищен перед сохранением, но это не гарантирует удаление всех чанков.
+                # Опция optimize=True помогает уменьшить размер файла, включая некоторые метаданные.
+                # Если требуется более агрессивное удаление, может понадобиться сторонняя библиотека или более сложная обработка.
+                pass  # На данный момент, optimize=True - основная стратегия
+        elif output_format == "WebP":
+            if webp_lossless:
+                save_options["lossless"] = True
+                # Dla WebP bezstratnego 'quality' oznacza nakład kompresji (z profilu)
+                save_options.update(profile.get("WebP_lossless", {}))
+            else:
+                save_options["quality"] = 90
+                save_options.update(profile.get("WebP", {}))  # 'method' dla WebP stratnego
+                save_options["lossless"] = False
+            
+            if strip_metadata:
+                save_options["icc_profile"] = None
+                save_options["exif"] = b''
+            else:
+                # Preserve metadata if not stripping and present
+                if image.info.get('icc_profile'):
+                    save_options["icc_profile"] = image.info['icc_profile']
+                if image.info.get('exif'):
+                    save_options["exif"] = image.info['exif']
+        elif output_format == "TIFF":
+            tiff_options = dict(profile.get("TIFF", {}))
+            compression = tiff_options.pop("compression", "lzw")
+            save_options["compression"] = TIFF_COMPRESSION.get(compression, compression)
+            save_options.update(tiff_options)
+            if strip_metadata:
+                # Для TIFF, удаление метаданных может быть сложнее и зависит от конкретных тегов.
+                # Pillow может не предоставлять простой опции для удаления всех метаданных.
+                # Можно попробовать сохранить без определенных тегов, если они известны.
+                pass # На данный момент нет простого способа удалить все метаданные для TIFF
+        elif output_format == "BMP":
+            # BMP обычно не хранит много метаданных, но на всякий случай
+            if strip_metadata:
+                pass # Pillow не предоставляет опций для удаления метаданных для BMP
+        elif output_format == "GIF":
+            # GIF также обычно не содержит сложных метаданных как EXIF
+            if strip_metadata:
+                pass # Pillow не предоставляет опций для удаления метаданных для GIF
+        
+        return save_options
+
+    def _write_image(self, image, output_path, output_format, save_options, max_size_kb=None, strip_metadata=False, webp_lossless=False, quality_search="bisect", fast_probes=True, budget=None):
+        """
+        Zapisuje obraz, w razie potrzeby z wyszukiwaniem jakości dla limitu rozmiaru
+        (z obniżaniem nakładu kodowań, gdy podano budżet czasu `budget`)
+        """
+        _load_plugin(output_format)
+        search = max_size_kb and output_format in ["JPEG", "WebP"] and not (output_format == "WebP" and webp_lossless)
+        timer = StageTimer("size_limit_search" if search else "encode") if self.observer is not None else None
+        # Obsługa max_size_kb i WebP lossless
+        if output_format == "WebP" and webp_lossless:
+            if max_size_kb is not None:
+                print(f"Ostrzeżenie: Opcja max_size_kb ({max_size_kb} KB) jest ignorowana dla formatu WebP w trybie bezstratnym.")
+            # Zapisz bezpośrednio z opcjami bezstratnymi, ignorując _save_with_size_limit
+            image.save(output_path, format=output_format, **save_options)
+            self.last_encode_count = 1
+        elif max_size_kb and output_format in ["JPEG", "WebP"]: # WebP lossy or JPEG
+            self.last_encode_count = self._save_with_size_limit(image, output_path, max_size_kb, output_format, strip_metadata=strip_metadata, base_save_options=save_options, quality_search=quality_search, fast_probes=fast_probes, budget=budget)
+        else:
+            # Zapisz z domyślnymi opcjami dla danego formatu
+            image.save(output_path, format=output_format, **save_options)
+            self.last_encode_count = 1
+        if timer is not None:
+            self._emit(timer, pixels_in=image.width * image.height, bytes_out=self._output_size(output_path), iterations=self.last_encode_count)
     
-    def _save_with_size_limit(self, image, output_path, max_size_kb, output_format="JPEG", strip_metadata: bool = False, base_save_options: dict = None):
+    def resize_image(self, image, new_resolution, upscale: bool = True):
+        """
+        Skaluje obraz z filtrem dobranym do współczynnika skali (RESIZE_FILTERS): małe zmniejszenia
+        jednym krokiem LANCZOS, duże dwuetapowo (Image.reduce o całkowity współczynnik, potem filtr
+        dokładny), bardzo duże z tańszym filtrem BICUBIC; powiększanie filtrem BICUBIC.
+        
+        Args:
+            image (PIL.Image): Obraz do przeskalowania
+            new_resolution (tuple): Nowa rozdzielczość (szerokość, wysokość)
+            upscale (bool): Czy dopuścić powiększanie. Jeśli False, żaden wymiar nie rośnie:
+                czyste powiększenie jest pomijane, a przy zmniejszeniu jednej osi i powiększeniu
+                drugiej powiększana oś zachowuje rozmiar źródłowy.
+            
+        Returns:
+            PIL.Image: Przeskalowany obraz (lub oryginalny, jeśli skalowanie nie jest potrzebne)
+        """
+        new_resolution = tuple(new_resolution)
+        if not upscale:
+            new_resolution = (min(new_resolution[0], image.size[0]), min(new_resolution[1], image.size[1]))
+        if new_resolution == image.size:
+            return image
+        scale = min(new_resolution[0] / image.size[0], new_resolution[1] / image.size[1])
+        if scale >= 1:
+            # LANCZOS przy powiększaniu daje efekt "dzwonienia" na krawędziach
+            return image.resize(new_resolution, Image.Resampling.BICUBIC)
+        for min_scale, resample, reduce_first in RESIZE_FILTERS:
+            if scale >= min_scale:
+                break
+        reducing_gap = self.resize_reducing_gap if reduce_first else None
+        return image.resize(new_resolution, Image.Resampling[resample], reducing_gap=reducing_gap)
+
+    def _open_heic_thumbnail(self, primary, new_resolution):
+        """
+        Zwraca najmniejszą osadzoną miniaturę HEIC/HEIF nie mniejszą niż docelowa rozdzielczość,
+        o ile jest pomniejszoną kopią obrazu głównego (`_is_scaled_thumbnail`).
+        Metadane (EXIF, profil ICC, XMP) są przenoszone z obrazu głównego.
+        
+        Args:
+            primary (pillow_heif.HeifImage): Obraz główny pliku HEIF
+            new_resolution (tuple): Docelowa rozdzielczość (szerokość, wysokość)
+            
+        Returns:
+            PIL.Image: Zdekodowana miniatura lub None, jeśli brak odpowiedniej miniatury
+        """
+        best_thumbnail = None
+        for index in range(len(primary.info.get("thumbnails", []))):
+            try:
+                thumbnail = primary.get_thumbnail(index)
+            except (OSError, ValueError, RuntimeError, IndexError):
+                continue
+            if not self._is_scaled_thumbnail(thumbnail, primary, new_resolution):
+                continue
+            width, height = thumbnail.size
+            if best_thumbnail is None or width * height < best_thumbnail.size[0] * best_thumbnail.size[1]:
+                best_thumbnail = thumbnail
+        if best_thumbnail is None:
+            return None
+        try:
+            image = best_thumbnail.to_pillow()
+        except (OSError, ValueError, RuntimeError):
+            return None
+        for key in ("exif", "icc_profile", "xmp"):
+            if primary.info.get(key):
+                image.info[key] = primary.info[key]
+        return image
+
+    def _is_scaled_thumbnail(self, thumbnail, primary, new_resolution):
+        """
+        Sprawdza, czy miniatura może zastąpić obraz główny: jest nie mniejsza niż docelowa
+        rozdzielczość i mniejsza od obrazu głównego, ma ten sam tryb (w tym kanał alfa), te same
+        proporcje (z dokładnością do zaokrąglenia) i te same przekształcenia (obrót, odbicie, kadr).
+        Miniatura z innym kadrem lub bez alfy dałaby zniekształcony lub błędny wynik.
+        """
+        width, height = primary.size
+        thumbnail_width, thumbnail_height = thumbnail.size
+        if thumbnail.mode != primary.mode:
+            return False
+        if thumbnail_width < new_resolution[0] or thumbnail_height < new_resolution[1]:
+            return False
+        if thumbnail_width >= width and thumbnail_height >= height:
+            return False
+        if abs(thumbnail_width * height - thumbnail_height * width) > 2 * max(width, height):
+            return False
+        # Przekształcenia (irot, imir, clap) udostępniają tylko nowsze wersje pillow_heif; bez nich kadru nie da się sprawdzić
+        transformations = getattr(getattr(primary, "_c_image", None), "transformations", None)
+        thumbnail_transformations = getattr(getattr(thumbnail, "_c_image", None), "transformations", None)
+        return transformations == thumbnail_transformations
+
+    def _apply_jpeg_draft(self, image, new_resolution):
+        """
+        Konfiguruje dekoder JPEG tak, aby dekodował obraz w skali 1/2, 1/4 lub 1/8,
+        zachowując co najmniej `draft_reducing_gap` razy docelową rozdzielczość.
+        Dla innych formatów nic nie robi.
+        
+        Args:
+            image (PIL.Image): Obraz otwarty, jeszcze niezdekodowany
+            new_resolution (tuple): Docelowa rozdzielczość (szerokość, wysokość)
+            
+        Returns:
+            bool: True, jeśli dekodowanie zostanie wykonane w zmniejszonej skali
+        """
+        if image.format != "JPEG":
+            return False
+        requested_size = (int(new_resolution[0] * self.draft_reducing_gap), int(new_resolution[1] * self.draft_reducing_gap))
+        original_size = image.size
+        image.draft(None, requested_size)
+        return image.size != original_size
+
+    def _save_with_size_limit(self, image, output_path, max_size_kb, output_format="JPEG", strip_metadata: bool = False, base_save_options: dict = None, quality_search: str = "bisect", fast_probes: bool = True, budget=None):
         """
         Zapisuje obraz z ograniczeniem rozmiaru
         
@@ -142,20 +1138,32 @@ class ImageConverter:
             output_format (str): Format wyjściowy
             strip_metadata (bool): Czy usunąć metadane
             base_save_options (dict): Bazowe opcje zapisu z `convert_heic_to_format`
+            quality_search (str): Tryb wyszukiwania jakości: "bisect" (przedział + bisekcja)
+                lub "linear" (schodzenie od jakości bazowej co 5). Domyślnie "bisect".
+            fast_probes (bool): Czy próbne kodowania JPEG wykonywać bez `optimize`
+                (jedno końcowe kodowanie z `optimize`). Domyślnie True.
+            budget (EncodeBudget, optional): Budżet czasu; gdy się kończy, kolejne próby są tańsze
+                
+        Returns:
+            int: Liczba wykonanych kodowań obrazu
         """
+        if base_save_options is None:
+            base_save_options = {}
+
         # Jeśli WebP jest w trybie bezstratnym, zapisz raz i zakończ, ignorując pętlę jakości.
         if output_format == "WebP" and base_save_options.get("lossless") is True:
             try:
-                image.save(output_path, format=output_format, **base_save_options)
+                buffer = self._encode_to_buffer(image, output_format, base_save_options)
+                self._write_buffer(buffer, output_path)
                 # Sprawdź rozmiar i wydrukuj ostrzeżenie, jeśli przekracza limit (choć nie było próby redukcji)
                 if max_size_kb is not None: # max_size_kb jest przekazywane, ale nie używane do iteracji
                     max_size_bytes_check = max_size_kb * 1024
-                    if os.path.getsize(output_path) > max_size_bytes_check:
-                        print(f"Uwaga: Rozmiar pliku WebP bezstratnego {os.path.getsize(output_path)/(1024):.2f} KB przekracza docelowy limit {max_size_kb} KB. Limit rozmiaru nie jest wymuszany dla WebP bezstratnego.")
+                    if buffer.tell() > max_size_bytes_check:
+                        print(f"Uwaga: Rozmiar pliku WebP bezstratnego {buffer.tell()/(1024):.2f} KB przekracza docelowy limit {max_size_kb} KB. Limit rozmiaru nie jest wymuszany dla WebP bezstratnego.")
             except Exception as e:
                 # To jest mało prawdopodobne, jeśli save_options są poprawne, ale na wszelki wypadek
                 raise Exception(f"Błąd podczas zapisu WebP bezstratnego w _save_with_size_limit: {str(e)}")
-            return
+            return 1
 
         max_size_bytes = max_size_kb * 1024
         # Dla WebP stratnego, jakość jest już w base_save_options, jeśli była ustawiona.
@@ -164,48 +1172,500 @@ class ImageConverter:
         min_quality = 20 # Minimalna jakość dla JPEG i WebP stratnego
         
         # Użyj kopii base_save_options, aby nie modyfikować oryginału w pętli
-        current_save_options = base_save_options.copy() if base_save_options else {}
+        current_save_options = base_save_options.copy()
 
         # Poniższe warunki dla JPEG i WebP (stratnego) powinny być już obsłużone przez base_save_options
         # przekazane z convert_heic_to_format, w tym strip_metadata.
         # np. current_save_options już będzie miało 'optimize', 'exif', 'icc_profile' dla JPEG
         # lub 'method', 'exif', 'icc_profile' dla WebP stratnego.
 
-        # Iteracyjne zmniejszanie jakości aż do osiągnięcia żądanego rozmiaru
+        # Iteracyjne dobieranie jakości aż do osiągnięcia żądanego rozmiaru
         # (tylko jeśli format wspiera jakość i jakość jest ustawiona - tj. JPEG lub WebP stratny)
         if quality is not None and output_format in ["JPEG", "WebP"] and not current_save_options.get("lossless"):
-            while quality >= min_quality:
-                current_save_options["quality"] = quality
-                temp_buffer = io.BytesIO()
-                try:
-                    image.save(temp_buffer, format=output_format, **current_save_options)
-                    current_size = temp_buffer.tell()
-                    
-                    if current_size <= max_size_bytes:
-                        image.save(output_path, format=output_format, **current_save_options)
-                        return # Zapisano pomyślnie
-                    
-                    quality -= 5
-                except Exception as e:
-                    # Jeśli wystąpi błąd podczas próby zapisu (np. z powodu nieobsługiwanej kombinacji opcji),
-                    # przerwij pętlę i zgłoś problem.
-                    raise Exception(f"Błąd podczas iteracyjnego zapisu {output_format} z jakością {quality}: {str(e)}")
-            
-            # Jeśli pętla zakończyła się, oznacza to, że nie udało się osiągnąć rozmiaru
-            # Zapisz z minimalną jakością
-            current_save_options["quality"] = min_quality
-            try:
-                image.save(output_path, format=output_format, **current_save_options)
-                print(f"Uwaga: Nie udało się osiągnąć wymaganego rozmiaru {max_size_kb} KB dla {output_format}. Zapisano z minimalną jakością {min_quality}.")
-            except Exception as e:
-                raise Exception(f"Błąd podczas zapisu {output_format} z minimalną jakością: {str(e)}")
+            if quality_search == "linear":
+                return self._linear_quality_search(image, output_path, max_size_kb, output_format, current_save_options, quality, min_quality, budget)
+            return self._bisect_quality_search(image, output_path, max_size_kb, output_format, current_save_options, quality, min_quality, fast_probes, budget)
         else:
             # Dla formatów bez kontroli jakości (np. PNG, GIF, BMP) lub WebP lossless (który jest obsługiwany na początku)
             # Zapisz raz z podanymi opcjami (current_save_options pochodzą z base_save_options)
             try:
-                image.save(output_path, format=output_format, **current_save_options)
+                buffer = self._encode_to_buffer(image, output_format, current_save_options)
+                self._write_buffer(buffer, output_path)
                 # Sprawdź rozmiar i wydrukuj ostrzeżenie, jeśli przekracza limit (jeśli max_size_kb było podane)
-                if max_size_kb is not None and os.path.getsize(output_path) > max_size_bytes:
-                     print(f"Uwaga: Rozmiar pliku {os.path.getsize(output_path)/(1024):.2f} KB przekracza docelowy limit {max_size_kb} KB. Format {output_format} (lub bieżące ustawienia) nie wspiera dostosowania jakości w tej funkcji w celu redukcji rozmiaru, lub jest to WebP bezstratny.")
+                if max_size_kb is not None and buffer.tell() > max_size_bytes:
+                     print(f"Uwaga: Rozmiar pliku {buffer.tell()/(1024):.2f} KB przekracza docelowy limit {max_size_kb} KB. Format {output_format} (lub bieżące ustawienia) nie wspiera dostosowania jakości w tej funkcji w celu redukcji rozmiaru, lub jest to WebP bezstratny.")
             except Exception as e:
-                raise Exception(f"Błąd podczas zapisu formatu {output_format} bez iteracji jakości: {str(e)}")
\ No newline at end of file
+                raise Exception(f"Błąd podczas zapisu formatu {output_format} bez iteracji jakości: {str(e)}")
+            return 1
+
+    def _encode_to_buffer(self, image, output_format, save_options):
+        """
+        Koduje obraz do bufora w pamięci
+        
+        Args:
+            image (PIL.Image): Obraz do zakodowania
+            output_format (str): Format wyjściowy
+            save_options (dict): Opcje zapisu
+            
+        Returns:
+            io.BytesIO: Bufor z zakodowanym obrazem
+        """
+        buffer = io.BytesIO()
+        try:
+            image.save(buffer, format=output_format, **save_options)
+        except Exception as e:
+            raise Exception(f"Błąd podczas zapisu {output_format} z jakością {save_options.get('quality')}: {str(e)}")
+        return buffer
+
+    def _write_buffer(self, buffer, output_path):
+        """
+        Zapisuje zawartość bufora do pliku lub strumienia bez ponownego kodowania
+        
+        Args:
+            buffer (io.BytesIO): Bufor z zakodowanym obrazem
+            output_path (str or file object): Ścieżka wyjściowa lub zapisywalny strumień binarny
+        """
+        if hasattr(output_path, "write"):
+            output_path.write(buffer.getbuffer())
+            return
+        with open(output_path, 'wb') as f:
+            f.write(buffer.getbuffer())
+
+    def _linear_quality_search(self, image, output_path, max_size_kb, output_format, save_options, quality, min_quality, budget=None):
+        """
+        Schodzi z jakością co 5 od jakości bazowej, aż obraz zmieści się w limicie
+        
+        Returns:
+            int: Liczba wykonanych kodowań obrazu
+        """
+        max_size_bytes = max_size_kb * 1024
+        encodes = 0
+        while quality >= min_quality:
+            save_options["quality"] = quality
+            if budget is not None:
+                budget.adjust(save_options, output_format)
+                encode_start = budget.clock()
+            buffer = self._encode_to_buffer(image, output_format, save_options)
+            if budget is not None:
+                budget.observe(budget.clock() - encode_start)
+            encodes += 1
+            if buffer.tell() <= max_size_bytes:
+                # Zapisz gotowy bufor zamiast kodować obraz drugi raz
+                self._write_buffer(buffer, output_path)
+                return encodes
+            quality -= 5
+        
+        # Jeśli pętla zakończyła się, oznacza to, że nie udało się osiągnąć rozmiaru
+        # Zapisz z minimalną jakością
+        save_options["quality"] = min_quality
+        try:
+            image.save(output_path, format=output_format, **save_options)
+            encodes += 1
+            print(f"Uwaga: Nie udało się osiągnąć wymaganego rozmiaru {max_size_kb} KB dla {output_format}. Zapisano z minimalną jakością {min_quality}.")
+        except Exception as e:
+            raise Exception(f"Błąd podczas zapisu {output_format} z minimalną jakością: {str(e)}")
+        return encodes
+
+    def _bisect_quality_search(self, image, output_path, max_size_kb, output_format, save_options, quality, min_quality, fast_probes=True, budget=None):
+        """
+        Szuka najwyższej jakości mieszczącej się w limicie przez ograniczenie przedziału i bisekcję.
+        Zwycięski bufor jest zapisywany bezpośrednio, bez ponownego kodowania. Przy `fast_probes`
+        próby JPEG są kodowane bez `optimize`, a jedynie wynik jest kodowany raz z `optimize`.
+        Jeśli ustawiono `quality_predictor`, wyszukiwanie startuje od przewidzianej jakości.
+        
+        Returns:
+            int: Liczba wykonanych kodowań obrazu
+        """
+        max_size_bytes = max_size_kb * 1024
+        final_optimize = fast_probes and output_format == "JPEG" and save_options.get("optimize")
+        probe_options = save_options.copy()
+        if final_optimize:
+            probe_options["optimize"] = False
+        encodes = 0
+
+        def probe(q):
+            nonlocal encodes
+            probe_options["quality"] = q
+            encodes += 1
+            if budget is None:
+                return self._encode_to_buffer(image, output_format, probe_options)
+            budget.adjust(probe_options, output_format)
+            encode_start = budget.clock()
+            buffer = self._encode_to_buffer(image, output_format, probe_options)
+            budget.observe(budget.clock() - encode_start)
+            return buffer
+
+        predictor = self.quality_predictor
+        seed_quality = None
+        accept_seed = False
+        if predictor is not None:
+            content_key = predictor.content_key(image, output_format, max_size_bytes, save_options)
+            seed_quality = predictor.recall(content_key)
+            if seed_quality is not None:
+                # Wynik zapamiętany dla tej samej treści i opcji - pomiń wyszukiwanie
+                accept_seed = True
+            else:
+                features = predictor.extract_features(image, output_format, save_options)
+                seed_quality = predictor.predict(features, max_size_bytes, min_quality, quality)
+            seed_quality = max(min_quality, min(quality, seed_quality))
+
+        best_quality, best_buffer = None, None
+        if seed_quality is None:
+            # Górna granica przedziału: jakość bazowa
+            buffer = probe(quality)
+            if buffer.tell() <= max_size_bytes:
+                best_quality, best_buffer = quality, buffer
+                low, high = quality, quality
+            else:
+                low, high = None, quality
+        else:
+            buffer = probe(seed_quality)
+            if buffer.tell() <= max_size_bytes:
+                best_quality, best_buffer = seed_quality, buffer
+                low, high = seed_quality, None
+                if accept_seed or seed_quality == quality or buffer.tell() >= max_size_bytes * (1 - predictor.tolerance):
+                    high = seed_quality
+                else:
+                    # Rozszerzaj przedział w górę, aż jakość przekroczy limit
+                    step = 2
+                    while high is None:
+                        next_quality = min(quality, low + step)
+                        buffer = probe(next_quality)
+                        if buffer.tell() <= max_size_bytes:
+                            low, best_quality, best_buffer = next_quality, next_quality, buffer
+                            if next_quality == quality:
+                                high = quality
+                        else:
+                            high = next_quality
+                        step *= 2
+            else:
+                low, high = None, seed_quality
+
+        if best_buffer is None:
+            # Rozszerzaj przedział w dół (od ziarna) lub sprawdź od razu jakość minimalną
+            step = 2 if seed_quality is not None else high - min_quality
+            while low is None:
+                if high > min_quality:
+                    next_quality = max(min_quality, high - step)
+                    buffer = probe(next_quality)
+                    if buffer.tell() <= max_size_bytes:
+                        low, best_quality, best_buffer = next_quality, next_quality, buffer
+                        continue
+                    high = next_quality
+                    step *= 2
+                if high == min_quality:
+                    # Ostatni bufor zawiera próbę z jakością minimalną
+                    if final_optimize and (budget is None or budget.allows_final_encode()):
+                        save_options["quality"] = min_quality
+                        buffer = self._encode_to_buffer(image, output_format, save_options)
+                        encodes += 1
+                    self._write_buffer(buffer, output_path)
+                    print(f"Uwaga: Nie udało się osiągnąć wymaganego rozmiaru {max_size_kb} KB dla {output_format}. Zapisano z minimalną jakością {min_quality}.")
+                    return encodes
+
+        # Bisekcja: low zawsze mieści się w limicie, high zawsze go przekracza
+        while high - low > 1:
+            if budget is not None and budget.remaining() <= 0:
+                # Budżet wyczerpany - zapisz najlepszą dotąd jakość mieszczącą się w limicie
+                budget.stop_search(best_quality)
+                break
+            mid = (low + high) // 2
+            buffer = probe(mid)
+            if buffer.tell() <= max_size_bytes:
+                low, best_quality, best_buffer = mid, mid, buffer
+            else:
+                high = mid
+
+        if final_optimize and (budget is None or budget.allows_final_encode()):
+            # Kodowanie z optymalizacją Huffmana nie zwiększa rozmiaru JPEG, ale sprawdzamy to na wszelki wypadek
+            save_options["quality"] = best_quality
+            optimized_buffer = self._encode_to_buffer(image, output_format, save_options)
+            encodes += 1
+            if optimized_buffer.tell() <= best_buffer.tell():
+                best_buffer = optimized_buffer
+        self._write_buffer(best_buffer, output_path)
+
+        if predictor is not None:
+            if not accept_seed:
+                predictor.observe(features, best_quality, best_buffer.tell())
+            predictor.remember(content_key, best_quality)
+        return encodes
+
+
+class SharedImage:
+    # Tryby przechowywane bez kopiowania przez Image.frombuffer (RGB jest w Pillow przechowywane jako 4 bajty)
+    SHARED_MODES = {"RGB": ("RGBX", 4), "RGBA": ("RGBA", 4), "L": ("L", 1)}
+    # Liczba wierszy kopiowanych naraz do pamięci współdzielonej
+    STRIP_ROWS = 256
+
+    def __init__(self, image):
+        """
+        Umieszcza piksele obrazu w pamięci współdzielonej. Tylko właściciel (proces tworzący)
+        zapisuje do bufora; procesy robocze dołączają go w trybie tylko do odczytu.
+        
+        Args:
+            image (PIL.Image): Zdekodowany obraz
+        """
+        if image.mode not in self.SHARED_MODES:
+            image = image.convert("RGBA" if "A" in image.mode or "transparency" in image.info else "RGB")
+        self.mode = image.mode
+        self.size = image.size
+        self.info = {key: image.info[key] for key in ("exif", "icc_profile") if image.info.get(key)}
+        raw_mode, bands = self.SHARED_MODES[self.mode]
+        width, height = self.size
+        row_bytes = width * bands
+        from multiprocessing import shared_memory
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, row_bytes * height))
+        try:
+            # Kopiowanie pasami, aby nie tworzyć pełnej kopii bajtów w pamięci procesu
+            for top in range(0, height, self.STRIP_ROWS):
+                bottom = min(height, top + self.STRIP_ROWS)
+                strip = image.crop((0, top, width, bottom)).tobytes("raw", raw_mode)
+                self.shm.buf[top * row_bytes:top * row_bytes + len(strip)] = strip
+        except Exception:
+            self.release()
+            raise
+
+    def descriptor(self):
+        """
+        Zwraca opis bufora przekazywany do procesów roboczych (bez pikseli)
+        
+        Returns:
+            tuple: (nazwa bufora, tryb, rozmiar, metadane)
+        """
+        return (self.shm.name, self.mode, self.size, self.info)
+
+    def release(self):
+        """
+        Zamyka i usuwa bufor pamięci współdzielonej
+        """
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+
+def _attach_shared_memory(name):
+    """
+    Dołącza istniejący bufor pamięci współdzielonej bez rejestrowania go w resource_tracker.
+    Segmentem zarządza wyłącznie właściciel (SharedImage); proces roboczy, który uruchomił własny
+    resource_tracker (pula utworzona przed pierwszym buforem), przy zakończeniu ostrzegałby o "wycieku"
+    i usuwał segment nadal używany przez właściciela. Przed Pythonem 3.13 (bez `track=False`) rejestracja
+    jest pomijana; wyrejestrowanie po dołączeniu usunęłoby wpis właściciela we wspólnym resource_tracker.
+    """
+    from multiprocessing import shared_memory, resource_tracker
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda resource_name, rtype: None if rtype == "shared_memory" else register(resource_name, rtype)
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def _encode_shared_rendition(descriptor, spec, target, output_path, time_budget=None):
+    """
+    Funkcja procesu roboczego: dołącza bufor pamięci współdzielonej, skaluje i koduje jedną wersję.
+    `time_budget` to para (pozostały czas pliku w s, czas wysłania zadania z time.time()) lub None.
+    
+    Returns:
+        tuple: (ścieżka wyjściowa, wymiary wyniku, rozmiar pliku, czas, liczba kodowań, EncodeBudget lub None)
+    """
+    start = time.perf_counter()
+    budget = None
+    if time_budget is not None:
+        remaining, submitted = time_budget
+        budget = EncodeBudget(max(0.0, remaining - max(0.0, time.time() - submitted)))
+    name, mode, size, info = descriptor
+    shm = _attach_shared_memory(name)
+    view = shm.buf.toreadonly()
+    image = None
+    error = None
+    try:
+        raw_mode = SharedImage.SHARED_MODES[mode][0]
+        image = Image.frombuffer(raw_mode, size, view, "raw", raw_mode, 0, 1)
+        image.info = dict(info)
+        converter = ImageConverter()
+        if target:
+            image = converter.resize_image(image, target, upscale=spec.options.get("upscale", True))
+        if image.mode == "RGBX":
+            image = image.convert("RGB")
+        converter._write_rendition(image, spec, output_path, budget)
+        output_size = image.size
+    except Exception as e:
+        # Wyjątek jest zgłaszany dopiero po zamknięciu bufora: ramki jego śladu trzymają obrazy
+        # odwołujące się do bufora, przez co zamknięcie kończyłoby się błędem BufferError
+        error = str(e)
+    finally:
+        # Obrazy odwołujące się do bufora muszą zostać zwolnione przed jego zamknięciem
+        image = None
+        view.release()
+        shm.close()
+    if error is not None:
+        raise Exception(error)
+    return output_path, output_size, os.path.getsize(output_path), time.perf_counter() - start, converter.last_encode_count, budget
+
+
+class ConversionJob:
+    def __init__(self, input_path, output_path, output_format="JPEG", max_size_kb=None, longer_edge=None, shorter_edge=None, strip_metadata: bool = False, webp_lossless: bool = False, new_resolution=None, **options):
+        """
+        Opis pojedynczej konwersji dla `ImageConverter.run_job`
+        
+        Args:
+            input_path (str): Ścieżka do pliku wejściowego
+            output_path (str): Ścieżka do pliku wyjściowego
+            output_format (str): Format wyjściowy (JPEG, PNG, BMP, TIFF, WebP, GIF)
+            max_size_kb (int, optional): Maksymalny rozmiar pliku wyjściowego w KB
+            longer_edge (int or str, optional): Dłuższa krawędź wyniku
+            shorter_edge (int or str, optional): Krótsza krawędź wyniku
+            strip_metadata (bool, optional): Czy usunąć metadane z obrazu
+            webp_lossless (bool, optional): Czy użyć kompresji bezstratnej dla WebP
+            new_resolution (tuple, optional): Jawna rozdzielczość; ma pierwszeństwo przed krawędziami
+            **options: Pozostałe opcje `convert_heic_to_format` (np. upscale, quality_search)
+        """
+        self.input_path = input_path
+        self.output_path = output_path
+        self.output_format = output_format
+        self.max_size_kb = max_size_kb
+        self.longer_edge = longer_edge
+        self.shorter_edge = shorter_edge
+        self.strip_metadata = strip_metadata
+        self.webp_lossless = webp_lossless
+        self.new_resolution = new_resolution
+        self.options = options
+
+
+class RenditionSpec:
+    def __init__(self, output_format="JPEG", suffix="_converted", longer_edge=None, shorter_edge=None, max_size_kb=None, strip_metadata: bool = False, webp_lossless: bool = False, new_resolution=None, **options):
+        """
+        Opis jednej wersji wyjściowej dla `ImageConverter.convert_renditions`
+        
+        Args:
+            output_format (str): Format wyjściowy (JPEG, PNG, BMP, TIFF, WebP, GIF)
+            suffix (str): Sufiks nazwy pliku (różny dla każdej wersji)
+            longer_edge (int or str, optional): Dłuższa krawędź wyniku
+            shorter_edge (int or str, optional): Krótsza krawędź wyniku
+            max_size_kb (int, optional): Maksymalny rozmiar pliku wyjściowego w KB
+            strip_metadata (bool, optional): Czy usunąć metadane z obrazu
+            webp_lossless (bool, optional): Czy użyć kompresji bezstratnej dla WebP
+            new_resolution (tuple, optional): Jawna rozdzielczość; ma pierwszeństwo przed krawędziami
+            **options: Dodatkowe opcje (upscale, quality_search, fast_probes)
+        """
+        self.output_format = output_format
+        self.suffix = suffix
+        self.longer_edge = longer_edge
+        self.shorter_edge = shorter_edge
+        self.max_size_kb = max_size_kb
+        self.strip_metadata = strip_metadata
+        self.webp_lossless = webp_lossless
+        self.new_resolution = new_resolution
+        self.options = options
+
+
+class EncodeBudget:
+    def __init__(self, time_budget, clock=None):
+        """
+        Budżet czasu konwersji jednego pliku (lub jednej wersji w `convert_renditions`) i raport jego wykorzystania
+        
+        Args:
+            time_budget (float): Budżet w sekundach, liczony od utworzenia obiektu
+            clock (callable, optional): Zegar w sekundach (także dla pomiarów kodowań w wyszukiwaniu jakości).
+                Domyślnie time.perf_counter.
+        """
+        self.time_budget = float(time_budget)
+        self.clock = clock or time.perf_counter
+        self.start = self.clock()
+        # Wybrany profil kodera i szacowany czas kodowania (ustawiane przez `_select_encoder_profile`)
+        self.encoder_profile = None
+        self.estimate = None
+        # Obniżenia nakładu względem żądanego profilu (np. "profil fast", "optimize", "method 2")
+        self.degraded = []
+        self.degraded_search = False
+        self.last_encode = None
+        self.elapsed = None
+
+    def remaining(self):
+        """
+        Returns:
+            float: Pozostały czas w sekundach (ujemny po przekroczeniu budżetu)
+        """
+        return self.time_budget - (self.clock() - self.start)
+
+    def observe(self, elapsed):
+        """
+        Zapisuje czas ostatniego kodowania (szacunek kosztu następnego)
+        """
+        self.last_encode = elapsed
+
+    def adjust(self, save_options, output_format):
+        """
+        Obniża nakład kolejnego kodowania, jeśli pozostały budżet nie wystarczy na nie i zapis wyniku
+        (dwa kodowania w dotychczasowym tempie): JPEG bez `optimize`, WebP z niższym `method`.
+        WebP stratny nie schodzi poniżej `method=2` - niższe wartości nie są szybsze, a dla dużych,
+        szczegółowych obrazów kończą się błędem przepełnienia partycji ("encoding error 6").
+        """
+        if self.last_encode is None or self.remaining() >= 2 * self.last_encode:
+            return
+        if output_format == "JPEG" and save_options.get("optimize"):
+            save_options["optimize"] = False
+            self._degrade("optimize")
+        elif output_format == "WebP" and not save_options.get("lossless") and save_options.get("method", 4) > 2:
+            save_options["method"] = max(2, save_options.get("method", 4) // 2)
+            self._degrade(f"method {save_options['method']}")
+
+    def stop_search(self, quality):
+        """
+        Zapisuje przerwanie bisekcji jakości po wyczerpaniu budżetu
+        """
+        self._degrade(f"jakość {quality} bez dalszej bisekcji")
+
+    def allows_final_encode(self):
+        """
+        Czy zmieści się końcowe kodowanie JPEG z `optimize` (ok. 1,5 czasu próby bez optymalizacji)
+        """
+        if self.last_encode is None or self.remaining() >= 1.5 * self.last_encode:
+            return True
+        self._degrade("optimize")
+        return False
+
+    def _degrade(self, step):
+        self.degraded_search = True
+        self.degraded.append(step)
+
+    def finish(self):
+        self.elapsed = self.clock() - self.start
+
+    @property
+    def within_budget(self):
+        return self.elapsed is not None and self.elapsed <= self.time_budget
+
+
+class ConversionResult:
+    def __init__(self, input_path, output_path, source_size, output_size, file_size, elapsed, encode_count, cached: bool = False, budget=None, stages=None):
+        """
+        Wynik konwersji zwracany przez `ImageConverter.run_job`
+        
+        Args:
+            input_path (str): Ścieżka do pliku wejściowego
+            output_path (str): Ścieżka do utworzonego pliku
+            source_size (tuple): Wymiary źródła (szerokość, wysokość)
+            output_size (tuple): Wymiary wyniku (szerokość, wysokość)
+            file_size (int): Rozmiar pliku wynikowego w bajtach
+            elapsed (float): Czas konwersji w sekundach
+            encode_count (int): Liczba kodowań obrazu
+            cached (bool): Czy wynik odtworzono z pamięci podręcznej (bez dekodowania i kodowania)
+            budget (EncodeBudget, optional): Raport budżetu czasu: budżet, czas osiągnięty, wybrany profil
+                i obniżenia nakładu; None, jeśli konwersja nie miała budżetu
+            stages (list, optional): Zdarzenia etapów (StageEvent), jeśli konwerter miał obserwatora
+        """
+        self.input_path = input_path
+        self.output_path = output_path
+        self.source_size = source_size
+        self.output_size = output_size
+        self.file_size = file_size
+        self.elapsed = elapsed
+        self.encode_count = encode_count
+        self.cached = cached
+        self.budget = budget
+        self.stages = stages
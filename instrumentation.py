@@ -0,0 +1,153 @@
+import os
+import sys
+import json
+import time
+import tracemalloc
+
+# Etapy konwersji zgłaszane przez ImageConverter (w kolejności potoku)
+STAGES = ("pixel_cache_load", "open", "decode", "mode_convert", "resize", "encode", "size_limit_search")
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = None
+
+def current_rss():
+    """
+    Zwraca bieżące zużycie pamięci procesu (RSS) w bajtach lub None, jeśli system go nie udostępnia
+    (odczyt /proc/self/statm - tylko Linux)
+    """
+    if _PAGE_SIZE is None:
+        return None
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StageEvent:
+    def __init__(self, stage, source=None, wall_s=0.0, cpu_s=0.0, pixels_in=None, pixels_out=None, bytes_in=None, bytes_out=None, iterations=None, rss_delta=None, traced_delta=None):
+        """
+        Zdarzenie jednego etapu konwersji przekazywane obserwatorowi `ImageConverter.observer`
+
+        Args:
+            stage (str): Nazwa etapu (zob. STAGES)
+            source (str, optional): Plik wejściowy konwersji
+            wall_s (float): Czas rzeczywisty etapu w sekundach
+            cpu_s (float): Czas procesora wątku wykonującego etap w sekundach
+            pixels_in (int, optional): Liczba pikseli na wejściu etapu
+            pixels_out (int, optional): Liczba pikseli na wyjściu etapu
+            bytes_in (int, optional): Rozmiar danych wejściowych (plik źródłowy)
+            bytes_out (int, optional): Rozmiar zakodowanego wyniku
+            iterations (int, optional): Liczba kodowań (dla size_limit_search - iteracje wyszukiwania jakości)
+            rss_delta (int, optional): Zmiana RSS procesu w bajtach (None poza Linuksem)
+            traced_delta (int, optional): Zmiana pamięci śledzonej przez tracemalloc (None, jeśli nie jest włączony)
+        """
+        self.stage = stage
+        self.source = source
+        self.wall_s = wall_s
+        self.cpu_s = cpu_s
+        self.pixels_in = pixels_in
+        self.pixels_out = pixels_out
+        self.bytes_in = bytes_in
+        self.bytes_out = bytes_out
+        self.iterations = iterations
+        self.rss_delta = rss_delta
+        self.traced_delta = traced_delta
+
+    def as_dict(self):
+        return dict(self.__dict__)
+
+
+class StageTimer:
+    __slots__ = ("stage", "wall", "cpu", "rss", "traced")
+
+    def __init__(self, stage):
+        """
+        Mierzy jeden etap: tworzony przez silnik tylko wtedy, gdy ustawiono obserwatora
+        """
+        self.stage = stage
+        self.rss = current_rss()
+        self.traced = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        self.cpu = time.thread_time()
+        self.wall = time.perf_counter()
+
+    def finish(self, source=None, **fields):
+        """
+        Returns:
+            StageEvent: Zdarzenie z czasami i zmianami pamięci od utworzenia licznika
+        """
+        wall = time.perf_counter() - self.wall
+        cpu = time.thread_time() - self.cpu
+        rss = current_rss()
+        event = StageEvent(self.stage, source, wall, cpu, **fields)
+        if self.rss is not None and rss is not None:
+            event.rss_delta = rss - self.rss
+        if self.traced is not None and tracemalloc.is_tracing():
+            event.traced_delta = tracemalloc.get_traced_memory()[0] - self.traced
+        return event
+
+
+def ignore_event(event):
+    """
+    Obserwator, który nic nie robi - włącza pomiary tylko po to, aby zdarzenia trafiły do
+    `ConversionResult.stages` (np. w procesach roboczych BatchConverter)
+    """
+
+
+class StageRecorder:
+    def __init__(self):
+        """
+        Obserwator zbierający zdarzenia w pamięci, np. `converter.observer = StageRecorder()`
+        """
+        self.events = []
+
+    def __call__(self, event):
+        self.events.append(event)
+
+    def clear(self):
+        self.events.clear()
+
+    def summary(self):
+        """
+        Returns:
+            dict: Etap -> łączny czas rzeczywisty w sekundach
+        """
+        return summarize(self.events)
+
+
+def summarize(events):
+    """
+    Sumuje czasy rzeczywiste zdarzeń według etapów
+
+    Returns:
+        dict: Etap -> łączny czas w sekundach
+    """
+    totals = {}
+    for event in events:
+        totals[event.stage] = totals.get(event.stage, 0.0) + event.wall_s
+    return totals
+
+def dominant_stage(events):
+    """
+    Zwraca etap, który zajął najwięcej czasu (np. "decode" - plik ograniczony dekodowaniem HEIC,
+    "size_limit_search" - pętla jakości), lub None dla pustej listy
+    """
+    totals = summarize(events)
+    return max(totals, key=totals.get) if totals else None
+
+
+class JsonLinesObserver:
+    def __init__(self, output=None):
+        """
+        Obserwator zapisujący każde zdarzenie jako linię JSON (np. do pliku dziennika w produkcji)
+
+        Args:
+            output (str or file object, optional): Ścieżka pliku (dopisywanie) lub strumień. Domyślnie sys.stderr.
+        """
+        self.output = open(output, "a", encoding="utf-8") if isinstance(output, (str, os.PathLike)) else (output or sys.stderr)
+
+    def __call__(self, event):
+        self.output.write(json.dumps(event.as_dict(), ensure_ascii=False) + "\n")
+        self.output.flush()
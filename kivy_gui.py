@@ -19,7 +19,9 @@ from kivy.factory import Factory
 from config import ConfigManager
 from file_manager import FileManager
 from image_converter import ImageConverter
-from PIL import Image # Potrzebne do odczytania wymiarów
+from batch_converter import BatchConverter, encoder_profile_from_settings
+from output_cache import OutputCache
+from pixel_cache import PixelCache
 
 # Załaduj plik KV (opcjonalnie, ale zalecane)
 # Builder.load_file('imageconverter.kv') # Zakładamy, że plik kv istnieje
@@ -74,6 +76,7 @@ class ConverterLayout(BoxLayout):
         self.config_manager = ConfigManager()
         self.file_manager = FileManager()
         self.converter = ImageConverter()
+        self.batch_converter = BatchConverter()
         self.available_formats_prop = self.converter.get_available_formats()
         self.load_settings() # Załaduj ustawienia przy starcie
 
@@ -87,6 +90,7 @@ class ConverterLayout(BoxLayout):
 
     def load_settings(self):
         settings = self.config_manager.load_settings()
+        self.settings = settings
         self.max_size_prop = settings.get("max_size", "")
         self.longer_edge_prop = settings.get("longer_edge", "")
         self.shorter_edge_prop = settings.get("shorter_edge", "")
@@ -94,10 +98,15 @@ class ConverterLayout(BoxLayout):
         self.output_format_prop = settings.get("output_format", "JPEG")
         self.output_dir_prop = settings.get("output_directory", "")
         self.delete_originals_prop = settings.get("delete_originals", False)
+        # Pliki niezmienione od poprzedniego uruchomienia (treść i opcje) są odtwarzane bez konwersji
+        self.batch_converter.output_cache = OutputCache() if settings.get("use_output_cache", False) else None
+        self.batch_converter.pixel_cache = PixelCache() if settings.get("use_pixel_cache", False) else None
         self.log_message("Ustawienia wczytane.")
 
     def save_settings(self):
-        settings = {
+        # Ustawienia bez kontrolek w oknie (np. "encoder_profile", "use_output_cache") są zachowywane
+        settings = dict(self.settings)
+        settings.update({
             "max_size": self.max_size_prop,
             "longer_edge": self.longer_edge_prop,
             "shorter_edge": self.shorter_edge_prop,
@@ -105,7 +114,8 @@ class ConverterLayout(BoxLayout):
             "output_format": self.output_format_prop,
             "output_directory": self.output_dir_prop,
             "delete_originals": self.delete_originals_prop
-        }
+        })
+        self.settings = settings
         self.config_manager.save_settings(settings)
         self.log_message("Ustawienia zapisane.")
         
@@ -176,61 +186,22 @@ class ConverterLayout(BoxLayout):
              self.log_message("Ostrzeżenie: Nie wybrano obsługiwanych plików obrazów (HEIC, PNG, JPG, JPEG)")
 
 
-    def calculate_dimensions(self, original_width, original_height):
-        longer_edge = self.longer_edge_prop
-        shorter_edge = self.shorter_edge_prop
-        
-        if original_width >= original_height:
-            original_longer = original_width
-            original_shorter = original_height
-            is_landscape = True
-        else:
-            original_longer = original_height
-            original_shorter = original_width
-            is_landscape = False
-        
-        if original_shorter == 0:
-             return None
-             
-        aspect_ratio = original_longer / original_shorter
-        
-        longer_edge_val = int(longer_edge) if longer_edge and longer_edge.isdigit() else None
-        shorter_edge_val = int(shorter_edge) if shorter_edge and shorter_edge.isdigit() else None
-        
-        if longer_edge_val == 0: longer_edge_val = None
-        if shorter_edge_val == 0: shorter_edge_val = None
-        
-        if longer_edge_val and shorter_edge_val:
-            new_longer = longer_edge_val
-            new_shorter = shorter_edge_val
-        elif longer_edge_val:
-            new_longer = longer_edge_val
-            new_shorter = int(new_longer / aspect_ratio) if aspect_ratio != 0 else original_shorter
-        elif shorter_edge_val:
-            new_shorter = shorter_edge_val
-            new_longer = int(new_shorter * aspect_ratio)
-        else:
-            return None
-            
-        if new_longer <= 0 or new_shorter <= 0:
-             return None
-             
-        if is_landscape:
-            return (new_longer, new_shorter)
-        else:
-            return (new_shorter, new_longer)
-
     def start_conversion_thread(self):
          # Uruchom konwersję w osobnym wątku, aby nie blokować UI
          if not self.selected_files_prop:
             self.log_message("Ostrzeżenie: Nie wybrano plików do konwersji.")
             return
+         try:
+            encoder_profile = encoder_profile_from_settings(self.settings)
+         except Exception as e:
+            self.log_message(f"BŁĄD: {e}")
+            return
          
-         thread = threading.Thread(target=self._conversion_work)
+         thread = threading.Thread(target=self._conversion_work, args=(encoder_profile,))
          thread.daemon = True # Wątek zakończy się wraz z głównym programem
          thread.start()
 
-    def _conversion_work(self):
+    def _conversion_work(self, encoder_profile):
         """Rzeczywista logika konwersji (uruchamiana w wątku)."""
         max_size = self.max_size_prop
         if max_size and max_size.isdigit():
@@ -261,34 +232,29 @@ class ConverterLayout(BoxLayout):
         self.log_message("Rozpoczęto proces konwersji...")
         self.update_progress(0) # Reset progress bar
 
-        for i, image_path in enumerate(self.selected_files_prop):
-            try:
-                output_file = self.file_manager.generate_output_filename(
-                    image_path, 
-                    output_format, 
-                    suffix,
-                    output_directory=final_output_dir
-                )
-                self.log_message(f"Konwertowanie: {os.path.basename(image_path)}...")
-                
-                new_dimensions = None
-                try:
-                    # Otwieramy obraz do sprawdzenia jego wymiarów
-                    with Image.open(image_path) as img:
-                        orig_width, orig_height = img.size
-                        new_dimensions = self.calculate_dimensions(orig_width, orig_height)
-                except Exception as img_e:
-                     self.log_message(f"   BŁĄD odczytu wymiarów {os.path.basename(image_path)}: {img_e}")
-                
-                self.converter.convert_heic_to_format(
-                    image_path, 
-                    output_file,
-                    output_format=output_format,
-                    max_size_kb=max_size, 
-                    new_resolution=new_dimensions
-                )
-                
-                self.log_message(f" -> Zapisano jako: {os.path.basename(output_file)}")
+        jobs = self.batch_converter.build_jobs(
+            self.selected_files_prop,
+            output_format=output_format,
+            suffix=suffix,
+            output_directory=final_output_dir,
+            max_size_kb=max_size,
+            longer_edge=self.longer_edge_prop,
+            shorter_edge=self.shorter_edge_prop,
+            encoder_profile=encoder_profile
+        )
+        self.log_message(f"Konwertowanie plików: {total_files}...")
+        self.batch_converter.profiling = self.settings.get("profiling", False)
+        
+        # Wyniki pojawiają się w kolejności zakończenia konwersji
+        for i, batch_result in enumerate(self.batch_converter.iter_results(jobs)):
+            image_path = batch_result.input_path
+            if batch_result.ok:
+                result = batch_result.result
+                self.log_message(f" -> {os.path.basename(image_path)} zapisano jako: {os.path.basename(result.output_path)} ({result.output_size[0]}x{result.output_size[1]}, {result.file_size / 1024:.1f} KB, {result.elapsed:.2f} s)")
+                if result.cached:
+                    self.log_message("   Pobrano z pamięci podręcznej (bez ponownej konwersji)")
+                elif max_size:
+                    self.log_message(f"   Liczba kodowań (limit {max_size} KB): {result.encode_count}")
                 
                 # Usuń oryginalny plik, jeśli opcja jest włączona
                 if delete_originals:
@@ -297,17 +263,17 @@ class ConverterLayout(BoxLayout):
                         self.log_message(f"   Usunięto oryginał: {os.path.basename(image_path)}")
                     except OSError as e:
                         self.log_message(f"   BŁĄD: Nie można usunąć oryginału {os.path.basename(image_path)}: {e}")
-                
                 converted_files += 1
-                
-            except Exception as e:
-                self.log_message(f"BŁĄD konwersji pliku {os.path.basename(image_path)}: {str(e)}")
-            finally:
-                # Aktualizacja postępu po każdym pliku (udanym lub nie)
-                progress_value = ((i + 1) / total_files) * 100
-                self.update_progress(progress_value)
+            else:
+                self.log_message(f"BŁĄD konwersji pliku {os.path.basename(image_path)}: {batch_result.error}")
+            
+            # Aktualizacja postępu po każdym pliku (udanym lub nie)
+            progress_value = ((i + 1) / total_files) * 100
+            self.update_progress(progress_value)
 
         self.log_message(f"Konwersja zakończona. Przekonwertowano {converted_files} z {total_files} plików.")
+        if self.batch_converter.last_profile_report:
+            self.log_message(f"Raport profilowania: {self.batch_converter.last_profile_report['report']}")
         self.update_progress(0) # Reset progress bar po zakończeniu
 
     @mainthread
@@ -338,6 +304,11 @@ class ImageConverterKivyApp(App):
              pass 
         return ConverterLayout()
 
+    def on_stop(self):
+        # Zamknij pulę procesów konwersji (używaną przez kolejne partie)
+        if isinstance(self.root, ConverterLayout):
+            self.root.batch_converter.close()
+
 # Poniższe widgety Button i Label są potrzebne, jeśli nie używamy pliku KV
 # lub jeśli chcemy mieć je dostępne w kodzie Pythona bez odwoływania się przez ids
 from kivy.uix.button import Button
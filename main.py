@@ -17,6 +17,9 @@ def main():
     
     # Uruchom główną pętlę aplikacji
     root.mainloop()
+    
+    # Zamknij pulę procesów konwersji (używaną przez kolejne partie)
+    app.batch_converter.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,283 @@
+import os
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+
+# Wersja formatu klucza - zmiana unieważnia wpisy utworzone przez starszy silnik
+CACHE_VERSION = 3
+
+def default_cache_directory():
+    """
+    Zwraca katalog pamięci podręcznej użytkownika dla aplikacji
+    (%LOCALAPPDATA% w Windows, $XDG_CACHE_HOME lub ~/.cache w pozostałych systemach)
+    """
+    base = os.environ.get("LOCALAPPDATA") if os.name == "nt" else os.environ.get("XDG_CACHE_HOME")
+    if not base:
+        base = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "konwerter_obrazow")
+
+def file_digest(path):
+    """
+    Zwraca skrót SHA-256 zawartości pliku (czytanego blokami po 1 MB)
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _normalize_edge(value):
+    """
+    Sprowadza krawędź (int, str lub pustą wartość) do int lub None, aby "1000" i 1000 dawały ten sam klucz
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    return int(value) if value.isdigit() and int(value) > 0 else None
+
+
+class DiskCache:
+    def __init__(self, cache_directory, max_size_mb: int = 2048, max_entries: int = None):
+        """
+        Wspólna podstawa pamięci podręcznych na dysku: pliki danych w katalogu `blobs` i indeks SQLite
+        z rozmiarem, metadanymi (JSON) i czasem ostatniego użycia każdego wpisu do usuwania LRU
+
+        Args:
+            cache_directory (str): Katalog pamięci podręcznej
+            max_size_mb (int): Maksymalny łączny rozmiar przechowywanych plików w MB
+            max_entries (int, optional): Maksymalna liczba wpisów
+        """
+        self.cache_directory = cache_directory
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        self.max_entries = max_entries
+        self.index_file = os.path.join(self.cache_directory, "index.sqlite")
+        # Liczniki bieżącej sesji (liczniki trwałe są w indeksie, zob. `stats`)
+        self.hits = 0
+        self.misses = 0
+        # Połączenie jest otwierane leniwie w każdym procesie (obiekt trafia do procesów roboczych)
+        self._db = None
+        self._db_pid = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_db"] = None
+        state["_db_pid"] = None
+        return state
+
+    def _connection(self):
+        """
+        Zwraca połączenie z indeksem, tworząc katalog i tabele przy pierwszym użyciu
+        """
+        if self._db is None or self._db_pid != os.getpid():
+            os.makedirs(os.path.join(self.cache_directory, "blobs"), exist_ok=True)
+            self._db = sqlite3.connect(self.index_file, timeout=30, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, blob TEXT NOT NULL, size INTEGER NOT NULL, meta TEXT, created REAL, last_used REAL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self._db_pid = os.getpid()
+        return self._db
+
+    def content_hash(self, path):
+        """
+        Zwraca skrót SHA-256 zawartości pliku (czytanego blokami po 1 MB)
+        """
+        return file_digest(path)
+
+    def _blob_path(self, blob):
+        return os.path.join(self.cache_directory, "blobs", blob[:2], blob)
+
+    def _count(self, name):
+        self._connection().execute("INSERT INTO counters (name, value) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1", (name,))
+
+    def _forget(self, key, blob):
+        self._connection().execute("DELETE FROM entries WHERE key = ?", (key,))
+        try:
+            os.remove(self._blob_path(blob))
+        except OSError:
+            pass
+
+    def _lookup(self, key):
+        """
+        Wyszukuje wpis i sprawdza, czy jego plik istnieje, ma zapisany rozmiar i przechodzi `_verify`.
+        Wpis niespójny jest usuwany. Trafienie aktualizuje czas ostatniego użycia i liczniki.
+
+        Returns:
+            tuple: (ścieżka pliku, metadane) lub None
+        """
+        db = self._connection()
+        row = db.execute("SELECT blob, size, meta FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            blob, size, meta = row
+            blob_path = self._blob_path(blob)
+            try:
+                valid = os.path.getsize(blob_path) == size and self._verify(blob_path, json.loads(meta) if meta else {})
+            except OSError:
+                valid = False
+            if valid:
+                db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+                self._count("hits")
+                self.hits += 1
+                return blob_path, json.loads(meta) if meta else {}
+            self._forget(key, blob)
+        self._count("misses")
+        self.misses += 1
+        return None
+
+    def _insert(self, key, write_blob, meta=None):
+        """
+        Zapisuje plik wpisu przez plik tymczasowy (przerwany zapis nie zostawia uszkodzonego wpisu),
+        dodaje wpis do indeksu i usuwa najdawniej używane wpisy ponad limit
+
+        Args:
+            key (str): Klucz wpisu (jest też nazwą pliku)
+            write_blob (callable): Funkcja zapisująca dane pod podaną ścieżką tymczasową
+            meta (dict, optional): Metadane wpisu
+        """
+        db = self._connection()
+        blob_path = self._blob_path(key)
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        temp_path = f"{blob_path}.{os.getpid()}.tmp"
+        try:
+            write_blob(temp_path)
+            os.replace(temp_path, blob_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        now = time.time()
+        db.execute("INSERT OR REPLACE INTO entries (key, blob, size, meta, created, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                   (key, key, os.path.getsize(blob_path), json.dumps(meta or {}), now, now))
+        self.evict()
+
+    def _verify(self, blob_path, meta):
+        """
+        Dodatkowa kontrola spójności pliku wpisu (w klasach pochodnych)
+        """
+        return True
+
+    def evict(self):
+        """
+        Usuwa najdawniej używane wpisy, dopóki łączny rozmiar i liczba wpisów przekraczają limity
+        """
+        db = self._connection()
+        count, total = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if total <= self.max_size_bytes and (self.max_entries is None or count <= self.max_entries):
+            return
+        for key, blob, size in db.execute("SELECT key, blob, size FROM entries ORDER BY last_used").fetchall():
+            if total <= self.max_size_bytes and (self.max_entries is None or count <= self.max_entries):
+                break
+            self._forget(key, blob)
+            total -= size
+            count -= 1
+
+    def stats(self):
+        """
+        Zwraca statystyki pamięci podręcznej
+
+        Returns:
+            dict: Trwałe liczniki trafień i chybień, liczba wpisów i łączny rozmiar w bajtach
+        """
+        db = self._connection()
+        counters = dict(db.execute("SELECT name, value FROM counters").fetchall())
+        count, total = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"hits": counters.get("hits", 0), "misses": counters.get("misses", 0), "entries": count, "size_bytes": total}
+
+    def clear(self):
+        """
+        Usuwa wszystkie wpisy i przechowywane pliki
+        """
+        db = self._connection()
+        for key, blob in db.execute("SELECT key, blob FROM entries").fetchall():
+            self._forget(key, blob)
+
+
+class OutputCache(DiskCache):
+    def __init__(self, cache_directory=None, max_size_mb: int = 2048, max_entries: int = None, hardlink: bool = False):
+        """
+        Trwała pamięć podręczna wyników konwersji adresowana treścią. Kluczem jest skrót SHA-256
+        pliku wejściowego i znormalizowane opcje konwersji; wynik jest przechowywany jako kopia
+        w katalogu pamięci podręcznej, a indeks (SQLite) śledzi ostatnie użycie do usuwania LRU.
+
+        Args:
+            cache_directory (str, optional): Katalog pamięci podręcznej. Domyślnie `default_cache_directory()/outputs`.
+            max_size_mb (int): Maksymalny łączny rozmiar przechowywanych wyników w MB
+            max_entries (int, optional): Maksymalna liczba wpisów
+            hardlink (bool): Czy odtwarzać wynik twardym dowiązaniem zamiast kopii. Dowiązanie jest
+                szybsze, ale późniejsza edycja pliku wyjściowego w miejscu zmieniłaby też kopię w pamięci podręcznej.
+        """
+        super().__init__(cache_directory or os.path.join(default_cache_directory(), "outputs"), max_size_mb, max_entries)
+        self.hardlink = hardlink
+
+    def job_key(self, job):
+        """
+        Tworzy klucz pamięci podręcznej dla zadania: skrót treści wejścia i znormalizowane opcje
+
+        Args:
+            job (ConversionJob): Zadanie konwersji
+
+        Returns:
+            str: Klucz w postaci skrótu SHA-256
+        """
+        max_size_kb = _normalize_edge(job.max_size_kb)
+        options = {
+            "version": CACHE_VERSION,
+            "format": job.output_format,
+            "max_size_kb": max_size_kb,
+            "longer_edge": _normalize_edge(job.longer_edge),
+            "shorter_edge": _normalize_edge(job.shorter_edge),
+            "new_resolution": list(job.new_resolution) if job.new_resolution else None,
+            "strip_metadata": bool(job.strip_metadata),
+            "webp_lossless": bool(job.webp_lossless),
+            "options": job.options,
+        }
+        normalized = json.dumps(options, sort_keys=True, default=str)
+        return hashlib.sha256(f"{self.content_hash(job.input_path)}|{normalized}".encode('utf-8')).hexdigest()
+
+    def fetch(self, key, output_path):
+        """
+        Odtwarza zapamiętany wynik w `output_path` (kopią lub twardym dowiązaniem)
+
+        Args:
+            key (str): Klucz z `job_key`
+            output_path (str): Ścieżka pliku wyjściowego
+
+        Returns:
+            tuple: ((szerokość, wysokość) źródła, (szerokość, wysokość) wyniku) lub None przy braku trafienia
+        """
+        entry = self._lookup(key)
+        if entry is None:
+            return None
+        blob_path, meta = entry
+        self._materialize(blob_path, output_path)
+        return tuple(meta["source_size"]), tuple(meta["output_size"])
+
+    def _materialize(self, blob_path, output_path):
+        """
+        Tworzy plik wyjściowy z przechowywanej kopii
+        """
+        if os.path.abspath(blob_path) == os.path.abspath(output_path):
+            return
+        if os.path.lexists(output_path):
+            os.remove(output_path)
+        if self.hardlink:
+            try:
+                os.link(blob_path, output_path)
+                return
+            except OSError:
+                # Inny system plików lub brak obsługi dowiązań - zwykła kopia
+                pass
+        shutil.copyfile(blob_path, output_path)
+
+    def store(self, key, output_path, source_size, output_size):
+        """
+        Zapamiętuje wynik konwersji i usuwa najdawniej używane wpisy ponad limit
+
+        Args:
+            key (str): Klucz z `job_key`
+            output_path (str): Ścieżka zapisanego pliku wyjściowego
+            source_size (tuple): Wymiary źródła
+            output_size (tuple): Wymiary wyniku
+        """
+        self._insert(key, lambda temp_path: shutil.copyfile(output_path, temp_path), {"source_size": list(source_size), "output_size": list(output_size)})
@@ -0,0 +1,140 @@
+import os
+import mmap
+import json
+import zlib
+import hashlib
+from PIL import Image
+from output_cache import DiskCache, default_cache_directory, _normalize_edge
+
+# Tryby, których piksele można zapisać i odczytać bez dodatkowych danych (np. palety)
+CACHED_MODES = ("RGB", "RGBA", "L", "LA")
+
+
+class PixelCache(DiskCache):
+    def __init__(self, cache_directory=None, max_size_mb: int = 4096, max_entries: int = None):
+        """
+        Pamięć podręczna zdekodowanych i przeskalowanych pikseli. Przy kolejnym uruchomieniu z tym
+        samym wejściem i tą samą geometrią (ale np. innym formatem lub max_size_kb) obraz jest
+        wczytywany z pliku zamiast ponownego dekodowania HEIC i skalowania.
+
+        Plik wpisu zawiera surowe piksele (do odczytu przez mapę pamięci), a po nich EXIF i profil ICC.
+        Indeks przechowuje tryb, wymiary, przesunięcia i sumę kontrolną CRC-32 pikseli.
+
+        Args:
+            cache_directory (str, optional): Katalog pamięci podręcznej. Domyślnie `default_cache_directory()/pixels`.
+            max_size_mb (int): Maksymalny łączny rozmiar w MB
+            max_entries (int, optional): Maksymalna liczba wpisów
+        """
+        super().__init__(cache_directory or os.path.join(default_cache_directory(), "pixels"), max_size_mb, max_entries)
+
+    def image_key(self, input_path, mode_policy, new_resolution=None, longer_edge=None, shorter_edge=None, **policy):
+        """
+        Tworzy klucz dla przygotowanego obrazu: skrót treści wejścia, żądana geometria i polityka
+        dekodowania/skalowania (np. upscale, jpeg_draft, heic_thumbnails, zapasy reducing_gap)
+
+        Args:
+            input_path (str): Ścieżka do pliku wejściowego
+            mode_policy (str): "RGB" (konwersja do RGB) lub "native" (tryb źródła, dla PNG)
+            new_resolution (tuple, optional): Jawna rozdzielczość
+            longer_edge (int or str, optional): Dłuższa krawędź
+            shorter_edge (int or str, optional): Krótsza krawędź
+            **policy: Pozostałe parametry wpływające na piksele
+
+        Returns:
+            str: Klucz w postaci skrótu SHA-256
+        """
+        geometry = {
+            "mode": mode_policy,
+            "new_resolution": list(new_resolution) if new_resolution else None,
+            "longer_edge": _normalize_edge(longer_edge),
+            "shorter_edge": _normalize_edge(shorter_edge),
+            "policy": policy,
+        }
+        normalized = json.dumps(geometry, sort_keys=True, default=str)
+        return hashlib.sha256(f"{self.content_hash(input_path)}|{normalized}".encode('utf-8')).hexdigest()
+
+    def load(self, key):
+        """
+        Wczytuje obraz zapisany pod kluczem. Piksele są sprawdzane sumą kontrolną (`_verify`), a obraz
+        jest tworzony bezpośrednio na mapie pamięci pliku (`Image.frombuffer`). W trybach, które Pillow
+        potrafi odwzorować (L, RGBA), obraz nie kopiuje pikseli i utrzymuje mapę do czasu zwolnienia
+        obrazu (jest tylko do odczytu); w pozostałych piksele są rozpakowywane z mapy, która jest od razu zamykana.
+
+        Args:
+            key (str): Klucz z `image_key`
+
+        Returns:
+            tuple: (PIL.Image, rozmiar źródłowy) lub None przy braku trafienia lub uszkodzonym wpisie
+        """
+        entry = self._lookup(key)
+        if entry is None:
+            return None
+        blob_path, meta = entry
+        with open(blob_path, 'rb') as f:
+            # Mapa pozostaje ważna po zamknięciu pliku
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            image = Image.frombuffer(meta["mode"], tuple(meta["size"]), mapped, "raw", meta["mode"], 0, 1)
+            offset = meta["pixel_bytes"]
+            for name in ("exif", "icc_profile"):
+                length = meta.get(name, 0)
+                if length:
+                    image.info[name] = mapped[offset:offset + length]
+                    offset += length
+        except Exception:
+            mapped.close()
+            raise
+        if not image.readonly:
+            # Piksele zostały skopiowane - mapa nie jest już potrzebna
+            mapped.close()
+        return image, tuple(meta["source_size"])
+
+    def _verify(self, blob_path, meta):
+        """
+        Sprawdza sumę kontrolną CRC-32 pikseli
+        """
+        with open(blob_path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                pixels = memoryview(mapped)[:meta["pixel_bytes"]]
+                try:
+                    valid = zlib.crc32(pixels) == meta["crc32"]
+                finally:
+                    pixels.release()
+        if not valid:
+            print(f"Uwaga: Uszkodzony wpis pamięci podręcznej pikseli {os.path.basename(blob_path)[:12]} - zostanie odtworzony")
+        return valid
+
+    def store(self, key, image, source_size):
+        """
+        Zapisuje przygotowany obraz (tylko tryby z CACHED_MODES)
+
+        Args:
+            key (str): Klucz z `image_key`
+            image (PIL.Image): Obraz po konwersji trybu i skalowaniu
+            source_size (tuple): Wymiary źródła
+
+        Returns:
+            bool: Czy obraz został zapisany
+        """
+        if image.mode not in CACHED_MODES:
+            return False
+        pixels = image.tobytes()
+        extras = {name: image.info.get(name) or b"" for name in ("exif", "icc_profile")}
+        meta = {
+            "mode": image.mode,
+            "size": list(image.size),
+            "source_size": list(source_size),
+            "pixel_bytes": len(pixels),
+            "crc32": zlib.crc32(pixels),
+            "exif": len(extras["exif"]),
+            "icc_profile": len(extras["icc_profile"]),
+        }
+
+        def write_blob(temp_path):
+            with open(temp_path, 'wb') as f:
+                f.write(pixels)
+                f.write(extras["exif"])
+                f.write(extras["icc_profile"])
+
+        self._insert(key, write_blob, meta)
+        return True
@@ -0,0 +1,139 @@
+import io
+import os
+import json
+import time
+import glob
+import shutil
+import pstats
+import cProfile
+import tempfile
+import tracemalloc
+
+# Liczba pozycji w raporcie (funkcje wg czasu łącznego i miejsca alokacji)
+PROFILE_TOP = 30
+# Głębokość stosu zapisywana przez tracemalloc (1 - tylko miejsce alokacji, najtańsze)
+TRACEMALLOC_FRAMES = 1
+# Ramki pomijane w raporcie alokacji (narzędzia profilujące i mechanizm importu)
+_ALLOCATION_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, cProfile.__file__),
+    tracemalloc.Filter(False, pstats.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def start_worker_profiling(directory):
+    """
+    Włącza cProfile i tracemalloc w procesie roboczym puli. Wyniki są zapisywane w katalogu
+    `directory` przy zakończeniu procesu (multiprocessing.util.Finalize - procesy robocze puli
+    kończą się przez os._exit, więc atexit nie jest wywoływany).
+    """
+    from multiprocessing import util
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    profile = cProfile.Profile()
+    profile.enable()
+    util.Finalize(None, _dump_worker_profile, args=(profile, directory), exitpriority=100)
+
+
+def _dump_worker_profile(profile, directory):
+    profile.disable()
+    base = os.path.join(directory, f"worker-{os.getpid()}")
+    profile.dump_stats(base + ".pstats")
+    if tracemalloc.is_tracing():
+        tracemalloc.take_snapshot().dump(base + ".tracemalloc")
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump({"peak_traced": tracemalloc.get_traced_memory()[1]}, f)
+
+
+class BatchProfiler:
+    def __init__(self, output_directory, top: int = PROFILE_TOP):
+        """
+        Profilowanie jednej partii: cProfile procesu głównego i procesów roboczych (scalane)
+        oraz migawki tracemalloc. Po `stop` w katalogu wyników powstają `profil_<czas>.pstats`
+        (do otwarcia np. `python -m pstats` lub snakeviz) i raport tekstowy `profil_<czas>.txt`
+        z funkcjami o największym czasie łącznym i miejscami największych alokacji.
+
+        Args:
+            output_directory (str): Katalog, w którym zapisywane są raporty (zwykle katalog wyników)
+            top (int): Liczba pozycji w raporcie
+        """
+        self.output_directory = output_directory
+        self.top = top
+        self.worker_directory = None
+        self.profile = None
+        self._started_tracing = False
+        self._start_snapshot = None
+        self._start_time = None
+
+    def start(self):
+        self.worker_directory = tempfile.mkdtemp(prefix="konwerter_profil_")
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._started_tracing = True
+        tracemalloc.reset_peak()
+        self._start_snapshot = tracemalloc.take_snapshot()
+        self._start_time = time.strftime("%Y%m%d-%H%M%S")
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self):
+        """
+        Kończy profilowanie, scala wyniki procesów roboczych i zapisuje raporty
+
+        Returns:
+            dict: Ścieżki {"pstats": ..., "report": ...}
+        """
+        self.profile.disable()
+        main_snapshot = tracemalloc.take_snapshot().filter_traces(_ALLOCATION_FILTERS)
+        main_peak = tracemalloc.get_traced_memory()[1]
+        if self._started_tracing:
+            tracemalloc.stop()
+        try:
+            os.makedirs(self.output_directory, exist_ok=True)
+            base = os.path.join(self.output_directory, f"profil_{self._start_time}")
+            worker_files = sorted(glob.glob(os.path.join(self.worker_directory, "worker-*.pstats")))
+            stats = pstats.Stats(self.profile)
+            for path in worker_files:
+                stats.add(path)
+            stats.dump_stats(base + ".pstats")
+
+            # Alokacje: przyrost w procesie głównym od początku partii i pamięć zajęta w procesach roboczych przy ich zakończeniu
+            allocations = {}
+            for statistic in main_snapshot.compare_to(self._start_snapshot.filter_traces(_ALLOCATION_FILTERS), "lineno"):
+                if statistic.size_diff > 0:
+                    self._add_allocation(allocations, statistic.traceback, statistic.size_diff, statistic.count_diff)
+            worker_peaks = {}
+            for path in sorted(glob.glob(os.path.join(self.worker_directory, "worker-*.tracemalloc"))):
+                snapshot = tracemalloc.Snapshot.load(path).filter_traces(_ALLOCATION_FILTERS)
+                for statistic in snapshot.statistics("lineno"):
+                    self._add_allocation(allocations, statistic.traceback, statistic.size, statistic.count)
+                with open(path[:-len(".tracemalloc")] + ".json", encoding="utf-8") as f:
+                    worker_peaks[os.path.basename(path).split(".")[0]] = json.load(f)["peak_traced"]
+
+            with open(base + ".txt", "w", encoding="utf-8") as f:
+                f.write(f"Profil partii {self._start_time}; procesy robocze: {len(worker_files)}\n")
+                f.write(f"Szczyt pamięci śledzonej (tracemalloc) w procesie głównym: {main_peak / 1024 / 1024:.1f} MB\n")
+                for name, peak in worker_peaks.items():
+                    f.write(f"Szczyt pamięci śledzonej w {name}: {peak / 1024 / 1024:.1f} MB\n")
+                f.write("(tracemalloc nie obejmuje buforów pikseli Pillow i libheif - alokowanych poza Pythonem)\n\n")
+                f.write(f"== {self.top} funkcji o największym czasie łącznym ==\n")
+                buffer = io.StringIO()
+                pstats.Stats(base + ".pstats", stream=buffer).sort_stats("cumulative").print_stats(self.top)
+                f.write(buffer.getvalue())
+                f.write(f"\n== {self.top} miejsc największych alokacji ==\n")
+                f.write("(przyrost w procesie głównym od początku partii i pamięć zajęta w procesach roboczych przy ich zakończeniu)\n")
+                ranked = sorted(allocations.items(), key=lambda item: item[1][0], reverse=True)[:self.top]
+                for location, (size, count) in ranked:
+                    f.write(f"{size / 1024:>12.1f} KiB {count:>9} bloków  {location}\n")
+            return {"pstats": base + ".pstats", "report": base + ".txt"}
+        finally:
+            shutil.rmtree(self.worker_directory, ignore_errors=True)
+
+    def _add_allocation(self, allocations, traceback, size, count):
+        frame = traceback[0]
+        location = f"{frame.filename}:{frame.lineno}"
+        total_size, total_count = allocations.get(location, (0, 0))
+        allocations[location] = (total_size + size, total_count + count)
@@ -1,7 +1,6 @@
 import os
 import sys
 import subprocess
-from PIL import Image
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                             QLabel, QPushButton, QFileDialog, QListWidget, QFrame, 
                             QProgressBar, QTextEdit, QComboBox, QLineEdit, QCheckBox,
@@ -11,7 +10,10 @@ from PyQt6.QtCore import Qt, pyqtSignal, QMimeData, QUrl, QSize, QByteArray
 from PyQt6.QtGui import QDragEnterEvent, QDropEvent, QScreen
 from config import ConfigManager
 from file_manager import FileManager
-from image_converter import ImageConverter
+from image_converter import ImageConverter, ENCODER_PROFILES, DEFAULT_ENCODER_PROFILE
+from batch_converter import BatchConverter, encoder_profiles_from_settings, encoder_profile_from_settings
+from output_cache import OutputCache
+from pixel_cache import PixelCache
 
 class DropArea(QLabel):
     """Obszar do przeciągania i upuszczania plików"""
@@ -55,7 +57,7 @@ class DropArea(QLabel):
 
 # ==== KLASA DIALOGU OPCJI ====
 class OptionsDialog(QDialog):
-    def __init__(self, parent=None, current_options=None, available_formats=None):
+    def __init__(self, parent=None, current_options=None, available_formats=None, encoder_profiles=None):
         super().__init__(parent)
         self.setWindowTitle("Opcje Konwersji")
         self.setMinimumWidth(450) 
@@ -125,6 +127,16 @@ class OptionsDialog(QDialog):
         # Opcja numerowania plików wynikowych
         self.number_output_files_check = QCheckBox("Numeruj pliki wynikowe (np. 01_nazwa.jpg)")
         options_layout.addWidget(self.number_output_files_check, 8, 0, 1, 3)
+        
+        # Profil nakładu kodera (szybkość zapisu kosztem rozmiaru pliku)
+        options_layout.addWidget(QLabel("Profil kodera:"), 9, 0)
+        self.encoder_profile_combo = QComboBox()
+        self.encoder_profile_combo.addItems(encoder_profiles if encoder_profiles else list(ENCODER_PROFILES))
+        options_layout.addWidget(self.encoder_profile_combo, 9, 1)
+
+        # Profilowanie partii (raport .pstats i .txt w katalogu wyników)
+        self.profiling_check = QCheckBox("Profiluj konwersję (raport w katalogu wyników)")
+        options_layout.addWidget(self.profiling_check, 10, 0, 1, 3)
 
         main_dialog_layout.addLayout(options_layout)
 
@@ -175,6 +187,8 @@ class OptionsDialog(QDialog):
         self.delete_originals_check.setChecked(options_dict.get('delete_originals', False))
         self.strip_metadata_check.setChecked(options_dict.get('strip_metadata', False))
         self.number_output_files_check.setChecked(options_dict.get('number_output_files', False))
+        self.encoder_profile_combo.setCurrentText(options_dict.get('encoder_profile', DEFAULT_ENCODER_PROFILE))
+        self.profiling_check.setChecked(options_dict.get('profiling', False))
 
     def get_updated_options(self):
         """Zbiera wartości z kontrolek i zwraca je jako słownik."""
@@ -188,7 +202,9 @@ class OptionsDialog(QDialog):
             'output_directory': self.output_dir_input.text(),
             'delete_originals': self.delete_originals_check.isChecked(),
             'strip_metadata': self.strip_metadata_check.isChecked(),
-            'number_output_files': self.number_output_files_check.isChecked()
+            'number_output_files': self.number_output_files_check.isChecked(),
+            'encoder_profile': self.encoder_profile_combo.currentText(),
+            'profiling': self.profiling_check.isChecked()
         }
 
 class ImageConverterGUI(QMainWindow):
@@ -199,9 +215,16 @@ class ImageConverterGUI(QMainWindow):
         self.config_manager = ConfigManager()
         self.file_manager = FileManager()
         self.converter = ImageConverter()
+        self.batch_converter = BatchConverter()
         
         # Wczytaj ustawienia
         self.settings = self.config_manager.load_settings()
+        if self.settings.get("use_output_cache", False):
+            # Pliki niezmienione od poprzedniego uruchomienia (treść i opcje) są odtwarzane bez konwersji
+            self.batch_converter.output_cache = OutputCache()
+        if self.settings.get("use_pixel_cache", False):
+            # Ponowna konwersja tych samych plików do innego formatu lub rozmiaru pomija dekodowanie i skalowanie
+            self.batch_converter.pixel_cache = PixelCache()
         
         # Zmienne
         self.selected_files = []
@@ -255,7 +278,8 @@ class ImageConverterGUI(QMainWindow):
 
         # b. Utwórz i pokaż dialog, przekazując bieżące ustawienia i dostępne formaty
         # self.settings jest słownikiem, który będzie aktualizowany
-        dialog = OptionsDialog(parent=self, current_options=self.settings, available_formats=available_formats)
+        dialog = OptionsDialog(parent=self, current_options=self.settings, available_formats=available_formats,
+                               encoder_profiles=list(encoder_profiles_from_settings(self.settings)))
         
         # c. Jeśli dialog został zaakceptowany (OK), zaktualizuj ustawienia
         if dialog.exec(): # exec() jest blokujące i zwraca QDialog.DialogCode.Accepted lub QDialog.DialogCode.Rejected
@@ -635,61 +659,6 @@ class ImageConverterGUI(QMainWindow):
         self.log_message("Ustawienia zostały zapisane.") # Zmieniono QMessageBox na log_message
         # QMessageBox.information(self, "Informacja", "Ustawienia zostały zapisane") # Można przywrócić, jeśli preferowane
     
-    def calculate_dimensions(self, original_width, original_height, longer_edge_str, shorter_edge_str):
-        """
-        Oblicza nowe wymiary obrazu na podstawie ustawień dłuższej i krótszej krawędzi
-        
-        Args:
-            original_width (int): Oryginalna szerokość obrazu
-            original_height (int): Oryginalna wysokość obrazu
-            longer_edge_str (str): Wartość dłuższej krawędzi z ustawień (jako string)
-            shorter_edge_str (str): Wartość krótszej krawędzi z ustawień (jako string)
-            
-        Returns:
-            tuple: (nowa_szerokość, nowa_wysokość) lub None jeśli nie ustawiono wymiarów
-        """
-        # longer_edge i shorter_edge są teraz przekazywane jako argumenty
-        
-        # Określ, która krawędź jest dłuższa, a która krótsza w oryginalnym obrazie
-        if original_width >= original_height:
-            original_longer = original_width
-            original_shorter = original_height
-            is_landscape = True
-        else:
-            original_longer = original_height
-            original_shorter = original_width
-            is_landscape = False
-        
-        # Oblicz współczynnik proporcji
-        aspect_ratio = original_longer / original_shorter
-        
-        # Przetwarzanie wartości wejściowych
-        longer_edge_val = int(longer_edge_str) if longer_edge_str and longer_edge_str.isdigit() else None
-        shorter_edge_val = int(shorter_edge_str) if shorter_edge_str and shorter_edge_str.isdigit() else None
-        
-        # Obliczanie nowych wymiarów
-        if longer_edge_val and shorter_edge_val:
-            # Obie wartości są określone - używamy ich bezpośrednio
-            new_longer = longer_edge_val
-            new_shorter = shorter_edge_val
-        elif longer_edge_val:
-            # Tylko dłuższa krawędź jest określona
-            new_longer = longer_edge_val
-            new_shorter = int(new_longer / aspect_ratio)
-        elif shorter_edge_val:
-            # Tylko krótsza krawędź jest określona
-            new_shorter = shorter_edge_val
-            new_longer = int(new_shorter * aspect_ratio)
-        else:
-            # Żadna wartość nie jest określona
-            return None
-            
-        # Konwersja z powrotem na szerokość i wysokość
-        if is_landscape:
-            return (new_longer, new_shorter)
-        else:
-            return (new_shorter, new_longer)
-    
     def start_conversion(self):
         """Uruchamia proces konwersji plików."""
         if not self.selected_files:
@@ -712,8 +681,13 @@ class ImageConverterGUI(QMainWindow):
         webp_lossless_option = self.settings.get('webp_lossless', False)     # Pobierz z self.settings
         delete_originals_option = self.settings.get('delete_originals', False) # Pobierz z self.settings
 
-        file_counter = 1 # Zainicjuj licznik dla partii plików
-        
+        # Nieznany profil kodera (np. błąd w "encoder_profiles") - przed wyczyszczeniem logu i tworzeniem katalogu
+        try:
+            encoder_profile = encoder_profile_from_settings(self.settings)
+        except Exception as e:
+            QMessageBox.critical(self, "Błąd", str(e))
+            return
+
         # Sprawdź i utwórz katalog wyjściowy, jeśli podano
         if output_dir:
             try:
@@ -736,45 +710,36 @@ class ImageConverterGUI(QMainWindow):
         
         self.log_message("Rozpoczęto proces konwersji...")
         
-        for i, image_path in enumerate(self.selected_files):
-            try:
-                current_number_prefix = None
-                if number_files_option:
-                    current_number_prefix = f"{file_counter:02d}_" # Format dwucyfrowy z podkreślnikiem
-
-                output_file = self.file_manager.generate_output_filename(
-                    image_path, 
-                    output_format, 
-                    suffix,
-                    output_directory=output_dir,
-                    number_prefix=current_number_prefix # NOWY ARGUMENT
-                )
-                self.log_message(f"Konwertowanie: {os.path.basename(image_path)}...")
-                QApplication.processEvents()  # Aktualizacja UI
-                
-                # Otwieramy obraz do sprawdzenia jego wymiarów
-                with Image.open(image_path) as img:
-                    orig_width, orig_height = img.size
-                    
-                    # Obliczenie nowych wymiarów na podstawie wartości z self.settings
-                    longer_edge_str = self.settings.get('longer_edge', '')
-                    shorter_edge_str = self.settings.get('shorter_edge', '')
-                    new_dimensions = self.calculate_dimensions(orig_width, orig_height, longer_edge_str, shorter_edge_str) # Przekaż stringi
-                
-                # Opcje webp_lossless i strip_metadata są już pobrane z self.settings
-                # Nie ma potrzeby ich ponownie sprawdzać z kontrolek
-                
-                self.converter.convert_heic_to_format(
-                    image_path, 
-                    output_file,
-                    output_format=output_format,
-                    max_size_kb=max_size, 
-                    new_resolution=new_dimensions,
-                    strip_metadata=strip_metadata_option, # Użyj wartości z self.settings
-                    webp_lossless=webp_lossless_option   # Użyj wartości z self.settings
-                )
-                
-                self.log_message(f" -> Zapisano jako: {os.path.basename(output_file)}")
+        # Opcje webp_lossless i strip_metadata są już pobrane z self.settings
+        # Nie ma potrzeby ich ponownie sprawdzać z kontrolek
+        # Numeracja plików zależy od pozycji na liście, niezależnie od kolejności zakończenia konwersji
+        jobs = self.batch_converter.build_jobs(
+            self.selected_files,
+            output_format=output_format,
+            suffix=suffix,
+            output_directory=output_dir,
+            number_files=number_files_option,
+            max_size_kb=max_size,
+            longer_edge=self.settings.get('longer_edge', ''),
+            shorter_edge=self.settings.get('shorter_edge', ''),
+            strip_metadata=strip_metadata_option, # Użyj wartości z self.settings
+            webp_lossless=webp_lossless_option,  # Użyj wartości z self.settings
+            encoder_profile=encoder_profile
+        )
+        self.log_message(f"Konwertowanie plików: {total_files}...")
+        QApplication.processEvents()  # Aktualizacja UI
+        self.batch_converter.profiling = self.settings.get('profiling', False)
+        
+        # Wyniki pojawiają się w kolejności zakończenia konwersji
+        for i, batch_result in enumerate(self.batch_converter.iter_results(jobs)):
+            image_path = batch_result.input_path
+            if batch_result.ok:
+                result = batch_result.result
+                self.log_message(f" -> {os.path.basename(image_path)} zapisano jako: {os.path.basename(result.output_path)} ({result.output_size[0]}x{result.output_size[1]}, {result.file_size / 1024:.1f} KB, {result.elapsed:.2f} s)")
+                if result.cached:
+                    self.log_message("   Pobrano z pamięci podręcznej (bez ponownej konwersji)")
+                elif max_size:
+                    self.log_message(f"   Liczba kodowań (limit {max_size} KB): {result.encode_count}")
                 
                 # Usuń oryginalny plik, jeśli opcja jest włączona
                 if delete_originals_option: # Użyj wartości z self.settings
@@ -783,27 +748,28 @@ class ImageConverterGUI(QMainWindow):
                         self.log_message(f"   Usunięto oryginał: {os.path.basename(image_path)}")
                     except OSError as e:
                         self.log_message(f"   BŁĄD: Nie można usunąć oryginału {os.path.basename(image_path)}: {e}")
-                
-                # Aktualizacja postępu
                 converted_files += 1
-                progress_value = int((i + 1) / total_files * 100)
-                self.progress_bar.setValue(progress_value)
-                QApplication.processEvents()  # Aktualizacja UI
-
-                if number_files_option:
-                    file_counter += 1
-                
-            except Exception as e:
-                self.log_message(f"BŁĄD konwersji pliku {os.path.basename(image_path)}: {str(e)}")
+            else:
+                self.log_message(f"BŁĄD konwersji pliku {os.path.basename(image_path)}: {batch_result.error}")
+            
+            # Aktualizacja postępu
+            progress_value = int((i + 1) / total_files * 100)
+            self.progress_bar.setValue(progress_value)
+            QApplication.processEvents()  # Aktualizacja UI
         
         self.log_message(f"Konwersja zakończona. Przekonwertowano {converted_files} z {total_files} plików.")
+        if self.batch_converter.last_profile_report:
+            self.log_message(f"Raport profilowania: {self.batch_converter.last_profile_report['report']}")
         self.progress_bar.setValue(0)
 
 def main():
     app = QApplication(sys.argv)
     window = ImageConverterGUI()
     window.show()
-    sys.exit(app.exec())
+    exit_code = app.exec()
+    # Zamknij pulę procesów konwersji (używaną przez kolejne partie)
+    window.batch_converter.close()
+    sys.exit(exit_code)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
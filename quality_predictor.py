@@ -0,0 +1,231 @@
+import os
+import io
+import json
+import hashlib
+from collections import OrderedDict
+from PIL import Image
+
+class QualityPredictor:
+    def __init__(self, cache_file=None, probe_edge=256, tolerance=0.1, hash_edge=128, max_memo=50000):
+        """
+        Przewiduje jakość JPEG/WebP potrzebną do osiągnięcia docelowego rozmiaru pliku.
+        Stan jest zapisywany do `cache_file` przez `save`/`close` (np. raz po partii),
+        a nie po każdym pliku.
+
+        Args:
+            cache_file (str, optional): Plik JSON z zapamiętanymi wynikami i współczynnikami modelu.
+                Jeśli None, stan jest przechowywany tylko w pamięci.
+            probe_edge (int): Dłuższa krawędź pomniejszonej kopii używanej do próbnych kodowań
+            tolerance (float): Względny margines poniżej limitu, w którym przewidziana jakość
+                jest akceptowana bez dalszego wyszukiwania
+            hash_edge (int): Dłuższa krawędź próbki pikseli haszowanej w kluczu treści
+            max_memo (int): Maksymalna liczba zapamiętanych jakości (najdawniej używane są usuwane)
+        """
+        self.cache_file = cache_file
+        self.probe_edge = probe_edge
+        self.tolerance = tolerance
+        self.hash_edge = hash_edge
+        self.max_memo = max_memo
+        # Zapamiętane jakości: klucz (hash treści + opcje) -> jakość, w kolejności ostatniego użycia
+        self.memo = OrderedDict()
+        # Czy stan zmienił się od ostatniego zapisu
+        self.dirty = False
+        # Współczynnik skali: bajty na piksel pełnego obrazu / bajty na piksel próbki,
+        # uczony na bieżąco dla pary (format, przedział entropii)
+        self.scale_factors = {}
+        # Maksymalna waga historii przy uśrednianiu współczynnika (utrzymuje adaptacyjność)
+        self.max_history = 10
+        if self.cache_file:
+            self.load()
+
+    def load(self):
+        """
+        Wczytuje stan predyktora z pliku cache_file
+        """
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.memo = OrderedDict(data.get("memo", {}))
+            self._trim_memo()
+            self.scale_factors = data.get("scale_factors", {})
+        except Exception as e:
+            print(f"Błąd podczas wczytywania stanu predyktora jakości: {str(e)}")
+
+    def save(self):
+        """
+        Zapisuje stan predyktora do pliku cache_file (tylko jeśli zmienił się od ostatniego zapisu)
+        """
+        if not self.cache_file or not self.dirty:
+            return
+        try:
+            with open(self.cache_file, 'w', encoding='utf-8') as f:
+                json.dump({"memo": self.memo, "scale_factors": self.scale_factors}, f)
+            self.dirty = False
+        except Exception as e:
+            print(f"Błąd podczas zapisywania stanu predyktora jakości: {str(e)}")
+
+    def close(self):
+        """
+        Zapisuje stan po zakończeniu partii
+        """
+        self.save()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def content_key(self, image, output_format, max_size_bytes, save_options):
+        """
+        Tworzy klucz pamięci podręcznej z treści obrazu i opcji wpływających na rozmiar.
+        Haszowana jest próbka pikseli (najbliższy sąsiad, dłuższa krawędź `hash_edge`) razem
+        z pełnymi wymiarami, a nie cały bufor obrazu - klucz kosztuje tyle samo dla 1 i 48 MP.
+
+        Args:
+            image (PIL.Image): Obraz do zakodowania
+            output_format (str): Format wyjściowy
+            max_size_bytes (int): Limit rozmiaru w bajtach
+            save_options (dict): Opcje zapisu (bez jakości)
+
+        Returns:
+            str: Klucz w postaci skrótu SHA-1
+        """
+        digest = hashlib.sha1()
+        digest.update(f"{image.mode}|{image.size}|{output_format}|{max_size_bytes}".encode('utf-8'))
+        for key in sorted(save_options):
+            if key == "quality":
+                continue
+            value = save_options[key]
+            # Metadane wpływają na rozmiar tylko swoją długością
+            if isinstance(value, (bytes, bytearray)):
+                value = len(value)
+            digest.update(f"|{key}={value}".encode('utf-8'))
+        sample = image
+        if max(image.size) > self.hash_edge:
+            scale = self.hash_edge / max(image.size)
+            sample = image.resize((max(1, round(image.size[0] * scale)), max(1, round(image.size[1] * scale))), Image.Resampling.NEAREST)
+        digest.update(sample.tobytes())
+        return digest.hexdigest()
+
+    def extract_features(self, image, output_format, save_options):
+        """
+        Wyznacza cechy obrazu używane do przewidywania: liczbę pikseli, entropię,
+        format i pomniejszoną próbkę do tanich kodowań
+
+        Returns:
+            dict: Słownik cech
+        """
+        probe = image.copy()
+        probe.thumbnail((self.probe_edge, self.probe_edge), Image.Resampling.BILINEAR, reducing_gap=2.0)
+        entropy = probe.entropy()
+        probe_options = {k: v for k, v in save_options.items() if k not in ("exif", "icc_profile", "quality")}
+        return {
+            "pixels": image.size[0] * image.size[1],
+            "entropy": entropy,
+            "format": output_format,
+            "bucket": f"{output_format}:{int(entropy)}",
+            "probe": probe,
+            "probe_pixels": probe.size[0] * probe.size[1],
+            "probe_options": probe_options,
+            "probe_sizes": {},
+        }
+
+    def _probe_bytes_per_pixel(self, features, quality):
+        """
+        Koduje próbkę z podaną jakością i zwraca liczbę bajtów na piksel (z pamięcią wyników)
+        """
+        sizes = features["probe_sizes"]
+        if quality not in sizes:
+            buffer = io.BytesIO()
+            features["probe"].save(buffer, format=features["format"], quality=quality, **features["probe_options"])
+            sizes[quality] = buffer.tell()
+        return sizes[quality] / features["probe_pixels"]
+
+    def _scale_factor(self, features):
+        """
+        Zwraca wyuczony współczynnik skali dla przedziału entropii, formatu lub wartość domyślną
+        """
+        for key in (features["bucket"], features["format"]):
+            if key in self.scale_factors:
+                return self.scale_factors[key]["value"]
+        return 1.0
+
+    def predict(self, features, max_size_bytes, min_quality, max_quality):
+        """
+        Przewiduje najwyższą jakość, przy której pełny obraz zmieści się w limicie
+
+        Args:
+            features (dict): Cechy z `extract_features`
+            max_size_bytes (int): Limit rozmiaru w bajtach
+            min_quality (int): Minimalna dopuszczalna jakość
+            max_quality (int): Maksymalna dopuszczalna jakość
+
+        Returns:
+            int: Przewidziana jakość
+        """
+        scale = self._scale_factor(features)
+
+        def fits(q):
+            return self._probe_bytes_per_pixel(features, q) * features["pixels"] * scale <= max_size_bytes
+
+        if fits(max_quality):
+            return max_quality
+        # Bisekcja na próbce - kodowania próbki są o rzędy wielkości tańsze od pełnego obrazu
+        low, high = min_quality, max_quality
+        while high - low > 1:
+            mid = (low + high) // 2
+            if fits(mid):
+                low = mid
+            else:
+                high = mid
+        return low
+
+    def observe(self, features, quality, size_bytes):
+        """
+        Aktualizuje model na podstawie rzeczywistego rozmiaru pliku zakodowanego z daną jakością
+
+        Args:
+            features (dict): Cechy z `extract_features`
+            quality (int): Jakość użyta do kodowania
+            size_bytes (int): Rzeczywisty rozmiar w bajtach
+        """
+        predicted = self._probe_bytes_per_pixel(features, quality) * features["pixels"]
+        if predicted <= 0:
+            return
+        observed = size_bytes / predicted
+        for key in (features["bucket"], features["format"]):
+            entry = self.scale_factors.get(key)
+            if entry is None:
+                self.scale_factors[key] = {"value": observed, "count": 1}
+            else:
+                count = min(entry["count"], self.max_history)
+                entry["value"] = (entry["value"] * count + observed) / (count + 1)
+                entry["count"] = entry["count"] + 1
+        self.dirty = True
+
+    def remember(self, key, quality):
+        """
+        Zapamiętuje jakość dla klucza treści
+        """
+        if self.memo.get(key) != quality:
+            self.dirty = True
+        self.memo[key] = quality
+        self.memo.move_to_end(key)
+        self._trim_memo()
+
+    def recall(self, key):
+        """
+        Zwraca zapamiętaną jakość dla klucza treści lub None
+        """
+        quality = self.memo.get(key)
+        if quality is not None:
+            self.memo.move_to_end(key)
+        return quality
+
+    def _trim_memo(self):
+        while len(self.memo) > self.max_memo:
+            self.memo.popitem(last=False)
+            self.dirty = True
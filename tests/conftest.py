@@ -0,0 +1,28 @@
+import os
+import sys
+import random
+
+import pytest
+from PIL import Image, ImageFilter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def photo(width, height, seed=0):
+    """
+    Deterministyczny obraz przypominający zdjęcie: rozmyty szum na gradiencie
+    """
+    rng = random.Random(seed)
+    noise = Image.frombytes("RGB", (width // 4, height // 4), rng.randbytes((width // 4) * (height // 4) * 3))
+    noise = noise.resize((width, height), Image.Resampling.BICUBIC).filter(ImageFilter.GaussianBlur(1))
+    gradient = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    return Image.blend(gradient, noise, 0.5)
+
+
+@pytest.fixture
+def photo_path(tmp_path):
+    def make(width=1200, height=800, seed=0, image_format="JPEG"):
+        path = tmp_path / f"photo_{seed}_{width}x{height}.{image_format.lower()}"
+        photo(width, height, seed).save(path, format=image_format, quality=95)
+        return str(path)
+    return make
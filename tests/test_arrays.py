@@ -0,0 +1,68 @@
+import io
+
+import pytest
+from PIL import Image
+
+from image_converter import ImageConverter
+
+numpy = pytest.importorskip("numpy")
+
+
+@pytest.mark.parametrize("shape, dtype", [
+    ((48, 64, 3), "uint8"),
+    ((48, 64, 4), "uint8"),
+    ((48, 64), "uint8"),
+    ((48, 64), "uint16"),
+])
+def test_array_round_trip(shape, dtype):
+    array = numpy.random.default_rng(0).integers(0, numpy.iinfo(dtype).max, shape, dtype=dtype)
+    converter = ImageConverter()
+    data = converter.convert_array(array, output_format="PNG")
+    result = converter.convert_to_array(data, mode=None)
+
+    assert result.shape == shape
+    assert result.dtype == numpy.dtype(dtype)
+    assert numpy.array_equal(result, array)
+    # Tablica korzysta z bajtów Pillow bez kopii - tylko do odczytu
+    assert not result.flags.writeable
+
+
+def test_to_array_resizes_and_converts_mode(photo_path):
+    result = ImageConverter().convert_to_array(photo_path(), longer_edge=300)
+    assert result.shape == (200, 300, 3)
+    assert result.dtype == numpy.uint8
+    assert ImageConverter().convert_to_array(photo_path(), mode="L", new_resolution=(90, 60)).shape == (60, 90)
+
+
+def test_array_encoded_with_size_limit_and_metadata(photo_path):
+    array = ImageConverter().convert_to_array(photo_path())
+    exif = Image.Exif()
+    exif[0x0110] = "Testowy aparat"
+    data = ImageConverter().convert_array(array, output_format="JPEG", max_size_kb=60, longer_edge=800, info={"exif": exif.tobytes()})
+
+    assert len(data) <= 60 * 1024
+    with Image.open(io.BytesIO(data)) as image:
+        assert image.size == (800, 533)
+        assert image.getexif()[0x0110] == "Testowy aparat"
+    stripped = ImageConverter().convert_array(array, output_format="JPEG", max_size_kb=60, longer_edge=800, strip_metadata=True, info={"exif": exif.tobytes()})
+    with Image.open(io.BytesIO(stripped)) as image:
+        assert 0x0110 not in image.getexif()
+
+
+def test_batched_variants_keep_order(photo_path, tmp_path):
+    paths = [photo_path(320 + 40 * seed, 240, seed=seed) for seed in range(4)]
+    converter = ImageConverter()
+    arrays = converter.convert_to_arrays(paths, workers=2, mode="RGB")
+    assert [array.shape for array in arrays] == [(240, 320 + 40 * seed, 3) for seed in range(4)]
+
+    encoded = converter.convert_arrays(arrays, workers=2, output_format="PNG")
+    for array, data in zip(arrays, encoded):
+        assert numpy.array_equal(converter.convert_to_array(data), array)
+
+    outputs = [str(tmp_path / f"out_{index}.webp") for index in range(4)]
+    assert converter.convert_arrays(arrays, outputs, workers=2, output_format="WebP", shorter_edge=120) == outputs
+    for array, output in zip(arrays, outputs):
+        with Image.open(output) as image:
+            assert image.format == "WEBP"
+            assert image.height == 120
+            assert image.width == int(120 * array.shape[1] / array.shape[0])
@@ -0,0 +1,87 @@
+import os
+import time
+import signal
+
+import pytest
+
+from batch_converter import BatchConverter
+from image_converter import ConversionJob
+
+
+class DelayedJob(ConversionJob):
+    """
+    Zadanie, które proces roboczy odbiera z opóźnieniem (przy odtwarzaniu z pickle) - wymusza kolejność zakończenia
+    """
+    def __init__(self, job, delay):
+        super().__init__(job.input_path, job.output_path, job.output_format)
+        self.delay = delay
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        time.sleep(self.delay)
+
+
+@pytest.fixture
+def inputs(photo_path, tmp_path):
+    (tmp_path / "out").mkdir()
+    return [photo_path(320, 240, seed=seed) for seed in range(4)]
+
+
+def test_results_in_completion_order(inputs, tmp_path):
+    with BatchConverter(workers=2) as batch_converter:
+        jobs = batch_converter.build_jobs(inputs, output_format="PNG", output_directory=str(tmp_path / "out"), number_files=True)
+        jobs[0] = DelayedJob(jobs[0], delay=1.0)
+        results = list(batch_converter.iter_results(jobs))
+
+    # Pierwsze zadanie kończy się ostatnie; index wskazuje zadanie niezależnie od kolejności
+    assert [batch_result.index for batch_result in results][-1] == 0
+    assert sorted(batch_result.index for batch_result in results) == [0, 1, 2, 3]
+    for batch_result in results:
+        assert batch_result.ok
+        assert batch_result.output_path == jobs[batch_result.index].output_path
+        assert os.path.basename(batch_result.output_path).startswith(f"{batch_result.index + 1:02d}_photo_{batch_result.index}_")
+        assert os.path.exists(batch_result.output_path)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_failed_job_does_not_stop_batch(inputs, tmp_path, workers):
+    paths = inputs[:2] + [str(tmp_path / "brak.jpg")] + inputs[2:]
+    with BatchConverter(workers=workers) as batch_converter:
+        results = {batch_result.index: batch_result for batch_result in batch_converter.convert(paths, output_format="PNG", output_directory=str(tmp_path / "out"))}
+
+    assert sorted(results) == [0, 1, 2, 3, 4]
+    assert not results[2].ok
+    assert "Błąd konwersji" in results[2].error
+    assert results[2].result is None
+    for index in (0, 1, 3, 4):
+        assert results[index].ok
+        assert os.path.exists(results[index].output_path)
+
+
+def test_pool_reused_between_batches(inputs, tmp_path):
+    batch_converter = BatchConverter(workers=2)
+    try:
+        assert all(batch_result.ok for batch_result in batch_converter.convert(inputs[:2], output_format="PNG", output_directory=str(tmp_path / "out")))
+        executor = batch_converter._executor
+        assert executor is not None
+        assert all(batch_result.ok for batch_result in batch_converter.convert(inputs, output_format="JPEG", output_directory=str(tmp_path / "out")))
+        assert batch_converter._executor is executor
+
+        # Zmiana ustawień przekazywanych do procesów roboczych wymaga nowej puli
+        batch_converter.observer = lambda event: None
+        assert all(batch_result.ok for batch_result in batch_converter.convert(inputs[:2], output_format="PNG", output_directory=str(tmp_path / "out")))
+        assert batch_converter._executor is not executor
+    finally:
+        batch_converter.close()
+    assert batch_converter._executor is None
+
+
+def test_pool_replaced_after_worker_crash(inputs, tmp_path):
+    with BatchConverter(workers=2) as batch_converter:
+        assert all(batch_result.ok for batch_result in batch_converter.convert(inputs[:2], output_format="PNG", output_directory=str(tmp_path / "out")))
+        for pid in list(batch_converter._executor._processes):
+            os.kill(pid, signal.SIGKILL)
+        time.sleep(0.5)
+        results = list(batch_converter.convert(inputs, output_format="PNG", output_directory=str(tmp_path / "out")))
+    assert len(results) == 4
+    assert all(batch_result.ok for batch_result in results)
@@ -0,0 +1,88 @@
+import io
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+from cli import expand_inputs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GUI_MODULES = ("tkinter", "tkinterdnd2", "PyQt6", "kivy")
+
+
+def run_cli(*args, stdin=None, cwd=None):
+    """
+    Uruchamia `cli.py` w osobnym procesie (CLI przekierowuje deskryptor standardowego wyjścia)
+    i zwraca (kod wyjścia, rekordy JSON, standardowe wyjście błędów)
+    """
+    process = subprocess.run([sys.executable, os.path.join(ROOT, "cli.py"), *args], input=stdin, capture_output=True, text=True, cwd=cwd, timeout=120)
+    records = [json.loads(line) for line in process.stdout.splitlines()]
+    return process.returncode, records, process.stderr
+
+
+@pytest.fixture
+def inputs(photo_path, tmp_path):
+    nested = tmp_path / "katalog" / "zagnieżdżony"
+    nested.mkdir(parents=True)
+    paths = [photo_path(320, 240, seed=seed) for seed in range(3)]
+    os.replace(paths[2], nested / "c.jpg")
+    return paths[:2] + [str(nested / "c.jpg")]
+
+
+def test_expand_inputs(inputs, tmp_path):
+    directory = str(tmp_path / "katalog")
+    assert expand_inputs([directory]) == [inputs[2]]
+    assert expand_inputs([str(tmp_path / "*.jpeg")]) == sorted(inputs[:2])
+    assert expand_inputs([str(tmp_path / "**" / "*.*")]) == sorted(inputs)
+    # "-" czyta ścieżki ze standardowego wejścia; powtórzenia są pomijane z zachowaniem kolejności
+    assert expand_inputs([inputs[1], "-", inputs[0]], stdin=io.StringIO(f"{inputs[0]}\n\n{inputs[1]}\n")) == [inputs[1], inputs[0]]
+
+
+def test_json_line_per_file(inputs, tmp_path):
+    settings = tmp_path / "settings.json"
+    settings.write_text(json.dumps({"output_format": "JPEG", "suffix": "_z_ustawien", "longer_edge": "200"}), encoding="utf-8")
+    code, records, _ = run_cli(str(tmp_path / "*.jpeg"), "-", "--config", str(settings), "--format", "PNG", "--workers", "2", "--output-dir", str(tmp_path / "out"), stdin=f"{inputs[2]}\n")
+
+    assert code == 0
+    assert sorted(record["input"] for record in records) == sorted(inputs)
+    for record in records:
+        assert record["ok"]
+        # Format z flagi nadpisuje ustawienia, pozostałe wartości pochodzą z pliku ustawień
+        assert record["output"].endswith("_z_ustawien.png")
+        assert record["output_size"] == [200, 150]
+        assert os.path.getsize(record["output"]) == record["file_size"]
+
+
+def test_failed_file_reported(inputs, tmp_path):
+    broken = tmp_path / "uszkodzony.jpg"
+    broken.write_bytes(b"to nie jest obraz")
+    code, records, _ = run_cli(inputs[0], str(broken), "--config", str(tmp_path / "brak.json"), "--output-dir", str(tmp_path / "out"))
+
+    assert code == 1
+    by_input = {record["input"]: record for record in records}
+    assert by_input[inputs[0]]["ok"]
+    assert not by_input[str(broken)]["ok"]
+    assert "Błąd konwersji" in by_input[str(broken)]["error"]
+
+
+def test_invalid_option_exit_code(inputs, tmp_path):
+    code, records, stderr = run_cli(inputs[0], "--config", str(tmp_path / "brak.json"), "--profile", "nieznany")
+    assert code == 2
+    assert records == []
+    assert "Nieznany profil kodera" in stderr
+
+
+def test_gui_toolkits_not_imported(inputs, tmp_path):
+    script = (
+        "import sys, json, cli\n"
+        f"code = cli.main([{inputs[0]!r}, '--config', {str(tmp_path / 'brak.json')!r}, '--output-dir', {str(tmp_path / 'out')!r}])\n"
+        f"sys.stderr.write('MODULES ' + json.dumps(sorted(name for name in sys.modules if name.split('.')[0] in {GUI_MODULES!r})) + '\\n')\n"
+        "sys.exit(code)\n"
+    )
+    process = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, cwd=ROOT, timeout=120)
+    assert process.returncode == 0, process.stderr
+    assert json.loads(process.stdout)["ok"]
+    modules = [line for line in process.stderr.splitlines() if line.startswith("MODULES ")]
+    assert json.loads(modules[-1][len("MODULES "):]) == []
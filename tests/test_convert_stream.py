@@ -0,0 +1,36 @@
+import io
+import os
+import threading
+
+from PIL import Image
+
+from image_converter import ImageConverter
+
+
+def test_convert_bytes(photo_path):
+    with open(photo_path(), "rb") as f:
+        data = f.read()
+    result = ImageConverter().convert_stream(data, output_format="PNG", longer_edge=300)
+    with Image.open(io.BytesIO(result)) as image:
+        assert image.format == "PNG"
+        assert image.size == (300, 200)
+
+
+def test_convert_non_seekable_pipe(photo_path):
+    with open(photo_path(), "rb") as f:
+        data = f.read()
+    read_fd, write_fd = os.pipe()
+
+    def feed():
+        with os.fdopen(write_fd, "wb") as writer:
+            writer.write(data)
+
+    thread = threading.Thread(target=feed)
+    thread.start()
+    with os.fdopen(read_fd, "rb") as reader:
+        assert not reader.seekable()
+        result = ImageConverter().convert_stream(reader, output_format="JPEG", max_size_kb=150)
+    thread.join()
+    assert len(result) <= 150 * 1024
+    with Image.open(io.BytesIO(result)) as image:
+        assert image.size == (1200, 800)
@@ -0,0 +1,89 @@
+import os
+
+from PIL import Image
+
+from batch_converter import BatchConverter
+import directory_sync
+from directory_sync import DirectorySync, SyncManifest
+
+
+def make_tree(root, names):
+    for name in names:
+        path = os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        Image.new("RGB", (64, 48), "green").save(path)
+
+
+def make_sync(source, output, **options):
+    return DirectorySync(str(source), str(output), batch_converter=BatchConverter(workers=1), output_format="PNG", **options)
+
+
+def test_unreadable_directory_keeps_outputs(tmp_path, monkeypatch):
+    source, output = tmp_path / "src", tmp_path / "out"
+    make_tree(source, ["a.png", os.path.join("nfs", "b.png"), os.path.join("nfs", "deep", "c.png")])
+    report = make_sync(source, output, remove_orphans=True).sync()
+    assert len(report.converted) == 3
+
+    scandir = os.scandir
+    unreadable = str(source / "nfs")
+
+    def failing_scandir(path):
+        if os.path.abspath(path) == unreadable:
+            raise PermissionError(13, "Permission denied", path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", failing_scandir)
+    report = make_sync(source, output, remove_orphans=True).sync()
+    assert report.unreadable == ["nfs"]
+    assert report.removed == []
+    assert (output / "nfs" / "b_converted.png").exists()
+    assert (output / "nfs" / "deep" / "c_converted.png").exists()
+
+    # Po przywróceniu dostępu pliki są rozpoznane jako niezmienione
+    monkeypatch.setattr(os, "scandir", scandir)
+    report = make_sync(source, output, remove_orphans=True).sync()
+    assert report.unchanged == 3 and not report.converted
+
+
+def test_orphans_removed_after_complete_scan(tmp_path):
+    source, output = tmp_path / "src", tmp_path / "out"
+    make_tree(source, ["a.png", "b.png"])
+    make_sync(source, output, remove_orphans=True).sync()
+    os.remove(source / "b.png")
+    report = make_sync(source, output, remove_orphans=True).sync()
+    assert report.removed == ["b.png"]
+    assert not (output / "b_converted.png").exists()
+
+
+def test_output_inside_source_not_rescanned(tmp_path):
+    source = tmp_path / "src"
+    make_tree(source, ["a.png", os.path.join("sub", "b.png")])
+    output = source / "converted"
+    assert len(make_sync(source, output).sync().converted) == 2
+    report = make_sync(source, output).sync()
+    assert report.scanned == 2
+    assert report.unchanged == 2 and not report.converted
+
+
+def test_output_same_as_source(tmp_path):
+    source = tmp_path / "src"
+    make_tree(source, ["a.png"])
+    assert make_sync(source, source).sync().converted == ["a.png"]
+    report = make_sync(source, source).sync()
+    assert report.scanned == 1 and not report.converted
+
+
+def test_manifest_committed_per_converted_files(tmp_path, monkeypatch):
+    source, output = tmp_path / "src", tmp_path / "out"
+    make_tree(source, [f"{index}.png" for index in range(5)])
+    for index in range(5):
+        (source / f"bad_{index}.png").write_bytes(b"uszkodzony")
+    commits = []
+    monkeypatch.setattr(directory_sync, "MANIFEST_COMMIT_INTERVAL", 2)
+    monkeypatch.setattr(SyncManifest, "commit", lambda self: commits.append(len(self.load())))
+
+    report = make_sync(source, output).sync()
+    assert len(report.converted) == 5
+    assert len(report.failed) == 5
+    # Zapis po 2. i 4. udanej konwersji; nieudane pliki nie wywołują zapisu
+    assert commits == [2, 4]
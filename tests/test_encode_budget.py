@@ -0,0 +1,182 @@
+import functools
+
+import pytest
+from PIL import Image
+
+import image_converter
+from image_converter import EncodeBudget, ImageConverter, RenditionSpec
+
+COSTS = {
+    "fast": {"JPEG": 0.1, "PNG": 0.1},
+    "balanced": {"JPEG": 0.5, "PNG": 0.5},
+    "max-compression": {"JPEG": 1.0, "PNG": 1.0},
+}
+
+
+class FakeClock:
+    """
+    Zegar przesuwany tylko przez test
+    """
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def converter():
+    converter = ImageConverter()
+    converter.encode_cost = {name: dict(costs) for name, costs in COSTS.items()}
+    return converter
+
+
+@pytest.fixture
+def slow_writes(monkeypatch, clock):
+    """
+    Każdy zapis obrazu trwa (według zegara testu) `seconds` sekund
+    """
+    def install(seconds):
+        write_image = ImageConverter._write_image
+
+        def timed_write(self, *args, **kwargs):
+            write_image(self, *args, **kwargs)
+            clock.now += seconds
+        monkeypatch.setattr(ImageConverter, "_write_image", timed_write)
+    monkeypatch.setattr(image_converter, "EncodeBudget", functools.partial(EncodeBudget, clock=clock))
+    return install
+
+
+def test_budget_accounting(clock):
+    budget = EncodeBudget(2, clock=clock)
+    clock.now = 0.5
+    assert budget.remaining() == 1.5
+    # Dwa kodowania po 0,5 s mieszczą się - nakład bez zmian
+    budget.observe(0.5)
+    jpeg = {"optimize": True}
+    budget.adjust(jpeg, "JPEG")
+    assert jpeg == {"optimize": True} and budget.degraded == []
+
+    clock.now = 1.4
+    budget.adjust(jpeg, "JPEG")
+    webp = {"method": 6}
+    budget.adjust(webp, "WebP")
+    budget.adjust(webp, "WebP")
+    budget.adjust(webp, "WebP")
+    assert jpeg == {"optimize": False}
+    # WebP stratny nie schodzi poniżej method=2
+    assert webp == {"method": 2}
+    assert budget.degraded == ["optimize", "method 3", "method 2"]
+    assert not budget.allows_final_encode()
+
+    clock.now = 2.5
+    budget.finish()
+    assert budget.elapsed == 2.5
+    assert not budget.within_budget
+
+
+@pytest.mark.parametrize("time_budget, expected", [
+    (1.5, "max-compression"),
+    (0.6, "balanced"),
+    (0.2, "fast"),
+    (0.05, "fast"),
+])
+def test_profile_fits_remaining_budget(converter, clock, time_budget, expected):
+    image = Image.new("RGB", (1000, 1000))
+    budget = EncodeBudget(time_budget, clock=clock)
+    assert converter._select_encoder_profile(image, "JPEG", False, None, "max-compression", budget) == expected
+    assert budget.encoder_profile == expected
+    assert budget.degraded == ([] if expected == "max-compression" else [f"profil {expected}"])
+
+
+def test_size_search_multiplies_estimate(converter, clock):
+    image = Image.new("RGB", (1000, 1000))
+    # Wyszukiwanie jakości: 8 kodowań bez predyktora, 3 z predyktorem
+    assert converter._select_encoder_profile(image, "JPEG", False, 300, "max-compression", EncodeBudget(4.1, clock=clock)) == "balanced"
+    converter.quality_predictor = object()
+    assert converter._select_encoder_profile(image, "JPEG", False, 300, "max-compression", EncodeBudget(4.1, clock=clock)) == "max-compression"
+    # Budżet liczony od utworzenia - wykorzystany czas zmniejsza pozostały
+    budget = EncodeBudget(4.1, clock=clock)
+    clock.now += 3
+    assert converter._select_encoder_profile(image, "JPEG", False, 300, "max-compression", budget) == "fast"
+
+
+def test_generous_budget_keeps_requested_profile(converter, clock):
+    image = Image.new("RGB", (1000, 1000))
+    budget = EncodeBudget(100, clock=clock)
+    # Żądany profil jest górną granicą nakładu
+    assert converter._select_encoder_profile(image, "JPEG", False, None, "balanced", budget) == "balanced"
+    assert budget.degraded == []
+    custom = {"JPEG": {"quality": 90}}
+    budget = EncodeBudget(100, clock=clock)
+    assert converter._select_encoder_profile(image, "JPEG", False, None, custom, budget) is custom
+    assert budget.encoder_profile == "custom"
+    # Formaty bez parametrów nakładu
+    assert converter._select_encoder_profile(image, "BMP", False, None, "balanced", EncodeBudget(0, clock=clock)) == "balanced"
+
+
+def test_calibration(converter, clock):
+    image = Image.new("RGB", (1000, 1000))
+    converter.last_encode_count = 2
+    converter._calibrate_encode_cost(image, "JPEG", False, "balanced", EncodeBudget(1, clock=clock), 3.0)
+    # Średnia wykładnicza: 0,5 * 0,5 + 0,5 * (3 s / 2 kodowania / 1 MP)
+    assert converter.encode_cost["balanced"]["JPEG"] == 1.0
+
+    degraded = EncodeBudget(1, clock=clock)
+    degraded.stop_search(80)
+    converter._calibrate_encode_cost(image, "JPEG", False, "balanced", degraded, 10.0)
+    converter._calibrate_encode_cost(image, "JPEG", False, {"JPEG": {}}, EncodeBudget(1, clock=clock), 10.0)
+    assert converter.encode_cost["balanced"]["JPEG"] == 1.0
+
+
+def test_conversion_reports_budget(converter, clock, slow_writes, photo_path, tmp_path):
+    slow_writes(0.25)
+    input_path = photo_path(1000, 500)
+    converter.convert_heic_to_format(input_path, str(tmp_path / "tight.png"), "PNG", encoder_profile="max-compression", time_budget=0.2)
+    budget = converter.last_budget
+    assert budget.encoder_profile == "fast"
+    assert budget.elapsed == 0.25
+    assert not budget.within_budget
+    # Zmierzony czas (0,25 s na 0,5 MP) uaktualnia koszt profilu fast
+    assert converter.encode_cost["fast"]["PNG"] == pytest.approx(0.5 * 0.1 + 0.5 * 0.5)
+
+    converter.convert_heic_to_format(input_path, str(tmp_path / "generous.png"), "PNG", encoder_profile="max-compression", time_budget=10)
+    assert converter.last_budget.encoder_profile == "max-compression"
+    assert converter.last_budget.within_budget
+
+
+def test_renditions_share_file_budget(converter, clock, slow_writes, photo_path, tmp_path):
+    slow_writes(3)
+    specs = [RenditionSpec("JPEG", suffix="_small", longer_edge=600), RenditionSpec("JPEG", suffix="_full")]
+    results = converter.convert_renditions(photo_path(), specs, output_directory=str(tmp_path), time_budget=10)
+    small, full = (result.budget for result in results)
+    # Najpierw największa wersja: 0,96 z 1,2 MP -> 8 s; mniejsza dostaje resztę czasu pliku (10 - 3 s)
+    assert full.time_budget == pytest.approx(8)
+    assert small.time_budget == pytest.approx(7)
+    assert full.elapsed == small.elapsed == 3
+    assert full.within_budget and small.within_budget
+
+
+def test_renditions_after_overrun_use_fast_profile(converter, clock, slow_writes, photo_path, tmp_path):
+    slow_writes(12)
+    specs = [RenditionSpec("JPEG", suffix="_full", encoder_profile="max-compression"), RenditionSpec("JPEG", suffix="_small", longer_edge=600, encoder_profile="max-compression")]
+    full, small = (result.budget for result in converter.convert_renditions(photo_path(), specs, output_directory=str(tmp_path), time_budget=10))
+    assert full.encoder_profile == "max-compression"
+    assert not full.within_budget
+    assert small.time_budget == 0
+    assert small.encoder_profile == "fast"
+
+
+def test_parallel_renditions_report_budget(photo_path, tmp_path):
+    specs = [RenditionSpec("JPEG", suffix="_full"), RenditionSpec("WebP", suffix="_web", longer_edge=600)]
+    results = ImageConverter().convert_renditions(photo_path(), specs, output_directory=str(tmp_path), workers=2, time_budget=1000)
+    for result in results:
+        assert 0 < result.budget.time_budget <= 1000
+        assert result.budget.within_budget
+        assert result.budget.encoder_profile == "balanced"
+    assert ImageConverter().convert_renditions(photo_path(), specs, output_directory=str(tmp_path), workers=2)[0].budget is None
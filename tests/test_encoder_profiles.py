@@ -0,0 +1,58 @@
+import copy
+
+import pytest
+from PIL import Image
+
+from batch_converter import BatchConverter, encoder_profile_from_settings, encoder_profiles_from_settings, options_from_settings
+from image_converter import ENCODER_PROFILES, DEFAULT_ENCODER_PROFILE
+
+
+@pytest.fixture(autouse=True)
+def builtin_profiles_unchanged():
+    before = copy.deepcopy(ENCODER_PROFILES)
+    yield
+    assert ENCODER_PROFILES == before
+
+
+@pytest.mark.parametrize("settings, expected", [
+    ({}, DEFAULT_ENCODER_PROFILE),
+    ({"encoder_profile": "fast"}, "fast"),
+    ({"encoder_profile": "max-compression", "encoder_profiles": {"archiwum": {"PNG": {"compress_level": 9}}}}, "max-compression"),
+])
+def test_builtin_profile_selected_by_name(settings, expected):
+    assert encoder_profile_from_settings(settings) == expected
+
+
+def test_unknown_profile_rejected():
+    with pytest.raises(Exception, match="Nieznany profil kodera: nieznany .*archiwum"):
+        encoder_profile_from_settings({"encoder_profile": "nieznany", "encoder_profiles": {"archiwum": {}}})
+    with pytest.raises(Exception, match="Nieznany profil kodera"):
+        options_from_settings({"encoder_profile": "nieznany"})
+
+
+def test_custom_profile_merged_over_default():
+    tiff = {"compression": "tiff_adobe_deflate"}
+    settings = {"encoder_profile": "archiwum", "encoder_profiles": {"archiwum": {"TIFF": tiff}}}
+    profile = encoder_profile_from_settings(settings)
+    # Formaty niepodane w profilu własnym mają parametry profilu domyślnego
+    assert profile == dict(ENCODER_PROFILES[DEFAULT_ENCODER_PROFILE], TIFF=tiff)
+    assert encoder_profiles_from_settings(settings)["archiwum"] == profile
+
+
+def test_builtin_profile_overridden_per_format():
+    settings = {"encoder_profile": "fast", "encoder_profiles": {"fast": {"PNG": {"compress_level": 3}}}}
+    profiles = encoder_profiles_from_settings(settings)
+    assert profiles["fast"]["PNG"] == {"compress_level": 3}
+    assert profiles["fast"]["JPEG"] == ENCODER_PROFILES["fast"]["JPEG"]
+    assert profiles["balanced"] == ENCODER_PROFILES["balanced"]
+    # Zmieniony profil wbudowany jest przekazywany jako słownik
+    assert encoder_profile_from_settings(settings) == profiles["fast"]
+
+
+def test_custom_profile_used_for_conversion(photo_path, tmp_path):
+    settings = {"output_format": "TIFF", "output_directory": str(tmp_path), "encoder_profile": "archiwum", "encoder_profiles": {"archiwum": {"TIFF": {"compression": "tiff_adobe_deflate"}}}}
+    with BatchConverter(workers=1) as batch_converter:
+        results = list(batch_converter.convert([photo_path(64, 48)], **options_from_settings(settings)))
+    assert results[0].ok
+    with Image.open(results[0].output_path) as image:
+        assert image.info["compression"] == "tiff_adobe_deflate"
@@ -0,0 +1,52 @@
+import types
+
+import pytest
+from PIL import Image
+
+from image_converter import ImageConverter, load_heif
+from instrumentation import StageRecorder
+
+
+class FakeThumbnail:
+    def __init__(self, size, mode="RGB"):
+        self.size = size
+        self.mode = mode
+
+    def to_pillow(self):
+        return Image.new(self.mode, self.size)
+
+
+def fake_primary(size, thumbnails, mode="RGB"):
+    return types.SimpleNamespace(size=size, mode=mode, info={"thumbnails": [max(t.size) for t in thumbnails]}, get_thumbnail=lambda index: thumbnails[index])
+
+
+@pytest.mark.parametrize("thumbnail", [
+    FakeThumbnail((400, 400)),  # inne proporcje (kadr)
+    FakeThumbnail((400, 300), "RGB"),  # brak alfy w miniaturze obrazu RGBA
+    FakeThumbnail((200, 150), "RGBA"),  # za mała
+])
+def test_mismatched_thumbnail_rejected(thumbnail):
+    primary = fake_primary((4000, 3000), [thumbnail], mode="RGBA")
+    assert ImageConverter()._open_heic_thumbnail(primary, (320, 240)) is None
+
+
+def test_smallest_matching_thumbnail_used():
+    thumbnails = [FakeThumbnail((1024, 768)), FakeThumbnail((400, 400)), FakeThumbnail((400, 300))]
+    image = ImageConverter()._open_heic_thumbnail(fake_primary((4032, 3024), thumbnails), (320, 240))
+    assert image.size == (400, 300)
+
+
+def test_heic_thumbnail_decoded(tmp_path, photo_path):
+    try:
+        load_heif()
+    except ImportError:
+        pytest.skip("brak pillow_heif")
+    input_path = str(tmp_path / "photo.heic")
+    Image.open(photo_path(640, 480)).save(input_path, format="HEIF", quality=50, thumbnails=[200])
+    converter = ImageConverter()
+    converter.observer = StageRecorder()
+    converter.convert_heic_to_format(input_path, str(tmp_path / "out.jpg"), "JPEG", longer_edge=160)
+    decode = [event for event in converter.observer.events if event.stage == "decode"][0]
+    assert decode.pixels_out == 200 * 150
+    with Image.open(tmp_path / "out.jpg") as image:
+        assert image.size == (160, 120)
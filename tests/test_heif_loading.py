@@ -0,0 +1,74 @@
+import io
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+from PIL import Image
+
+import image_converter
+from image_converter import is_heif
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def ftyp(brand):
+    return b"\x00\x00\x00\x18ftyp" + brand + b"\x00\x00\x00\x00" + brand + b"\x00" * 16
+
+
+@pytest.fixture
+def no_heif(monkeypatch):
+    """
+    Zapewnia, że sprawdzenie nie sięga po pillow_heif
+    """
+    def fail():
+        raise AssertionError("pillow_heif nie powinien być importowany")
+    monkeypatch.setattr(image_converter, "load_heif", fail)
+
+
+@pytest.mark.parametrize("brand", [b"heic", b"heix", b"mif1", b"msf1"])
+def test_heif_brands_accepted_without_pillow_heif(brand, no_heif, tmp_path):
+    path = tmp_path / "obraz.bin"
+    path.write_bytes(ftyp(brand))
+    assert is_heif(str(path))
+    stream = io.BytesIO(b"xx" + ftyp(brand))
+    stream.seek(2)
+    assert is_heif(stream)
+    # Pozycja strumienia jest przywracana
+    assert stream.tell() == 2
+
+
+@pytest.mark.parametrize("image_format", ["JPEG", "PNG", "WebP", "TIFF"])
+def test_other_formats_rejected_without_pillow_heif(image_format, no_heif, photo_path):
+    assert not is_heif(photo_path(64, 48, image_format=image_format))
+    assert not is_heif(io.BytesIO(b""))
+
+
+def test_unknown_brand_decided_by_pillow_heif():
+    pytest.importorskip("pillow_heif")
+    # Kontener ISO BMFF, ale nie HEIF (MP4)
+    assert not is_heif(io.BytesIO(ftyp(b"isom")))
+
+
+def test_pillow_heif_imported_on_first_heif_file(photo_path, tmp_path):
+    pytest.importorskip("pillow_heif")
+    image_converter.load_heif()
+    heic_path = str(tmp_path / "photo.heic")
+    Image.open(photo_path(64, 48)).save(heic_path, format="HEIF", quality=50)
+    script = (
+        "import sys, json\n"
+        "from image_converter import ImageConverter\n"
+        "loaded = ['pillow_heif' in sys.modules]\n"
+        f"ImageConverter().convert_heic_to_format({photo_path(64, 48)!r}, {str(tmp_path / 'a.png')!r}, 'PNG')\n"
+        "loaded.append('pillow_heif' in sys.modules)\n"
+        f"ImageConverter().convert_heic_to_format({heic_path!r}, {str(tmp_path / 'b.png')!r}, 'PNG')\n"
+        "loaded.append('pillow_heif' in sys.modules)\n"
+        "print(json.dumps(loaded))\n"
+    )
+    process = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, cwd=ROOT, timeout=120)
+    assert process.returncode == 0, process.stderr
+    # Nie po imporcie ani po konwersji JPEG, dopiero przy pierwszym pliku HEIC
+    assert json.loads(process.stdout) == [False, False, True]
+    with Image.open(tmp_path / "b.png") as image:
+        assert image.size == (64, 48)
@@ -0,0 +1,35 @@
+from PIL import Image, ImageChops, ImageStat
+
+from image_converter import ImageConverter
+from instrumentation import StageRecorder
+
+# Średnia i maksymalna różnica kanałów (0-255) między dekodowaniem draft a pełnym dekodowaniem
+MEAN_TOLERANCE = 2.0
+MAX_TOLERANCE = 16
+
+
+def convert(input_path, output_path, jpeg_draft, **options):
+    converter = ImageConverter()
+    converter.observer = StageRecorder()
+    converter.convert_heic_to_format(input_path, output_path, "PNG", jpeg_draft=jpeg_draft, **options)
+    decode = [event for event in converter.observer.events if event.stage == "decode"][0]
+    with Image.open(output_path) as image:
+        return image.convert("RGB"), decode.pixels_out
+
+
+def test_draft_output_within_tolerance(tmp_path, photo_path):
+    input_path = photo_path(3200, 2400)
+    draft, draft_pixels = convert(input_path, str(tmp_path / "draft.png"), True, longer_edge=600)
+    full, full_pixels = convert(input_path, str(tmp_path / "full.png"), False, longer_edge=600)
+    assert draft.size == full.size == (600, 450)
+    # Dekodowanie w skali DCT: najwyżej 1/4 pikseli (zapas reducing_gap przed skalowaniem końcowym)
+    assert draft_pixels <= full_pixels // 4
+    difference = ImageChops.difference(draft, full)
+    assert max(ImageStat.Stat(difference).mean) <= MEAN_TOLERANCE
+    assert max(high for _, high in difference.getextrema()) <= MAX_TOLERANCE
+
+
+def test_draft_skipped_for_small_reduction(tmp_path, photo_path):
+    input_path = photo_path(1200, 800)
+    _, draft_pixels = convert(input_path, str(tmp_path / "draft.png"), True, longer_edge=1000)
+    assert draft_pixels == 1200 * 800
@@ -0,0 +1,80 @@
+import os
+import mmap
+
+import pytest
+from PIL import Image
+
+import image_converter
+from conftest import photo
+from image_converter import ImageConverter
+
+
+def mapped_converter():
+    converter = ImageConverter()
+    converter.memory_map_inputs = True
+    converter.memory_map_threshold = 0
+    return converter
+
+
+def open_files(path):
+    """
+    Liczba deskryptorów i odwzorowań pamięci procesu wskazujących na plik
+    """
+    descriptors = sum(os.path.realpath(os.path.join("/proc/self/fd", fd)) == path for fd in os.listdir("/proc/self/fd"))
+    with open("/proc/self/maps") as f:
+        mappings = sum(line.rstrip().endswith(path) for line in f)
+    return descriptors + mappings
+
+
+@pytest.fixture(params=["PNG", "JPEG", "TIFF"])
+def source_path(request, tmp_path):
+    path = str(tmp_path / f"source.{request.param.lower()}")
+    options = {"compression": "tiff_lzw"} if request.param == "TIFF" else {}
+    photo(800, 600).save(path, format=request.param, **options)
+    return path
+
+
+def test_mapped_output_matches_path_output(source_path, tmp_path):
+    ImageConverter().convert_heic_to_format(source_path, str(tmp_path / "path.jpg"), "JPEG", longer_edge=400)
+    mapped_converter().convert_heic_to_format(source_path, str(tmp_path / "mapped.jpg"), "JPEG", longer_edge=400)
+    with open(tmp_path / "path.jpg", "rb") as expected, open(tmp_path / "mapped.jpg", "rb") as actual:
+        assert actual.read() == expected.read()
+
+
+def test_large_compressed_input_is_mapped(source_path):
+    image, size = mapped_converter()._open_header(source_path)
+    assert isinstance(image.fp, mmap.mmap)
+    assert size == (800, 600)
+    image.close()
+
+
+def test_small_and_raw_inputs_not_mapped(tmp_path, photo_path):
+    converter = mapped_converter()
+    converter.memory_map_threshold = 10 * 1024 * 1024
+    image, _ = converter._open_header(photo_path())
+    assert not isinstance(image.fp, mmap.mmap)
+    image.close()
+
+    raw_path = str(tmp_path / "raw.tiff")
+    photo(64, 48).save(raw_path, compression="raw")
+    image, _ = mapped_converter()._open_header(raw_path)
+    assert not isinstance(image.fp, mmap.mmap)
+    image.close()
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="brak /proc")
+def test_mapping_released_after_conversion(source_path, tmp_path):
+    source_path = os.path.realpath(source_path)
+    assert open_files(source_path) == 0
+    mapped_converter().convert_heic_to_format(source_path, str(tmp_path / "out.webp"), "WebP", max_size_kb=30)
+    assert open_files(source_path) == 0
+
+
+def test_falls_back_when_mapping_fails(source_path, tmp_path, monkeypatch):
+    def failing_mmap(*args, **kwargs):
+        raise OSError("mmap nieobsługiwane")
+
+    monkeypatch.setattr(image_converter.mmap, "mmap", failing_mmap)
+    result_path = mapped_converter().convert_heic_to_format(source_path, str(tmp_path / "out.png"), "PNG", longer_edge=200)
+    with Image.open(result_path) as image:
+        assert image.size == (200, 150)
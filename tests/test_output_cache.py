@@ -0,0 +1,120 @@
+import os
+
+import pytest
+
+from image_converter import ConversionJob, ImageConverter
+from output_cache import OutputCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return OutputCache(str(tmp_path / "cache"))
+
+
+@pytest.fixture
+def converter(cache):
+    converter = ImageConverter()
+    converter.output_cache = cache
+    return converter
+
+
+def make_job(input_path, tmp_path, **options):
+    return ConversionJob(input_path, str(tmp_path / "out.jpg"), "JPEG", **options)
+
+
+def blob_path(cache, key):
+    return cache._blob_path(key)
+
+
+def test_miss_then_hit(converter, cache, photo_path, tmp_path):
+    job = make_job(photo_path(), tmp_path, longer_edge=600)
+    first = converter.run_job(job)
+    assert not first.cached
+    with open(job.output_path, "rb") as f:
+        expected = f.read()
+    os.remove(job.output_path)
+
+    second = converter.run_job(job)
+    assert second.cached
+    assert (second.source_size, second.output_size) == (first.source_size, first.output_size)
+    with open(job.output_path, "rb") as f:
+        assert f.read() == expected
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1, "size_bytes": len(expected)}
+
+
+def test_key_follows_content_and_options(cache, photo_path, tmp_path):
+    input_path = photo_path()
+    key = cache.job_key(make_job(input_path, tmp_path, longer_edge=600))
+    # Ta sama wartość zapisana inaczej daje ten sam klucz
+    assert cache.job_key(make_job(input_path, tmp_path, longer_edge="600")) == key
+    assert cache.job_key(make_job(input_path, tmp_path, longer_edge=500)) != key
+    assert cache.job_key(make_job(input_path, tmp_path, longer_edge=600, strip_metadata=True)) != key
+    assert cache.job_key(make_job(input_path, tmp_path, longer_edge=600, encoder_profile="fast")) != key
+
+
+def test_changed_input_misses(converter, cache, photo_path, tmp_path):
+    input_path = photo_path()
+    job = make_job(input_path, tmp_path)
+    converter.run_job(job)
+    # Nowa treść pod tą samą ścieżką
+    os.replace(photo_path(seed=1), input_path)
+    result = converter.run_job(job)
+    assert not result.cached
+    assert cache.stats()["entries"] == 2
+
+
+def test_changed_options_miss(converter, cache, photo_path, tmp_path):
+    input_path = photo_path()
+    converter.run_job(make_job(input_path, tmp_path, longer_edge=600))
+    result = converter.run_job(make_job(input_path, tmp_path, longer_edge=300))
+    assert not result.cached
+    assert result.output_size == (300, 200)
+
+
+def test_lru_eviction_by_size(tmp_path):
+    cache = OutputCache(str(tmp_path / "cache"), max_size_mb=1)
+    sizes = {"a": 400 * 1024, "b": 400 * 1024, "c": 400 * 1024}
+    for key, size in sizes.items():
+        source = tmp_path / f"{key}.bin"
+        source.write_bytes(b"x" * size)
+        cache.store(key * 64, str(source), (1, 1), (1, 1))
+        if key == "b":
+            # Użycie "a" sprawia, że najdawniej używanym wpisem jest "b"
+            assert cache.fetch("a" * 64, str(tmp_path / "a_out.bin")) is not None
+
+    assert cache.fetch("b" * 64, str(tmp_path / "b_out.bin")) is None
+    assert not os.path.exists(blob_path(cache, "b" * 64))
+    assert cache.fetch("a" * 64, str(tmp_path / "a_out.bin")) is not None
+    assert cache.fetch("c" * 64, str(tmp_path / "c_out.bin")) is not None
+    assert cache.stats()["size_bytes"] <= 1024 * 1024
+
+
+@pytest.mark.parametrize("damage", ["missing", "truncated"])
+def test_damaged_blob_is_dropped_and_reconverted(converter, cache, photo_path, tmp_path, damage):
+    job = make_job(photo_path(), tmp_path)
+    converter.run_job(job)
+    key = cache.job_key(job)
+    if damage == "missing":
+        os.remove(blob_path(cache, key))
+    else:
+        with open(blob_path(cache, key), "r+b") as f:
+            f.truncate(100)
+
+    assert cache.fetch(key, str(tmp_path / "copy.jpg")) is None
+    assert not os.path.exists(tmp_path / "copy.jpg")
+    assert cache.stats()["entries"] == 0
+
+    # Kolejne uruchomienie konwertuje plik ponownie i odtwarza wpis
+    result = converter.run_job(job)
+    assert not result.cached
+    assert converter.run_job(job).cached
+
+
+def test_verify_rejects_entry(cache, photo_path, tmp_path, monkeypatch):
+    source = tmp_path / "result.bin"
+    source.write_bytes(b"wynik")
+    cache.store("d" * 64, str(source), (1, 1), (1, 1))
+    monkeypatch.setattr(cache, "_verify", lambda path, meta: False)
+    assert cache.fetch("d" * 64, str(tmp_path / "out.bin")) is None
+    assert not os.path.exists(blob_path(cache, "d" * 64))
@@ -0,0 +1,117 @@
+import os
+import gc
+
+import pytest
+from PIL import Image
+
+from conftest import photo
+from image_converter import ImageConverter
+from pixel_cache import PixelCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PixelCache(str(tmp_path / "pixels"))
+
+
+def mapped(path):
+    with open("/proc/self/maps") as f:
+        return any(line.rstrip().endswith(path) for line in f)
+
+
+@pytest.mark.parametrize("mode", ["RGB", "RGBA", "L", "LA"])
+def test_round_trip(cache, mode):
+    image = photo(120, 80).convert(mode)
+    image.info["exif"] = b"Exif\x00\x00dane"
+    image.info["icc_profile"] = b"profil"
+    assert cache.store("a" * 64, image, (240, 160))
+
+    loaded, source_size = cache.load("a" * 64)
+    assert source_size == (240, 160)
+    assert loaded.mode == mode
+    assert loaded.size == image.size
+    assert loaded.tobytes() == image.tobytes()
+    assert loaded.info["exif"] == b"Exif\x00\x00dane"
+    assert loaded.info["icc_profile"] == b"profil"
+
+
+def test_palette_image_not_stored(cache):
+    assert not cache.store("a" * 64, photo(40, 30).convert("P"), (40, 30))
+    assert cache.load("a" * 64) is None
+
+
+@pytest.mark.skipif(not os.path.isfile("/proc/self/maps"), reason="brak /proc")
+def test_mappable_mode_shares_mapping(cache):
+    cache.store("a" * 64, photo(120, 80).convert("RGBA"), (120, 80))
+    blob_path = cache._blob_path("a" * 64)
+    image, _ = cache.load("a" * 64)
+    # Obraz korzysta z mapy pliku bez kopii i utrzymuje ją do zwolnienia
+    assert image.readonly
+    assert mapped(blob_path)
+    assert image.resize((60, 40)).size == (60, 40)
+    del image
+    gc.collect()
+    assert not mapped(blob_path)
+
+    cache.store("b" * 64, photo(120, 80), (120, 80))
+    image, _ = cache.load("b" * 64)
+    # RGB jest rozpakowywane z mapy, która jest od razu zamykana
+    assert not mapped(cache._blob_path("b" * 64))
+
+
+@pytest.mark.parametrize("damage", ["flipped", "truncated"])
+def test_damaged_entry_rejected(cache, damage, capsys):
+    cache.store("a" * 64, photo(120, 80), (120, 80))
+    blob_path = cache._blob_path("a" * 64)
+    with open(blob_path, "r+b") as f:
+        if damage == "flipped":
+            # Ten sam rozmiar - wykrywa go dopiero suma kontrolna
+            f.seek(1000)
+            byte = f.read(1)
+            f.seek(1000)
+            f.write(bytes([byte[0] ^ 0xFF]))
+        else:
+            f.truncate(1000)
+
+    assert cache.load("a" * 64) is None
+    assert not os.path.exists(blob_path)
+    assert cache.stats()["entries"] == 0
+    if damage == "flipped":
+        assert "Uszkodzony wpis pamięci podręcznej pikseli" in capsys.readouterr().out
+
+
+def test_eviction(tmp_path):
+    cache = PixelCache(str(tmp_path / "pixels"), max_size_mb=1)
+    # Każdy wpis RGB 400x300 ma 360 000 bajtów - zmieszczą się dwa
+    for key in "abc":
+        cache.store(key * 64, photo(400, 300, seed=ord(key)), (400, 300))
+        if key == "b":
+            assert cache.load("a" * 64) is not None
+    assert cache.load("b" * 64) is None
+    assert cache.load("a" * 64) is not None
+    assert cache.load("c" * 64) is not None
+
+    cache = PixelCache(str(tmp_path / "limited"), max_entries=2)
+    for key in "abc":
+        cache.store(key * 64, photo(40, 30), (40, 30))
+    assert cache.stats()["entries"] == 2
+    assert cache.load("a" * 64) is None
+
+
+def test_converter_skips_decode_on_hit(cache, photo_path, tmp_path, monkeypatch):
+    converter = ImageConverter()
+    converter.pixel_cache = cache
+    opens = []
+    open_source = ImageConverter._open_source
+    monkeypatch.setattr(ImageConverter, "_open_source", lambda self, *args: opens.append(args) or open_source(self, *args))
+
+    input_path = photo_path()
+    converter.convert_heic_to_format(input_path, str(tmp_path / "a.jpg"), "JPEG", longer_edge=600)
+    converter.convert_heic_to_format(input_path, str(tmp_path / "b.webp"), "WebP", longer_edge=600, max_size_kb=30)
+    assert len(opens) == 1
+    with Image.open(tmp_path / "b.webp") as image:
+        assert image.size == (600, 400)
+    # Inna geometria lub PNG (tryb źródła) to inny wpis
+    converter.convert_heic_to_format(input_path, str(tmp_path / "c.jpg"), "JPEG", longer_edge=300)
+    converter.convert_heic_to_format(input_path, str(tmp_path / "d.png"), "PNG", longer_edge=600)
+    assert len(opens) == 3
@@ -0,0 +1,53 @@
+import os
+import glob
+import pstats
+
+from batch_converter import BatchConverter
+
+
+def profiled_batch(photo_path, output_dir, workers, files=4):
+    paths = [photo_path(320, 240, seed=seed) for seed in range(files)]
+    output_dir.mkdir()
+    batch_converter = BatchConverter(workers=workers)
+    batch_converter.profiling = True
+    results = list(batch_converter.convert(paths, output_format="PNG", output_directory=str(output_dir)))
+    assert all(batch_result.ok for batch_result in results)
+    return batch_converter.last_profile_report
+
+
+def profiled_functions(path):
+    return {(os.path.basename(filename), name) for filename, _, name in pstats.Stats(path).stats}
+
+
+def test_worker_profiles_are_merged(photo_path, tmp_path):
+    output_dir = tmp_path / "out"
+    report = profiled_batch(photo_path, output_dir, workers=2)
+
+    assert os.path.dirname(report["pstats"]) == str(output_dir)
+    # _run_job wywołują tylko procesy robocze - obecność w scalonym profilu oznacza, że ich wyniki dołączono
+    assert ("batch_converter.py", "_run_job") in profiled_functions(report["pstats"])
+    with open(report["report"], encoding="utf-8") as f:
+        text = f.read()
+    assert "procesy robocze: 2" in text
+    assert text.count("Szczyt pamięci śledzonej w worker-") == 2
+    assert "miejsc największych alokacji" in text
+    # Katalog tymczasowy procesów roboczych jest usuwany
+    assert not glob.glob(os.path.join(str(output_dir), "worker-*"))
+
+
+def test_in_process_batch_is_profiled(photo_path, tmp_path):
+    report = profiled_batch(photo_path, tmp_path / "out", workers=1, files=2)
+
+    assert ("batch_converter.py", "_run_job") in profiled_functions(report["pstats"])
+    with open(report["report"], encoding="utf-8") as f:
+        assert "procesy robocze: 0" in f.read()
+
+
+def test_profiling_disabled_writes_nothing(photo_path, tmp_path):
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    batch_converter = BatchConverter(workers=1)
+    list(batch_converter.convert([photo_path(320, 240)], output_format="PNG", output_directory=str(output_dir)))
+
+    assert batch_converter.last_profile_report is None
+    assert not glob.glob(os.path.join(str(output_dir), "profil_*"))
@@ -0,0 +1,102 @@
+import os
+
+from PIL import Image
+
+from conftest import photo
+from image_converter import ImageConverter
+from quality_predictor import QualityPredictor
+
+
+def convert(converter, input_path, output_path, max_size_kb, **options):
+    converter.convert_heic_to_format(input_path, output_path, "JPEG", max_size_kb=max_size_kb, **options)
+    return os.path.getsize(output_path), converter.last_encode_count
+
+
+def test_bisect_base_quality_fits(tmp_path):
+    # Regresja: bez predyktora i z jakością bazową mieszczącą się w limicie przedział nie był ustawiany
+    input_path = str(tmp_path / "flat.png")
+    Image.new("RGB", (200, 200), "white").save(input_path)
+    size, encodes = convert(ImageConverter(), input_path, str(tmp_path / "flat.jpg"), 500)
+    assert size <= 500 * 1024
+    assert encodes <= 2
+
+
+def test_bisect_matches_linear_search(tmp_path, photo_path):
+    input_path = photo_path()
+    converter = ImageConverter()
+    # Próby z optimize (jak w wyszukiwaniu liniowym), aby porównywać te same rozmiary
+    bisect_size, bisect_encodes = convert(converter, input_path, str(tmp_path / "bisect.jpg"), 120, fast_probes=False)
+    linear_size, linear_encodes = convert(converter, input_path, str(tmp_path / "linear.jpg"), 120, quality_search="linear", fast_probes=False)
+    assert bisect_size <= 120 * 1024
+    # Liniowe wyszukiwanie schodzi krokami, bisekcja znajduje najwyższą mieszczącą się jakość
+    assert bisect_size >= linear_size
+    assert bisect_encodes < linear_encodes
+
+
+def test_bisect_falls_back_to_min_quality(tmp_path, photo_path, capsys):
+    input_path = photo_path()
+    size, _ = convert(ImageConverter(), input_path, str(tmp_path / "tiny.jpg"), 1)
+    assert size > 1024
+    assert "minimalną jakością" in capsys.readouterr().out
+
+
+def test_predictor_within_tolerance(tmp_path, photo_path):
+    predictor = QualityPredictor()
+    seeded = ImageConverter(quality_predictor=predictor)
+    blind = ImageConverter()
+    limit_kb = 150
+    blind_encodes, seeded_encodes = [], []
+    for seed in range(5):
+        input_path = photo_path(seed=seed)
+        blind_size, encodes = convert(blind, input_path, str(tmp_path / "blind.jpg"), limit_kb)
+        blind_encodes.append(encodes)
+        seeded_size, encodes = convert(seeded, input_path, str(tmp_path / "seeded.jpg"), limit_kb)
+        seeded_encodes.append(encodes)
+        # Przewidziana jakość jest akceptowana tylko w pasie tolerancji poniżej limitu
+        assert blind_size * (1 - predictor.tolerance) <= seeded_size <= limit_kb * 1024
+    # Po pierwszym pliku model jest wyuczony na podobnych obrazach
+    assert sum(seeded_encodes[1:]) < sum(blind_encodes[1:])
+
+
+def test_predictor_memo_skips_search(tmp_path, photo_path):
+    predictor = QualityPredictor()
+    converter = ImageConverter(quality_predictor=predictor)
+    input_path = photo_path()
+    first_size, _ = convert(converter, input_path, str(tmp_path / "first.jpg"), 100)
+    second_size, encodes = convert(converter, input_path, str(tmp_path / "second.jpg"), 100)
+    assert second_size == first_size
+    # Próba z zapamiętaną jakością i kodowanie końcowe z optimize
+    assert encodes <= 2
+
+
+def test_content_key():
+    predictor = QualityPredictor()
+    image = photo(800, 600, seed=1)
+    key = predictor.content_key(image, "JPEG", 100_000, {"optimize": True, "quality": 90})
+    assert key == predictor.content_key(image.copy(), "JPEG", 100_000, {"optimize": True, "quality": 50})
+    assert key != predictor.content_key(photo(800, 600, seed=2), "JPEG", 100_000, {"optimize": True})
+    assert key != predictor.content_key(image, "JPEG", 50_000, {"optimize": True})
+    assert key != predictor.content_key(image, "WebP", 100_000, {"optimize": True})
+
+
+def test_memo_is_bounded_lru():
+    predictor = QualityPredictor(max_memo=2)
+    predictor.remember("a", 80)
+    predictor.remember("b", 70)
+    assert predictor.recall("a") == 80
+    predictor.remember("c", 60)
+    assert predictor.recall("b") is None
+    assert predictor.recall("a") == 80
+    assert predictor.recall("c") == 60
+
+
+def test_state_saved_on_close(tmp_path, photo_path):
+    cache_file = str(tmp_path / "predictor.json")
+    with QualityPredictor(cache_file=cache_file) as predictor:
+        converter = ImageConverter(quality_predictor=predictor)
+        convert(converter, photo_path(), str(tmp_path / "out.jpg"), 100)
+        # Stan nie jest zapisywany po każdym pliku
+        assert not os.path.exists(cache_file)
+    reloaded = QualityPredictor(cache_file=cache_file)
+    assert len(reloaded.memo) == 1
+    assert reloaded.scale_factors
@@ -0,0 +1,59 @@
+import os
+
+from PIL import Image
+
+import image_converter
+from image_converter import ImageConverter, RenditionSpec
+
+SPECS = [
+    RenditionSpec("JPEG", suffix="_full"),
+    RenditionSpec("WebP", suffix="_web", longer_edge=600),
+    RenditionSpec("PNG", suffix="_thumb", longer_edge=120),
+    RenditionSpec("JPEG", suffix="_small", shorter_edge=100, max_size_kb=20),
+]
+EXPECTED = [("JPEG", (1200, 800)), ("WEBP", (600, 400)), ("PNG", (120, 80)), ("JPEG", (150, 100))]
+
+
+def test_renditions_match_specs(photo_path, tmp_path):
+    input_path = photo_path()
+    results = ImageConverter().convert_renditions(input_path, SPECS, output_directory=str(tmp_path))
+
+    assert len(results) == len(SPECS)
+    for spec, result, (image_format, size) in zip(SPECS, results, EXPECTED):
+        assert result.output_path == os.path.join(str(tmp_path), f"photo_0_1200x800{spec.suffix}.{image_format.lower().replace('jpeg', 'jpg')}")
+        assert result.source_size == (1200, 800)
+        assert result.output_size == size
+        assert result.file_size == os.path.getsize(result.output_path)
+        with Image.open(result.output_path) as image:
+            assert image.format == image_format
+            assert image.size == size
+    assert results[3].file_size <= 20 * 1024
+
+
+def test_renditions_decode_once(photo_path, tmp_path, monkeypatch):
+    opens = []
+    open_image = image_converter._open_image
+    monkeypatch.setattr(image_converter, "_open_image", lambda source: opens.append(source) or open_image(source))
+    converts = []
+    convert = Image.Image.convert
+    monkeypatch.setattr(Image.Image, "convert", lambda image, *args, **kwargs: converts.append(args) or convert(image, *args, **kwargs))
+
+    input_path = photo_path(image_format="PNG")
+    Image.open(input_path).convert("RGBA").save(input_path)
+    converts.clear()
+    ImageConverter().convert_renditions(input_path, SPECS, output_directory=str(tmp_path))
+    assert len(opens) == 1
+    # RGBA -> RGB tylko raz dla wszystkich wersji JPEG/WebP (PNG zachowuje tryb źródła)
+    assert converts.count(("RGB",)) == 1
+
+
+def test_renditions_cascade_from_largest(photo_path, tmp_path, monkeypatch):
+    sizes = []
+    resize_image = ImageConverter.resize_image
+    monkeypatch.setattr(ImageConverter, "resize_image", lambda self, image, new_resolution, **kwargs: sizes.append(image.size) or resize_image(self, image, new_resolution, **kwargs))
+    specs = [RenditionSpec("JPEG", suffix="_s", longer_edge=120), RenditionSpec("JPEG", suffix="_l", longer_edge=600)]
+    results = ImageConverter().convert_renditions(photo_path(), specs, output_directory=str(tmp_path), jpeg_draft=False)
+
+    assert [result.output_size for result in results] == [(120, 80), (600, 400)]
+    # Najpierw największa wersja ze źródła, potem mniejsza z największej
+    assert sizes == [(1200, 800), (600, 400)]
@@ -0,0 +1,35 @@
+import pytest
+from PIL import Image, ImageChops, ImageStat
+
+from conftest import photo
+from image_converter import ImageConverter
+
+
+@pytest.fixture(scope="module")
+def source():
+    image = photo(1600, 1200)
+    image.load()
+    return image
+
+
+@pytest.mark.parametrize("ratio", [1.5, 2, 4, 6, 10, 16])
+def test_downscale_close_to_lanczos(source, ratio):
+    new_resolution = (int(source.width / ratio), int(source.height / ratio))
+    result = ImageConverter().resize_image(source, new_resolution)
+    reference = source.resize(new_resolution, Image.Resampling.LANCZOS)
+    assert result.size == new_resolution
+    assert max(ImageStat.Stat(ImageChops.difference(result, reference)).mean) < 2.0
+
+
+def test_no_upscale_is_noop(source):
+    assert ImageConverter().resize_image(source, (3200, 2400), upscale=False) is source
+
+
+def test_no_upscale_clamps_mixed_target(source):
+    # Szerokość maleje, wysokość miałaby wzrosnąć - wysokość zostaje źródłowa
+    result = ImageConverter().resize_image(source, (800, 1800), upscale=False)
+    assert result.size == (800, 1200)
+
+
+def test_upscale(source):
+    assert ImageConverter().resize_image(source, (2000, 1500)).size == (2000, 1500)
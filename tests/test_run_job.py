@@ -0,0 +1,74 @@
+import os
+
+import pytest
+from PIL import Image
+
+import image_converter
+from image_converter import ImageConverter, ConversionJob, load_heif
+
+
+@pytest.fixture
+def count_opens(monkeypatch):
+    """
+    Liczy otwarcia plików źródłowych przez Pillow i pillow_heif
+    """
+    opens = []
+    open_image = image_converter._open_image
+
+    def counting_open_image(source):
+        opens.append(source)
+        return open_image(source)
+
+    monkeypatch.setattr(image_converter, "_open_image", counting_open_image)
+    try:
+        pillow_heif = load_heif()
+    except ImportError:
+        return opens
+    open_heif = pillow_heif.open_heif
+
+    def counting_open_heif(source, *args, **kwargs):
+        opens.append(source)
+        return open_heif(source, *args, **kwargs)
+
+    monkeypatch.setattr(pillow_heif, "open_heif", counting_open_heif)
+    return opens
+
+
+def test_job_result(photo_path, tmp_path):
+    output_path = str(tmp_path / "out.jpg")
+    result = ImageConverter().run_job(ConversionJob(photo_path(), output_path, "JPEG", longer_edge="600"))
+
+    assert result.input_path.endswith(".jpeg")
+    assert result.output_path == output_path
+    assert result.source_size == (1200, 800)
+    assert result.output_size == (600, 400)
+    assert result.file_size == os.path.getsize(output_path)
+    assert result.encode_count == 1
+    assert result.elapsed > 0
+    assert not result.cached
+    with Image.open(output_path) as image:
+        assert image.size == (600, 400)
+
+
+def test_explicit_resolution_wins_over_edges(photo_path, tmp_path):
+    job = ConversionJob(photo_path(), str(tmp_path / "out.png"), "PNG", longer_edge=600, new_resolution=(100, 50))
+    assert ImageConverter().run_job(job).output_size == (100, 50)
+
+
+def test_source_opened_once(photo_path, tmp_path, count_opens):
+    ImageConverter().run_job(ConversionJob(photo_path(), str(tmp_path / "out.jpg"), "JPEG", longer_edge=600, shorter_edge=300))
+    assert len(count_opens) == 1
+
+
+def test_heic_source_opened_once(photo_path, tmp_path, count_opens):
+    try:
+        load_heif()
+    except ImportError:
+        pytest.skip("brak pillow_heif")
+    input_path = str(tmp_path / "photo.heic")
+    Image.open(photo_path(320, 240)).save(input_path, format="HEIF", quality=50)
+    count_opens.clear()
+    result = ImageConverter().run_job(ConversionJob(input_path, str(tmp_path / "out.jpg"), "JPEG", shorter_edge=120))
+    assert len(count_opens) == 1
+    assert result.source_size == (320, 240)
+    assert result.output_size == (160, 120)
@@ -0,0 +1,93 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker
+
+import pytest
+from PIL import Image
+
+import image_converter
+from image_converter import ImageConverter, RenditionSpec, SharedImage
+
+SPECS = [
+    RenditionSpec("JPEG", suffix="_full"),
+    RenditionSpec("WebP", suffix="_web", longer_edge=600),
+    RenditionSpec("PNG", suffix="_thumb", longer_edge=120),
+]
+
+
+@pytest.fixture
+def shared_names(monkeypatch):
+    """
+    Nazwy buforów pamięci współdzielonej utworzonych podczas testu
+    """
+    names = []
+    init = SharedImage.__init__
+
+    def recording_init(self, image):
+        init(self, image)
+        names.append(self.shm.name)
+
+    monkeypatch.setattr(SharedImage, "__init__", recording_init)
+    return names
+
+
+def segment_exists(name):
+    return os.path.exists(os.path.join("/dev/shm", name.lstrip("/")))
+
+
+def _crash_worker(*args):
+    os._exit(1)
+
+
+def test_shared_matches_in_process(photo_path, tmp_path):
+    # Bez kaskady (jedna wersja skalowana) wersje równoległe muszą być identyczne z kodowanymi w procesie
+    specs = [RenditionSpec("JPEG", suffix="_full"), RenditionSpec("PNG", suffix="_png"), RenditionSpec("WebP", suffix="_web", longer_edge=600)]
+    input_path = photo_path()
+    (tmp_path / "serial").mkdir()
+    (tmp_path / "shared").mkdir()
+    serial = ImageConverter().convert_renditions(input_path, specs, output_directory=str(tmp_path / "serial"))
+    shared = ImageConverter().convert_renditions(input_path, specs, output_directory=str(tmp_path / "shared"), workers=2)
+
+    for serial_result, shared_result in zip(serial, shared):
+        assert shared_result.output_size == serial_result.output_size
+        assert shared_result.file_size == serial_result.file_size
+        with open(serial_result.output_path, "rb") as expected, open(shared_result.output_path, "rb") as actual:
+            assert actual.read() == expected.read()
+
+
+@pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason="brak /dev/shm")
+def test_segments_unlinked_after_success(photo_path, tmp_path, shared_names):
+    ImageConverter().convert_renditions(photo_path(), SPECS, output_directory=str(tmp_path), workers=2)
+    assert shared_names
+    assert not any(segment_exists(name) for name in shared_names)
+
+
+@pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason="brak /dev/shm")
+def test_segments_unlinked_after_worker_error(photo_path, tmp_path, shared_names):
+    specs = SPECS + [RenditionSpec("JPEG", suffix="_bad", encoder_profile="nieznany")]
+    with pytest.raises(Exception, match="Nieznany profil kodera"):
+        ImageConverter().convert_renditions(photo_path(), specs, output_directory=str(tmp_path), workers=2)
+    assert shared_names
+    assert not any(segment_exists(name) for name in shared_names)
+
+
+@pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason="brak /dev/shm")
+def test_segments_unlinked_after_worker_crash(photo_path, tmp_path, shared_names, monkeypatch):
+    monkeypatch.setattr(image_converter, "_encode_shared_rendition", _crash_worker)
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        with pytest.raises(Exception):
+            ImageConverter().convert_renditions(photo_path(), SPECS, output_directory=str(tmp_path), executor=executor)
+    assert shared_names
+    assert not any(segment_exists(name) for name in shared_names)
+
+
+def test_worker_attach_not_tracked(monkeypatch):
+    registered = []
+    monkeypatch.setattr(resource_tracker, "register", lambda name, rtype: registered.append((name, rtype)))
+    shared_image = SharedImage(Image.new("RGB", (8, 8)))
+    try:
+        registered.clear()
+        image_converter._attach_shared_memory(shared_image.shm.name).close()
+    finally:
+        shared_image.release()
+    assert registered == []
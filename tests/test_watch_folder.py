@@ -0,0 +1,109 @@
+import os
+import threading
+
+from PIL import Image
+
+from batch_converter import BatchConverter
+from config import ConfigManager
+from watch_folder import FolderWatcher
+
+
+def make_watcher(directory, **options):
+    settings = dict(ConfigManager().default_settings, output_format="PNG", use_output_cache=False)
+    return FolderWatcher(str(directory), settings=settings, batch_converter=BatchConverter(workers=1), settle_seconds=0, batch_window=0, use_inotify=False, **options)
+
+
+def run_once(watcher, now):
+    """
+    Jeden obieg pętli obserwatora i konwersja gotowych plików (bez wątków)
+    """
+    watcher._scan(now)
+    watcher._schedule_retries(now)
+    watcher._release_settled(now)
+    converted = []
+    while not watcher.ready.empty():
+        batch = watcher._next_batch()
+        converted.extend(path for path, _, _ in batch)
+        watcher._convert_batch(batch)
+    return converted
+
+
+def test_failed_file_retried_with_backoff(tmp_path):
+    broken = tmp_path / "broken.jpg"
+    broken.write_bytes(b"not an image")
+    watcher = make_watcher(tmp_path, retry_delay=10, max_retries=2)
+    assert run_once(watcher, 0) == [str(broken)]
+    assert watcher.metrics.snapshot()["failed"] == 1
+    # Błąd jest odebrany w następnym obiegu; przed upływem opóźnienia plik nie wraca do konwersji
+    assert run_once(watcher, 1) == []
+    assert run_once(watcher, 10) == []
+    assert run_once(watcher, 11) == [str(broken)]
+    # Druga próba - opóźnienie podwojone
+    assert run_once(watcher, 12) == []
+    assert run_once(watcher, 31) == []
+    assert run_once(watcher, 32) == [str(broken)]
+    # Po max_retries plik czeka na modyfikację
+    assert run_once(watcher, 1000) == []
+    Image.new("RGB", (32, 32)).save(broken, format="JPEG")
+    assert run_once(watcher, 1001) == [str(broken)]
+    assert (tmp_path / "broken_converted.png").exists()
+
+
+def test_deleted_files_forgotten(tmp_path):
+    source = tmp_path / "a.png"
+    Image.new("RGB", (32, 32)).save(source)
+    watcher = make_watcher(tmp_path)
+    assert run_once(watcher, 0) == [str(source)]
+    assert str(source) in watcher.processed
+    assert watcher.outputs == {str(tmp_path / "a_converted.png")}
+    os.remove(source)
+    os.remove(tmp_path / "a_converted.png")
+    run_once(watcher, 1)
+    assert watcher.processed == {}
+    assert watcher.outputs == set()
+
+
+def test_batch_metric_thread_safe(tmp_path):
+    watcher = make_watcher(tmp_path)
+    threads = [threading.Thread(target=lambda: [watcher.metrics.record_batch() for _ in range(1000)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert watcher.metrics.snapshot()["batches"] == 4000
+
+
+def test_pool_started_once_and_closed_on_stop(tmp_path, monkeypatch):
+    batch_converter = BatchConverter(workers=2)
+    executors = []
+    shared_executor = BatchConverter._shared_executor
+    monkeypatch.setattr(BatchConverter, "_shared_executor", lambda self: executors.append(shared_executor(self)) or executors[-1])
+    converted = threading.Event()
+    results = []
+
+    def on_result(batch_result, latency):
+        results.append(batch_result)
+        if len(results) == 4:
+            converted.set()
+
+    settings = dict(ConfigManager().default_settings, output_format="PNG", output_directory=str(tmp_path / "out"))
+    watcher = FolderWatcher(str(tmp_path / "in"), settings=settings, batch_converter=batch_converter, settle_seconds=0, batch_window=0.5, poll_interval=0.05, use_inotify=False, on_result=on_result)
+    (tmp_path / "in").mkdir()
+    thread = threading.Thread(target=watcher.run)
+    thread.start()
+    try:
+        for index in range(2):
+            for name in ("a", "b"):
+                Image.new("RGB", (32, 32)).save(tmp_path / "in" / f"{name}{index}.png")
+            # Druga para trafia do osobnej mikropartii
+            while len(results) < 2 * (index + 1) and thread.is_alive():
+                converted.wait(0.05)
+        assert converted.wait(10)
+        # Procesy robocze działają przed pierwszym plikiem i obsługują wszystkie mikropartie
+        assert len(set(map(id, executors))) == 1
+        assert batch_converter._executor is executors[0]
+    finally:
+        watcher.stop()
+        thread.join(10)
+    assert all(batch_result.ok for batch_result in results)
+    assert batch_converter._executor is None
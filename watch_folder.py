@@ -0,0 +1,427 @@
+import os
+import sys
+import time
+import queue
+import select
+import struct
+import argparse
+import threading
+import collections
+from config import ConfigManager
+from file_manager import FileManager
+from batch_converter import BatchConverter, options_from_settings
+
+# Zdarzenia inotify: zakończenie zapisu, przeniesienie do/z katalogu, utworzenie, usunięcie, modyfikacja
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Inotify:
+    def __init__(self, directory):
+        """
+        Minimalna obsługa inotify (Linux) przez ctypes, bez zależności zewnętrznych.
+        Zgłasza OSError, jeśli inotify jest niedostępne.
+        """
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify niedostępne")
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | getattr(os, "O_CLOEXEC", 0))
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, "inotify_add_watch")
+
+    def read(self, timeout):
+        """
+        Czeka na zdarzenia najwyżej `timeout` sekund
+
+        Returns:
+            list: Nazwy plików, których dotyczyły zdarzenia
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        names = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if name:
+                names.append(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class WatchMetrics:
+    def __init__(self, history: int = 1000):
+        """
+        Metryki katalogu obserwowanego: opóźnienie od pierwszego zdarzenia pliku do zapisania wyniku
+        i głębokość kolejki (bieżąca i maksymalna)
+        """
+        self.latencies = collections.deque(maxlen=history)
+        self.converted = 0
+        self.failed = 0
+        self.batches = 0
+        self.max_queue_depth = 0
+        self.lock = threading.Lock()
+
+    def record(self, latency, ok):
+        with self.lock:
+            self.latencies.append(latency)
+            if ok:
+                self.converted += 1
+            else:
+                self.failed += 1
+
+    def record_batch(self):
+        with self.lock:
+            self.batches += 1
+
+    def observe_queue(self, depth):
+        with self.lock:
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+
+    def snapshot(self, queue_depth=0):
+        """
+        Returns:
+            dict: Liczniki, percentyle opóźnienia (p50, p95, max) w sekundach i głębokość kolejki
+        """
+        with self.lock:
+            latencies = sorted(self.latencies)
+            result = {"converted": self.converted, "failed": self.failed, "batches": self.batches, "queue_depth": queue_depth, "max_queue_depth": self.max_queue_depth}
+        if latencies:
+            result["latency_p50"] = latencies[len(latencies) // 2]
+            result["latency_p95"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            result["latency_max"] = latencies[-1]
+        return result
+
+
+class FolderWatcher:
+    def __init__(self, directory, settings=None, batch_converter=None, settle_seconds: float = 2.0, batch_size: int = 16, batch_window: float = 1.0, queue_size: int = 256, poll_interval: float = 1.0, use_inotify: bool = None, on_result=None, retry_delay: float = 5.0, max_retries: int = 3):
+        """
+        Obserwuje katalog i konwertuje pojawiające się w nim obrazy z zapisanymi ustawieniami.
+        Plik trafia do konwersji dopiero, gdy jego rozmiar i czas modyfikacji nie zmieniają się
+        przez `settle_seconds` (np. synchronizacja z telefonu jeszcze trwa). Gotowe pliki trafiają
+        do ograniczonej kolejki - gdy konwersja nie nadąża, obserwator czeka zamiast gromadzić zdarzenia -
+        i są konwertowane w mikropartiach przez BatchConverter.
+
+        Args:
+            directory (str): Katalog obserwowany
+            settings (dict, optional): Ustawienia jak w `settings.json`. Domyślnie wczytywane przez ConfigManager.
+            batch_converter (BatchConverter, optional): Silnik konwersji
+            settle_seconds (float): Czas bez zmian pliku, po którym jest uznawany za kompletny
+            batch_size (int): Maksymalna liczba plików w mikropartii
+            batch_window (float): Maksymalny czas zbierania mikropartii po pierwszym pliku (s)
+            queue_size (int): Pojemność kolejki gotowych plików
+            poll_interval (float): Odstęp skanowania katalogu (bez inotify) i sprawdzania stabilności (s)
+            use_inotify (bool, optional): Wymuszenie (True) lub wyłączenie (False) inotify. Domyślnie
+                inotify jest używane, jeśli jest dostępne.
+            on_result (callable, optional): Funkcja wywoływana z (BatchResult, opóźnienie w s) dla każdego pliku
+            retry_delay (float): Opóźnienie pierwszej ponownej próby po błędzie konwersji (s); kolejne są dwukrotnie dłuższe
+            max_retries (int): Liczba ponownych prób niezmienionego pliku; potem plik czeka na modyfikację
+        """
+        self.directory = os.path.abspath(directory)
+        self.settings = settings if settings is not None else ConfigManager().load_settings()
+        self.batch_converter = batch_converter or BatchConverter()
+        self.file_manager = FileManager()
+        self.settle_seconds = settle_seconds
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.on_result = on_result
+        self.retry_delay = retry_delay
+        self.max_retries = max_retries
+        self.ready = queue.Queue(maxsize=queue_size)
+        self.metrics = WatchMetrics()
+        self.stop_event = threading.Event()
+        # Ścieżka -> (rozmiar, mtime_ns, czas pierwszego zdarzenia, czas ostatniej zmiany)
+        self.candidates = {}
+        # Ścieżka -> (rozmiar, mtime_ns) ostatnio przekazanej wersji pliku (wpisy usuwane wraz z plikiem)
+        self.processed = {}
+        # Błędy konwersji zgłaszane z wątku konwersji: (ścieżka, (rozmiar, mtime_ns))
+        self.failures = queue.SimpleQueue()
+        # Ścieżka -> ((rozmiar, mtime_ns), liczba nieudanych prób) i ścieżka -> czas następnej próby
+        self.attempts = {}
+        self.retries = {}
+        # Wyniki zapisane w obserwowanym katalogu nie mogą wrócić jako nowe wejścia
+        self.outputs = set()
+        self.outputs_lock = threading.Lock()
+        self.backend = None
+
+    def _is_input(self, path):
+        name, ext = os.path.splitext(os.path.basename(path))
+        if name.startswith('.') or ext.lower() not in self.file_manager.input_extensions:
+            return False
+        if self.settings.get("suffix") and name.endswith(self.settings["suffix"]):
+            return False
+        with self.outputs_lock:
+            return path not in self.outputs
+
+    def _notice(self, path, now):
+        """
+        Rejestruje zdarzenie dla pliku (nowy plik lub zmiana rozmiaru/czasu modyfikacji)
+        """
+        if not self._is_input(path):
+            with self.outputs_lock:
+                if path in self.outputs and not os.path.exists(path):
+                    self.outputs.discard(path)
+            return
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self._forget(path)
+            return
+        signature = (stat.st_size, stat.st_mtime_ns)
+        if self.processed.get(path) == signature:
+            return
+        if path in self.retries:
+            if self.attempts[path][0] == signature and now < self.retries[path]:
+                return
+            # Plik zmieniony po błędzie lub nadszedł czas ponownej próby
+            del self.retries[path]
+        candidate = self.candidates.get(path)
+        if candidate is None:
+            self.candidates[path] = (*signature, now, now)
+        elif candidate[:2] != signature:
+            self.candidates[path] = (*signature, candidate[2], now)
+
+    def _forget(self, path):
+        """
+        Usuwa stan pliku, który zniknął z katalogu (w tym usuniętego oryginału lub wyniku)
+        """
+        self.candidates.pop(path, None)
+        self.processed.pop(path, None)
+        self.attempts.pop(path, None)
+        self.retries.pop(path, None)
+        with self.outputs_lock:
+            self.outputs.discard(path)
+
+    def _scan(self, now):
+        try:
+            names = os.listdir(self.directory)
+        except OSError as e:
+            print(f"Błąd podczas odczytu katalogu {self.directory}: {str(e)}")
+            return
+        paths = {os.path.join(self.directory, name) for name in names}
+        for path in [path for path in self.processed if path not in paths]:
+            self._forget(path)
+        with self.outputs_lock:
+            self.outputs.intersection_update(paths)
+        for path in paths:
+            self._notice(path, now)
+
+    def _schedule_retries(self, now):
+        """
+        Odbiera błędy konwersji z wątku konwersji: plik nie jest już uznawany za przetworzony
+        i wraca do konwersji po `retry_delay * 2^(próba - 1)` sekund (najwyżej `max_retries` razy
+        dla tej samej wersji pliku). Pliki, których czas próby nadszedł, wracają do kandydatów.
+        """
+        while True:
+            try:
+                path, signature = self.failures.get_nowait()
+            except queue.Empty:
+                break
+            if self.processed.get(path) != signature:
+                # Plik zmieniony lub usunięty od czasu przekazania - zmiana i tak go obsłuży
+                continue
+            previous = self.attempts.get(path)
+            count = previous[1] + 1 if previous and previous[0] == signature else 1
+            self.attempts[path] = (signature, count)
+            if count > self.max_retries:
+                print(f"Uwaga: {os.path.basename(path)} - konwersja nie powiodła się {count} razy, kolejna próba po modyfikacji pliku")
+                continue
+            del self.processed[path]
+            self.retries[path] = now + self.retry_delay * 2 ** (count - 1)
+        for path, retry_at in list(self.retries.items()):
+            if now >= retry_at:
+                self._notice(path, now)
+
+    def _release_settled(self, now):
+        """
+        Przekazuje do kolejki pliki, które nie zmieniły się przez `settle_seconds`
+        """
+        for path in list(self.candidates):
+            self._notice(path, now)
+            candidate = self.candidates.get(path)
+            if candidate is None or now - candidate[3] < self.settle_seconds:
+                continue
+            del self.candidates[path]
+            self.processed[path] = candidate[:2]
+            # Blokujące put przy pełnej kolejce - presja zwrotna na obserwatora
+            while not self.stop_event.is_set():
+                try:
+                    self.ready.put((path, candidate[2], candidate[:2]), timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+            self.metrics.observe_queue(self.ready.qsize())
+
+    def _watch(self):
+        """
+        Pętla obserwatora (osobny wątek): zdarzenia inotify lub okresowe skanowanie katalogu
+        """
+        inotify = None
+        if self.use_inotify is not False and sys.platform.startswith("linux"):
+            try:
+                inotify = _Inotify(self.directory)
+            except OSError as e:
+                if self.use_inotify:
+                    raise
+                print(f"Uwaga: inotify niedostępne ({e}), używane jest okresowe skanowanie katalogu")
+        self.backend = "inotify" if inotify else "polling"
+        # Pliki obecne przed uruchomieniem też są konwertowane
+        self._scan(time.monotonic())
+        try:
+            while not self.stop_event.is_set():
+                if inotify:
+                    # Bez oczekujących plików nie trzeba sprawdzać stabilności - czekamy na zdarzenia
+                    timeout = self.poll_interval if self.candidates or self.retries else 1.0
+                    for name in inotify.read(timeout):
+                        self._notice(os.path.join(self.directory, name), time.monotonic())
+                else:
+                    self.stop_event.wait(self.poll_interval)
+                    self._scan(time.monotonic())
+                self._schedule_retries(time.monotonic())
+                self._release_settled(time.monotonic())
+        finally:
+            if inotify:
+                inotify.close()
+
+    def _next_batch(self):
+        """
+        Zbiera mikropartię: czeka na pierwszy plik, potem dobiera kolejne do `batch_size`
+        lub do upływu `batch_window`
+        """
+        try:
+            batch = [self.ready.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.ready.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _convert_batch(self, batch):
+        settings = self.settings
+        options = options_from_settings(settings)
+        # Numeracja dotyczy pozycji w ręcznie wybranej liście plików, nie ma sensu dla mikropartii
+        options["number_files"] = False
+        jobs = self.batch_converter.build_jobs([path for path, _, _ in batch], **options)
+        with self.outputs_lock:
+            # Tylko wyniki w obserwowanym katalogu - inne nie wrócą jako zdarzenia, a zbiór by rósł
+            self.outputs.update(job.output_path for job in jobs if os.path.dirname(os.path.abspath(job.output_path)) == self.directory)
+        self.metrics.record_batch()
+        for batch_result in self.batch_converter.iter_results(jobs):
+            path, first_seen, signature = batch[batch_result.index]
+            latency = time.monotonic() - first_seen
+            self.metrics.record(latency, batch_result.ok)
+            if not batch_result.ok:
+                self.failures.put((path, signature))
+                with self.outputs_lock:
+                    self.outputs.discard(jobs[batch_result.index].output_path)
+            if batch_result.ok and settings.get("delete_originals"):
+                try:
+                    os.remove(batch_result.input_path)
+                except OSError as e:
+                    print(f"BŁĄD: Nie można usunąć oryginału {os.path.basename(batch_result.input_path)}: {e}")
+            if self.on_result:
+                self.on_result(batch_result, latency)
+
+    def run(self):
+        """
+        Uruchamia obserwację i konwersję do wywołania `stop` (lub przerwania Ctrl+C). Pula procesów
+        BatchConverter jest uruchamiana na początku, używana przez wszystkie mikropartie i zamykana na końcu.
+        """
+        self.batch_converter.start()
+        watcher = threading.Thread(target=self._watch, name="FolderWatcher", daemon=True)
+        watcher.start()
+        try:
+            while not self.stop_event.is_set() or not self.ready.empty():
+                batch = self._next_batch()
+                if batch:
+                    self._convert_batch(batch)
+                elif not watcher.is_alive():
+                    break
+        finally:
+            self.stop_event.set()
+            watcher.join()
+            self.batch_converter.close()
+
+    def stop(self):
+        """
+        Kończy obserwację; pliki już oczekujące w kolejce są jeszcze konwertowane, a potem `run`
+        zamyka pulę procesów
+        """
+        self.stop_event.set()
+
+    def stats(self):
+        """
+        Returns:
+            dict: Metryki (zob. `WatchMetrics.snapshot`) z bieżącą głębokością kolejki i liczbą plików oczekujących na stabilizację
+        """
+        result = self.metrics.snapshot(self.ready.qsize())
+        result["settling"] = len(self.candidates)
+        result["retrying"] = len(self.retries)
+        result["backend"] = self.backend
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Obserwuje katalog i konwertuje nowe obrazy z ustawieniami z settings.json")
+    parser.add_argument("directory", help="Katalog obserwowany")
+    parser.add_argument("--config", default="settings.json", help="Plik ustawień")
+    parser.add_argument("--workers", type=int, default=None, help="Liczba procesów roboczych")
+    parser.add_argument("--settle", type=float, default=2.0, help="Czas bez zmian pliku przed konwersją (s)")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--poll", action="store_true", help="Okresowe skanowanie zamiast inotify")
+    parser.add_argument("--stats-interval", type=float, default=60.0, help="Odstęp wypisywania metryk (s)")
+    args = parser.parse_args()
+
+    last_stats = [time.monotonic()]
+
+    def report(batch_result, latency):
+        if batch_result.ok:
+            result = batch_result.result
+            budget = f", budżet {result.budget.elapsed:.2f}/{result.budget.time_budget:.2f} s" if result.budget is not None else ""
+            print(f"{os.path.basename(batch_result.input_path)} -> {os.path.basename(result.output_path)} ({result.output_size[0]}x{result.output_size[1]}, {result.file_size / 1024:.1f} KB, opóźnienie {latency:.2f} s{budget})", flush=True)
+        else:
+            print(f"BŁĄD konwersji pliku {os.path.basename(batch_result.input_path)}: {batch_result.error}", flush=True)
+        if time.monotonic() - last_stats[0] >= args.stats_interval:
+            last_stats[0] = time.monotonic()
+            print(f"Metryki: {watcher.stats()}", flush=True)
+
+    watcher = FolderWatcher(args.directory, settings=ConfigManager(args.config).load_settings(), batch_converter=BatchConverter(workers=args.workers), settle_seconds=args.settle, batch_size=args.batch_size, use_inotify=False if args.poll else None, on_result=report)
+    print(f"Obserwowanie katalogu {watcher.directory} (Ctrl+C kończy)", flush=True)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.stop()
+    print(f"Metryki: {watcher.stats()}")
+
+if __name__ == "__main__":
+    main()